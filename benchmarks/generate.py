@@ -0,0 +1,293 @@
+import argparse
+import datetime
+import os
+import random
+import re
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BABY_NAMES_TEMPLATE = f'{REPO_PATH}/python_baby_names/baby1990.html'
+
+DELIMITER = '\x01'
+EXCHANGE = 'CME'
+START_TIME = datetime.datetime(2013, 8, 8, 13, 29)
+
+
+def format_timestamp(time: datetime.datetime) -> str:
+    """
+    Formats a time like the FIX logs do, e.g. "20130808-13:28:57.009".
+    """
+    return time.strftime('%Y%m%d-%H:%M:%S.') + f'{time.microsecond // 1000:03d}'
+
+
+def format_message(log_time: datetime.datetime, fields: list) -> str:
+    """
+    Returns a log line for a FIX message, with a correct BodyLength (Tag 9)
+    and CheckSum (Tag 10).
+
+    Args:
+        log_time (datetime.datetime): When the message was logged.
+        fields (list): 2-tuples of Tag and value, starting with Tag 35.
+    """
+    body = ''.join(f'{tag}={value}{DELIMITER}' for tag, value in fields)
+    header = f'8=FIX.4.2{DELIMITER}9={len(body):06d}{DELIMITER}'
+    checksum = sum((header + body).encode()) % 256
+    return (
+        f'{format_timestamp(log_time)} : {header}{body}'
+        f'10={checksum:03d}{DELIMITER}\n')
+
+
+class FixSessionGenerator:
+    """
+    Writes a realistic FIX 4.2 session log: a logon, heartbeats, new orders
+    (35=D), cancels (35=F) and the exchange's execution reports (35=8) for
+    them, including partial fills.
+    """
+
+    def __init__(self, session: str, symbols: tuple, fill_ratio: float,
+                 cancel_ratio: float, seed: int):
+        self.session = session
+        self.symbols = symbols
+        self.fill_ratio = fill_ratio
+        self.cancel_ratio = cancel_ratio
+        self.random = random.Random(seed)
+        self.time = START_TIME
+        self.sequence_numbers = {session: 0, EXCHANGE: 0}
+        self.order_count = 0
+        self.exec_count = 0
+        self.message_count = 0
+
+    def next_id(self, count: int) -> str:
+        # The sample logs use zero padded base 36 ids.
+        digits = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        value = ''
+        while count:
+            count, remainder = divmod(count, 36)
+            value = digits[remainder] + value
+        return value.rjust(20, '0')
+
+    def message(self, sender: str, fields: list) -> str:
+        self.time += datetime.timedelta(milliseconds=self.random.randint(0, 5))
+        self.sequence_numbers[sender] += 1
+        target = self.session if sender == EXCHANGE else EXCHANGE
+        sending_time = format_timestamp(self.time)
+        header = [
+            (35, fields[0][1]),
+            (34, self.sequence_numbers[sender]),
+            (49, sender),
+            (52, sending_time),
+            (56, target),
+        ]
+        self.message_count += 1
+        return format_message(self.time, header + fields[1:])
+
+    def execution_report(self, order: dict, cl_ord_id: str, ord_status: str,
+                         cum_qty: int, orig_cl_ord_id: str = '') -> str:
+        self.exec_count += 1
+        fields = [
+            (35, '8'), (57, 'ST1'), (1, 'test'), (6, 0), (11, cl_ord_id),
+            (14, cum_qty), (17, self.next_id(self.exec_count).rjust(40, '0')),
+            (20, 0), (37, order['order_id']), (38, order['qty']),
+            (39, ord_status), (40, 2),
+        ]
+        if orig_cl_ord_id:
+            fields.append((41, orig_cl_ord_id))
+        fields += [
+            (44, order['price']), (48, 17704), (54, order['side']),
+            (55, order['symbol']), (60, format_timestamp(self.time)[:17]),
+            (107, order['symbol'] + 'U3'), (150, ord_status),
+            (151, order['qty'] - cum_qty),
+        ]
+        return self.message(EXCHANGE, fields)
+
+    def iter_order_lines(self):
+        """
+        Yields the log lines of one order's lifecycle.
+        """
+        self.order_count += 1
+        cl_ord_id = self.next_id(self.order_count + 1)
+        order = {
+            'order_id': str(self.order_count).zfill(17),
+            'qty': self.random.randint(1, 10),
+            'price': self.random.randint(169000, 170000) // 25 * 25,
+            'side': self.random.choice((1, 2)),
+            'symbol': self.random.choice(self.symbols),
+        }
+        yield self.message(self.session, [
+            (35, 'D'), (1, 'test'), (11, cl_ord_id), (21, 1),
+            (38, order['qty']), (40, 2), (44, order['price']),
+            (54, order['side']), (55, order['symbol']), (59, 0),
+            (60, format_timestamp(self.time)), (107, order['symbol'] + 'U3'),
+            (167, 'FUT'),
+        ])
+        yield self.execution_report(order, cl_ord_id, '0', 0)
+
+        cum_qty = 0
+        if self.random.random() < self.fill_ratio:
+            while cum_qty < order['qty']:
+                cum_qty = self.random.randint(cum_qty + 1, order['qty'])
+                ord_status = '2' if cum_qty == order['qty'] else '1'
+                yield self.execution_report(order, cl_ord_id, ord_status, cum_qty)
+                if ord_status == '1' and self.random.random() < self.cancel_ratio:
+                    break
+
+        if cum_qty < order['qty'] and self.random.random() < self.cancel_ratio:
+            self.order_count += 1
+            cancel_id = self.next_id(self.order_count + 1)
+            yield self.message(self.session, [
+                (35, 'F'), (11, cancel_id), (37, order['order_id']),
+                (38, order['qty']), (41, cl_ord_id), (54, order['side']),
+                (55, order['symbol']), (60, format_timestamp(self.time)),
+            ])
+            yield self.execution_report(order, cancel_id, '4', cum_qty, cl_ord_id)
+
+    def write(self, path: str, size: int) -> int:
+        """
+        Writes orders to a log file until it's at least size bytes.
+
+        Returns:
+            int: The number of messages written.
+        """
+        written = 0
+        with open(path, 'w', newline='\n') as log_file:
+            for sender in (self.session, EXCHANGE):
+                line = self.message(sender, [
+                    (35, 'A'), (98, 0), (108, 30)])
+                log_file.write(line)
+                written += len(line)
+            while written < size:
+                for line in self.iter_order_lines():
+                    log_file.write(line)
+                    written += len(line)
+                if self.message_count % 50 == 0:
+                    line = self.message(EXCHANGE, [(35, '0')])
+                    log_file.write(line)
+                    written += len(line)
+        return self.message_count
+
+
+def generate_fix_logs(directory: str, size_mb: float, sessions: int = 2,
+                      symbols: tuple = ('ES', 'NQ', 'CL', 'GC'),
+                      fill_ratio: float = 0.5, cancel_ratio: float = 0.4,
+                      seed: int = 0) -> dict:
+    """
+    Writes FIX session logs named like the sample logs.
+
+    Args:
+        directory (str): Where the logs are written.
+        size_mb (float): The total size of the logs in MB.
+        sessions (int): The number of session logs to split the size across.
+        symbols (tuple): The Symbols (Tag 55) that orders are placed on.
+        fill_ratio (float): The share of orders that receive fills.
+        cancel_ratio (float): The share of unfilled orders that get
+            cancelled.
+        seed (int): Makes the logs reproducible.
+
+    Returns:
+        dict: The "bytes" and "messages" that were written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    size = int(size_mb * 1024 * 1024 / sessions)
+    messages = 0
+    for index in range(sessions):
+        session = f'BENCH{index:02d}N'
+        generator = FixSessionGenerator(
+            session, symbols, fill_ratio, cancel_ratio, seed + index)
+        messages += generator.write(
+            f'{directory}/FIX.4.2-CME-{session}.messages.current.log', size)
+    return {'bytes': get_directory_size(directory), 'messages': messages}
+
+
+def generate_baby_names(directory: str, first_year: int, last_year: int,
+                        names_per_year: int = 1000, seed: int = 0) -> dict:
+    """
+    Writes a baby<year>.html page for every year, using the layout of the
+    sample pages with names shuffled differently each year.
+
+    Args:
+        directory (str): Where the pages are written.
+        first_year (int)
+        last_year (int)
+        names_per_year (int): The number of rows in each page's table.
+        seed (int): Makes the pages reproducible.
+
+    Returns:
+        dict: The "bytes" and "messages" (table rows) that were written.
+    """
+    with open(BABY_NAMES_TEMPLATE, 'r') as template_file:
+        template = template_file.read()
+
+    row_pattern = r'<tr align="right"><td>(\d+)</td><td>(\w+)</td><td>(\w+)</td>\n'
+    rows = list(re.finditer(row_pattern, template))
+    before_rows = template[:rows[0].start()]
+    after_rows = template[rows[-1].end():]
+    male_names = [row.group(2) for row in rows]
+    female_names = [row.group(3) for row in rows]
+    # Invent names for pages with more rows than the template.
+    for index in range(len(rows), names_per_year):
+        male_names.append(f'{male_names[index % len(rows)]}{index}')
+        female_names.append(f'{female_names[index % len(rows)]}{index}')
+
+    os.makedirs(directory, exist_ok=True)
+    generator = random.Random(seed)
+    for year in range(first_year, last_year + 1):
+        males = male_names[:names_per_year]
+        females = female_names[:names_per_year]
+        # Keep the order roughly stable from year to year, like real data.
+        for names in (males, females):
+            for index in range(len(names) - 1):
+                if generator.random() < 0.3:
+                    names[index], names[index + 1] = names[index + 1], names[index]
+        page = before_rows.replace('Popularity in 1990', f'Popularity in {year}')
+        page += ''.join(
+            f'<tr align="right"><td>{rank}</td><td>{male}</td><td>{female}</td>\n'
+            for rank, (male, female) in enumerate(zip(males, females), 1)
+        )
+        page += after_rows
+        with open(f'{directory}/baby{year}.html', 'w') as page_file:
+            page_file.write(page)
+
+    return {
+        'bytes': get_directory_size(directory),
+        'messages': (last_year - first_year + 1) * names_per_year,
+    }
+
+
+def get_directory_size(directory: str) -> int:
+    return sum(
+        os.path.getsize(f'{directory}/{filename}')
+        for filename in os.listdir(directory)
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generates synthetic FIX logs or baby name pages.')
+    subparsers = parser.add_subparsers(dest='corpus', required=True)
+
+    fix_parser = subparsers.add_parser('fix')
+    fix_parser.add_argument('directory')
+    fix_parser.add_argument('--size-mb', type=float, default=10)
+    fix_parser.add_argument('--sessions', type=int, default=2)
+    fix_parser.add_argument('--symbols', default='ES,NQ,CL,GC')
+    fix_parser.add_argument('--fill-ratio', type=float, default=0.5)
+    fix_parser.add_argument('--cancel-ratio', type=float, default=0.4)
+    fix_parser.add_argument('--seed', type=int, default=0)
+
+    baby_parser = subparsers.add_parser('baby_names')
+    baby_parser.add_argument('directory')
+    baby_parser.add_argument('--first-year', type=int, default=1880)
+    baby_parser.add_argument('--last-year', type=int, default=2020)
+    baby_parser.add_argument('--names-per-year', type=int, default=1000)
+    baby_parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.corpus == 'fix':
+        result = generate_fix_logs(
+            args.directory, args.size_mb, args.sessions,
+            tuple(args.symbols.split(',')), args.fill_ratio,
+            args.cancel_ratio, args.seed)
+    else:
+        result = generate_baby_names(
+            args.directory, args.first_year, args.last_year,
+            args.names_per_year, args.seed)
+    print(result)
@@ -0,0 +1,256 @@
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import generate
+
+try:
+    import resource
+except ImportError:
+    # The resource module isn't available on Windows.
+    resource = None
+
+REPO_PATH = generate.REPO_PATH
+DATA_PATH = f'{REPO_PATH}/benchmarks/.data'
+
+# Every execute_report variant, by suite. The value is the module to import
+# and a function that creates the script from that module.
+VARIANTS = {
+    'fix': {
+        'question_1': ('question_1', lambda module: module.OrderStatusAnalyzer(
+            module.CATEGORIES_NEEDED)),
+        'question_1_v2': ('question_1_v2', lambda module: module.OrderStatusAnalyzer2(
+            module.original.CATEGORIES_NEEDED)),
+        'question_2': ('question_2', lambda module: module.ExecutionReportAnalyzer(
+            module.SYMBOL_TAG)),
+        'question_2_v2': ('question_2_v2', lambda module: module.ExecutionReportAnalyzer2(
+            module.original.SYMBOL_TAG)),
+        'all_reports': ('engine', lambda module: module.ReportEngine([
+            importlib.import_module('question_1').OrderStatusAnalyzer(
+                importlib.import_module('question_1').CATEGORIES_NEEDED),
+            importlib.import_module('question_2').ExecutionReportAnalyzer(
+                importlib.import_module('question_2').SYMBOL_TAG),
+        ])),
+    },
+    'baby_names': {
+        'question_1': ('question_1', lambda module: module.Script(
+            module.NAME_QUANTITY_NEEDED)),
+        'question_1_v2': ('question_1_v2', lambda module: module.Script2(
+            module.original.NAME_QUANTITY_NEEDED)),
+        'question_2': ('question_2', lambda module: module.Script(
+            module.NAMES_IN_REPORT, excel_sheetname=module.EXCEL_SHEETNAME)),
+        'question_2_v2': ('question_2_v2', lambda module: module.Script2(
+            module.original.NAMES_IN_REPORT,
+            excel_sheetname=module.original.EXCEL_SHEETNAME)),
+    },
+}
+
+SUITE_DIRECTORIES = {
+    'fix': 'python_fix_logs',
+    'baby_names': 'python_baby_names',
+}
+
+
+def get_peak_rss_mb() -> float:
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else.
+    if sys.platform == 'darwin':
+        return peak_rss / 1024 / 1024
+    return peak_rss / 1024
+
+
+def run_variant(suite: str, variant: str, data_path: str) -> dict:
+    """
+    Runs a single variant in this process. Called in a fresh child process
+    for every measurement, so that imports are cold and peak RSS only covers
+    that variant.
+
+    Returns:
+        dict: The "seconds" and "peak_rss_mb" of the run.
+    """
+    os.chdir(REPO_PATH)
+    sys.path.insert(0, f'{REPO_PATH}/{SUITE_DIRECTORIES[suite]}')
+    sys.path.insert(1, REPO_PATH)
+    settings = importlib.import_module('settings')
+    settings.RELATIVE_PATH = data_path
+    # Measure parsing rather than the baby names cache, which would answer
+    # every run after the first.
+    settings.USE_CACHE = False
+
+    module_name, create_script = VARIANTS[suite][variant]
+    module = importlib.import_module(module_name)
+    script = create_script(module)
+
+    # Keep the Excel files out of the repo.
+    output_path = tempfile.mkdtemp()
+    for obj in [script] + getattr(script, 'analyzers', []):
+        obj.get_output_path = lambda file_dunder: os.path.join(
+            output_path,
+            os.path.basename(file_dunder).replace('.py', '_report.xlsx'))
+
+    start_time = timeit.default_timer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        script.execute_report()
+    seconds = timeit.default_timer() - start_time
+    return {'seconds': seconds, 'peak_rss_mb': get_peak_rss_mb()}
+
+
+def get_corpus(suite: str, size: float) -> tuple:
+    """
+    Generates (or reuses) the corpus of a given size.
+
+    Args:
+        suite (str): "fix" or "baby_names".
+        size (float): MB of FIX logs, or the number of years of baby names.
+
+    Returns:
+        tuple: The directory of the corpus and its "bytes" and "messages".
+    """
+    data_path = f'{DATA_PATH}/{suite}_{size:g}'
+    info_path = f'{data_path}.json'
+    if os.path.exists(info_path):
+        with open(info_path, 'r') as info_file:
+            return data_path, json.load(info_file)
+
+    if suite == 'fix':
+        info = generate.generate_fix_logs(data_path, size)
+    else:
+        last_year = 2020
+        info = generate.generate_baby_names(
+            data_path, last_year - int(size) + 1, last_year)
+    with open(info_path, 'w') as info_file:
+        json.dump(info, info_file)
+    return data_path, info
+
+
+def measure(suite: str, variant: str, size: float, repeat: int) -> dict:
+    """
+    Runs a variant in fresh child processes and keeps the fastest run.
+
+    Returns:
+        dict: The result, including throughput in MB/s and messages/s.
+    """
+    data_path, info = get_corpus(suite, size)
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, __file__, '--child', suite, variant, data_path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1]
+            return {'suite': suite, 'variant': variant, 'size': size,
+                    'error': error}
+        run = json.loads(completed.stdout)
+        if best is None or run['seconds'] < best['seconds']:
+            best = run
+
+    megabytes = info['bytes'] / 1024 / 1024
+    return {
+        'suite': suite,
+        'variant': variant,
+        'size': size,
+        'seconds': best['seconds'],
+        'mb_per_second': megabytes / best['seconds'],
+        'messages_per_second': info['messages'] / best['seconds'],
+        'peak_rss_mb': best['peak_rss_mb'],
+    }
+
+
+def get_key(result: dict) -> str:
+    return f"{result['suite']}/{result['variant']}/{result['size']:g}"
+
+
+def print_results(results: list, baseline: dict, threshold: float) -> int:
+    """
+    Prints a table of the results, marking regressions against a baseline.
+
+    Returns:
+        int: The number of regressions.
+    """
+    regressions = 0
+    print(f"{'benchmark':<36}{'seconds':>10}{'MB/s':>10}{'msgs/s':>12}"
+          f"{'RSS MB':>9}  vs baseline")
+    for result in results:
+        key = get_key(result)
+        if 'error' in result:
+            print(f"{key:<36}  ERROR: {result['error']}")
+            continue
+        comparison = ''
+        previous = baseline.get(key)
+        if previous and 'seconds' in previous:
+            change = result['seconds'] / previous['seconds'] - 1
+            comparison = f'{change:+.0%}'
+            if change > threshold:
+                comparison += '  REGRESSION'
+                regressions += 1
+        peak_rss = result['peak_rss_mb']
+        peak_rss = '' if peak_rss is None else f'{peak_rss:.0f}'
+        print(f"{key:<36}{result['seconds']:>10.3f}"
+              f"{result['mb_per_second']:>10.1f}"
+              f"{result['messages_per_second']:>12.0f}"
+              f"{peak_rss:>9}  {comparison}")
+    return regressions
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        suite, variant, data_path = sys.argv[2:5]
+        print(json.dumps(run_variant(suite, variant, data_path)))
+        sys.exit()
+
+    parser = argparse.ArgumentParser(
+        description='Benchmarks every execute_report variant on synthetic data.')
+    parser.add_argument(
+        '--suite', choices=sorted(VARIANTS), action='append',
+        help='Only run this suite (may be repeated).')
+    parser.add_argument(
+        '--variant', action='append',
+        help='Only run this variant, e.g. question_1_v2 (may be repeated).')
+    parser.add_argument(
+        '--fix-sizes', default='1,10,100',
+        help='Comma separated sizes of the FIX logs in MB.')
+    parser.add_argument(
+        '--baby-names-years', default='10,50,140',
+        help='Comma separated numbers of years of baby name pages.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Save the results to this file.')
+    parser.add_argument(
+        '--compare', help='A file saved with --json to compare against.')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='How much slower than the baseline counts as a regression.')
+    args = parser.parse_args()
+
+    sizes = {
+        'fix': [float(size) for size in args.fix_sizes.split(',')],
+        'baby_names': [float(size) for size in args.baby_names_years.split(',')],
+    }
+    results = []
+    for suite in args.suite or sorted(VARIANTS):
+        for variant in VARIANTS[suite]:
+            if args.variant and variant not in args.variant:
+                continue
+            for size in sizes[suite]:
+                results.append(measure(suite, variant, size, args.repeat))
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = {get_key(result): result for result in json.load(baseline_file)}
+    regressions = print_results(results, baseline, args.threshold)
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+    sys.exit(1 if regressions else 0)
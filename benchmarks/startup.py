@@ -0,0 +1,136 @@
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+
+import generate
+
+REPO_PATH = generate.REPO_PATH
+
+# The modules that start a report, by suite. None is the repository's root.
+STARTUP_MODULES = {
+    None: ['reports'],
+    'fix': [
+        'question_1', 'question_1_v2', 'question_2', 'question_2_v2',
+        'all_reports', 'engine', 'incremental', 'query', 'time_buckets',
+    ],
+    'baby_names': [
+        'question_1', 'question_1_v2', 'question_2', 'question_2_v2',
+        'name_index',
+    ],
+}
+
+SUITE_DIRECTORIES = {
+    'fix': 'python_fix_logs',
+    'baby_names': 'python_baby_names',
+}
+
+# Heavy modules that must only be imported by the code that uses them, never
+# when a report's module is imported.
+LAZY_MODULES = (
+    'numpy', 'pandas', 'bs4', 'lxml', 'xlsxwriter', 'pyarrow',
+    'concurrent.futures.process', 'cProfile', 'pstats',
+)
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Parses the output of "python -X importtime".
+
+    Returns:
+        dict: The name of every imported module is the key and its
+            cumulative import time in milliseconds is the value.
+    """
+    import_times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        import_times[name.strip()] = int(cumulative_us) / 1000
+    return import_times
+
+
+def measure_import(suite: str, module: str, repeat: int) -> dict:
+    """
+    Imports a module in fresh interpreters and keeps the fastest run.
+
+    Returns:
+        dict: The module's "import_ms", the "wall_ms" of the whole
+            interpreter, and the LAZY_MODULES it imported.
+    """
+    path = [REPO_PATH]
+    if suite is not None:
+        path.insert(0, os.path.join(REPO_PATH, SUITE_DIRECTORIES[suite]))
+    code = f'import sys; sys.path[:0] = {path!r}; import {module}'
+
+    best = None
+    for _ in range(repeat):
+        start_time = timeit.default_timer()
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, cwd=REPO_PATH,
+        )
+        wall_ms = (timeit.default_timer() - start_time) * 1000
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1]
+            return {'suite': suite, 'module': module, 'error': error}
+        import_times = parse_importtime(completed.stderr)
+        run = {
+            'suite': suite,
+            'module': module,
+            'import_ms': import_times[module],
+            'wall_ms': wall_ms,
+            'lazy_modules': sorted(
+                name for name in LAZY_MODULES if name in import_times),
+        }
+        if best is None or run['import_ms'] < best['import_ms']:
+            best = run
+    return best
+
+
+def print_results(results: list, budget_ms: float) -> int:
+    """
+    Prints a table of the results, marking modules that are over budget or
+    import a heavy module.
+
+    Returns:
+        int: The number of failures.
+    """
+    failures = 0
+    print(f"{'module':<36}{'import ms':>10}{'wall ms':>10}  result")
+    for result in results:
+        key = f"{result['suite'] or 'root'}/{result['module']}"
+        if 'error' in result:
+            print(f"{key:<36}  ERROR: {result['error']}")
+            failures += 1
+            continue
+        problems = []
+        if result['import_ms'] > budget_ms:
+            problems.append(f'OVER BUDGET ({budget_ms:g} ms)')
+        if result['lazy_modules']:
+            problems.append(f"IMPORTS {', '.join(result['lazy_modules'])}")
+        failures += bool(problems)
+        print(f"{key:<36}{result['import_ms']:>10.1f}"
+              f"{result['wall_ms']:>10.1f}  {' '.join(problems) or 'ok'}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measures how long each report takes to import with '
+                    '"python -X importtime".')
+    parser.add_argument(
+        '--budget-ms', type=float, default=75,
+        help='The most milliseconds that importing a module may take.')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = [
+        measure_import(suite, module, args.repeat)
+        for suite, modules in STARTUP_MODULES.items()
+        for module in modules
+    ]
+    failures = print_results(results, args.budget_ms)
+    sys.exit(1 if failures else 0)
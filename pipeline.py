@@ -0,0 +1,189 @@
+import utils
+
+# Tells a parser thread that there's nothing left to parse.
+STOP = object()
+
+
+class Pipeline:
+    """
+    Runs a job as concurrent stages connected by bounded queues:
+
+        reader threads -> blocks -> parser threads -> results -> aggregator
+
+    Each reader takes the next item (e.g. a filename) and puts every block
+    that read(item) yields into the blocks queue. The parsers turn each block
+    into a result with parse(item, block). The aggregator is the code that
+    iterates over run(), in the calling thread, and it receives the results
+    in the order of the items and of their blocks. So it needs no locks, and
+    the results are the same as a sequential run.
+
+    A stage waits when the queue after it is full (backpressure), so only a
+    bounded number of blocks are in memory. While a reader waits for the
+    storage (or a decompressor or parser in C releases the GIL), the other
+    stages keep running, which hides the latency of slow or network-mounted
+    storage behind the parsing.
+
+    Example:
+        pipeline = Pipeline(read_blocks, parse_block)
+        for filename, messages in pipeline.run(filenames):
+            aggregate(messages)
+    """
+
+    def __init__(self, read, parse, readers: int = 1, parsers: int = 1,
+                 queue_size: int = 16, metrics: utils.Metrics = None):
+        """
+        Args:
+            read: A function of an item that yields its blocks.
+            parse: A function of an item and one of its blocks that returns
+                the block's result.
+            readers (int): The number of reader threads. More than one reads
+                several items at once, and the results of later items are
+                held until the earlier items are done.
+            parsers (int): The number of parser threads.
+            queue_size (int): The number of blocks (and results) that can wait
+                in each queue.
+            metrics (utils.Metrics): Gets the "reader_threads" and
+                "parser_threads" phases, which are the time that every reader
+                spent reading and every parser spent parsing, added together.
+        """
+        assert readers >= 1 and parsers >= 1, (
+            'A pipeline needs at least one reader and one parser.')
+        self.read = read
+        self.parse = parse
+        self.readers = readers
+        self.parsers = parsers
+        self.queue_size = queue_size
+        self.metrics = metrics or utils.NullMetrics()
+
+    def run(self, items):
+        """
+        Starts the threads and yields a 2-tuple of item and result for every
+        block of every item, in order. An exception raised by read or parse
+        is raised here, and the threads stop when the iteration stops.
+
+        Args:
+            items: An iterable of items, e.g. filenames.
+        """
+        import queue
+        import threading
+
+        items = list(items)
+        pending_items = queue.Queue()
+        for index, item in enumerate(items):
+            pending_items.put((index, item))
+        blocks = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue(maxsize=self.queue_size)
+        is_stopped = threading.Event()
+        thread_metrics = []
+
+        def put(to_queue, entry) -> bool:
+            # Give up once the pipeline is stopped, rather than wait forever
+            # for room in the queue.
+            while not is_stopped.is_set():
+                try:
+                    to_queue.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read_items():
+            metrics = utils.Metrics()
+            thread_metrics.append(metrics)
+            while not is_stopped.is_set():
+                try:
+                    index, item = pending_items.get_nowait()
+                except queue.Empty:
+                    return
+                block_count = 0
+                try:
+                    item_blocks = iter(self.read(item))
+                    while True:
+                        with metrics.phase('reader_threads'):
+                            block = next(item_blocks, STOP)
+                        if block is STOP:
+                            break
+                        if not put(blocks, (index, block_count, block)):
+                            return
+                        block_count += 1
+                except Exception as error:
+                    put(results, error)
+                    return
+                # The number of blocks tells the aggregator that the item is
+                # complete.
+                if not put(results, (index, None, block_count)):
+                    return
+
+        def parse_blocks():
+            metrics = utils.Metrics()
+            thread_metrics.append(metrics)
+            while True:
+                try:
+                    entry = blocks.get(timeout=0.1)
+                except queue.Empty:
+                    if is_stopped.is_set():
+                        return
+                    continue
+                if entry is STOP:
+                    return
+                index, block_index, block = entry
+                try:
+                    with metrics.phase('parser_threads'):
+                        result = self.parse(items[index], block)
+                except Exception as error:
+                    put(results, error)
+                    return
+                if not put(results, (index, block_index, result)):
+                    return
+
+        reader_threads = [
+            threading.Thread(target=read_items, daemon=True)
+            for _ in range(self.readers)
+        ]
+        parser_threads = [
+            threading.Thread(target=parse_blocks, daemon=True)
+            for _ in range(self.parsers)
+        ]
+        for thread in reader_threads + parser_threads:
+            thread.start()
+
+        # Store the results that arrive early into a dict where the item's
+        # index and the block's index are the key. Store the number of blocks
+        # of each item that has been read into another dict.
+        early_results = {}
+        block_counts = {}
+        index = 0
+        block_index = 0
+        try:
+            while index < len(items):
+                if block_counts.get(index) == block_index:
+                    index += 1
+                    block_index = 0
+                elif (index, block_index) in early_results:
+                    yield items[index], early_results.pop((index, block_index))
+                    block_index += 1
+                else:
+                    entry = results.get()
+                    if isinstance(entry, Exception):
+                        raise entry
+                    entry_index, entry_block_index, value = entry
+                    if entry_block_index is None:
+                        block_counts[entry_index] = value
+                    else:
+                        early_results[entry_index, entry_block_index] = value
+        finally:
+            is_stopped.set()
+            for thread in reader_threads:
+                thread.join()
+            # Once every result has arrived, the parsers are waiting for
+            # blocks, and STOP ends them right away. If the iteration stopped
+            # early, they notice is_stopped instead.
+            for _ in parser_threads:
+                try:
+                    blocks.put_nowait(STOP)
+                except queue.Full:
+                    break
+            for thread in parser_threads:
+                thread.join()
+            for metrics in thread_metrics:
+                self.metrics.merge(metrics.to_dict())
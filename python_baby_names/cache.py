@@ -0,0 +1,137 @@
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+import settings
+
+
+class NameTableCache:
+    """
+    Caches the parsed names table of each HTML file in a single SQLite file.
+
+    A table is stored with the parser that read it (see settings.PARSER) and
+    the size and mtime of the HTML file it was parsed from, and is ignored
+    (and replaced) once the file changes. Only the "lxml" parser validates a
+    table's title and columns, so the tables of each parser are kept apart.
+    The published pages never change, so in practice every run after the
+    first reads the cache instead of the HTML. Once the cache is bigger than
+    max_bytes, the least recently used tables are dropped.
+
+    Example:
+        with NameTableCache() as name_cache:
+            rows = name_cache.get('baby1990.html')
+    """
+
+    def __init__(self, path: str = '',
+                 max_bytes: int = settings.CACHE_MAX_BYTES,
+                 parser: str = settings.PARSER):
+        """
+        Args:
+            path (str): The SQLite file. Defaults to CACHE_FILENAME inside
+                RELATIVE_PATH.
+            max_bytes (int): The size of the stored tables that's kept.
+            parser (str): The parser whose tables are read and stored.
+        """
+        self.path = path or (
+            f'{settings.RELATIVE_PATH}/{settings.CACHE_FILENAME}')
+        self.max_bytes = max_bytes
+        self.parser = parser
+        self.connection = sqlite3.connect(self.path)
+        columns = [
+            column[1] for column in self.connection.execute(
+                'PRAGMA table_info(name_tables)')]
+        # A cache from before tables were stored per parser can't tell which
+        # parser read them, so it's dropped.
+        if columns and 'parser' not in columns:
+            self.connection.execute('DROP TABLE name_tables')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS name_tables ('
+            ' filename TEXT NOT NULL,'
+            ' parser TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' mtime_ns INTEGER NOT NULL,'
+            ' last_used REAL NOT NULL,'
+            ' rows BLOB NOT NULL,'
+            ' PRIMARY KEY (filename, parser)'
+            ')'
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def get_file_key(self, filename: str) -> tuple:
+        stat = os.stat(os.path.join(settings.RELATIVE_PATH, filename))
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, filename: str) -> list:
+        """
+        Returns the rows of a file's table, or None if the table isn't cached
+        or the file has changed since it was.
+
+        Args:
+            filename (str): The name of the HTML file.
+
+        Returns:
+            list: 3-tuples of rank, male name, female name
+        """
+        cached = self.connection.execute(
+            'SELECT size, mtime_ns, rows FROM name_tables'
+            ' WHERE filename = ? AND parser = ?',
+            (filename, self.parser)).fetchone()
+        if cached is None or tuple(cached[:2]) != self.get_file_key(filename):
+            return None
+        self.connection.execute(
+            'UPDATE name_tables SET last_used = ?'
+            ' WHERE filename = ? AND parser = ?',
+            (time.time(), filename, self.parser))
+        return [tuple(row) for row in json.loads(zlib.decompress(cached[2]))]
+
+    def put(self, filename: str, rows: list):
+        """
+        Stores the rows of a file's table, replacing any that were stored
+        before.
+
+        Args:
+            filename (str): The name of the HTML file.
+            rows (list): 3-tuples of rank, male name, female name
+        """
+        size, mtime_ns = self.get_file_key(filename)
+        compressed_rows = zlib.compress(json.dumps(rows).encode())
+        self.connection.execute(
+            'INSERT OR REPLACE INTO name_tables VALUES (?, ?, ?, ?, ?, ?)',
+            (filename, self.parser, size, mtime_ns, time.time(),
+             compressed_rows))
+
+    def evict(self) -> int:
+        """
+        Drops the least recently used tables until the cache fits within
+        max_bytes.
+
+        Returns:
+            int: The number of tables that were dropped.
+        """
+        entries = self.connection.execute(
+            'SELECT filename, parser, LENGTH(rows) FROM name_tables '
+            'ORDER BY last_used DESC').fetchall()
+        total_bytes = 0
+        evicted = []
+        for filename, parser, length in entries:
+            total_bytes += length
+            if total_bytes > self.max_bytes:
+                evicted.append((filename, parser))
+        self.connection.executemany(
+            'DELETE FROM name_tables WHERE filename = ? AND parser = ?',
+            evicted)
+        return len(evicted)
+
+    def clear(self):
+        self.connection.execute('DELETE FROM name_tables')
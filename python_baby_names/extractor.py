@@ -0,0 +1,182 @@
+import itertools
+import os
+import re
+
+import settings
+
+# The number of characters fed to the parser at a time.
+BLOCK_SIZE = 16 * 1024
+# In all cases, the data we need is in the 3rd table.
+TABLE_INDEX = 2
+# Matches the rank, male name and female name of a row of the names table.
+NAME_ROW_PATTERN = re.compile(r'<td>(\d+)</td><td>(\w+)</td>\<td>(\w+)</td>')
+
+
+class NameTableTarget:
+    """
+    A parser target for lxml.etree.HTMLParser that keeps only what the
+    reports need from a baby names page: the text of the first header of each
+    kind (for validate_title_year), and the column names and rows of the names
+    table. No tree is built.
+
+    The HTML files are missing most of their closing tr tags. libxml2 closes a
+    row when the next one starts, so a row is complete at its end event.
+    """
+
+    def __init__(self, header_tags: tuple, row_limit: int = None):
+        """
+        Args:
+            header_tags (tuple): The header tags whose text is kept, e.g. "h3".
+            row_limit (int): Stop once this many rows have been read. Defaults
+                to every row.
+        """
+        self.header_tags = header_tags
+        self.row_limit = row_limit
+        # Store the headers into a dict where the tag is the key and the text
+        # of its first occurrence is the value.
+        self.headers = {}
+        self.column_names = []
+        # 3-tuples of rank, male name, female name
+        self.rows = []
+        self.is_complete = False
+        # The number of characters of the file that were fed to the parser.
+        self.chars_read = 0
+
+        self.table_count = 0
+        # The depth of the tables that are open, where the names table is
+        # TABLE_INDEX + 1 when it's open.
+        self.table_depth = 0
+        self.names_table_depth = None
+        self.header_tag = None
+        self.cell_tag = None
+        self.text = []
+        self.cells = []
+
+    def start(self, tag: str, attrib: dict):
+        if tag == 'table':
+            self.table_depth += 1
+            if self.table_count == TABLE_INDEX:
+                self.names_table_depth = self.table_depth
+            self.table_count += 1
+        elif tag in self.header_tags and tag not in self.headers:
+            self.header_tag = tag
+            self.text = []
+        elif self.is_in_names_table():
+            if tag == 'tr':
+                self.cells = []
+            elif tag in ('th', 'td'):
+                self.cell_tag = tag
+                self.text = []
+
+    def end(self, tag: str):
+        if tag == 'table':
+            if self.table_depth == self.names_table_depth:
+                self.is_complete = True
+            self.table_depth -= 1
+        elif tag == self.header_tag:
+            self.headers[tag] = ''.join(self.text)
+            self.header_tag = None
+        elif self.is_in_names_table():
+            if tag == self.cell_tag:
+                self.cells.append((tag, ''.join(self.text).strip()))
+                self.cell_tag = None
+            elif tag == 'tr':
+                self.end_row()
+
+    def end_row(self):
+        tags = [tag for tag, text in self.cells]
+        values = [text for tag, text in self.cells]
+        if not self.column_names and set(tags) == {'th'}:
+            self.column_names = [value.lower() for value in values]
+        # Other rows, e.g. the note at the bottom, span the columns.
+        elif tags == ['td'] * len(settings.EXPECTED_COLUMN_ORDER):
+            self.rows.append(tuple(values))
+            if self.row_limit is not None and len(self.rows) >= self.row_limit:
+                self.is_complete = True
+
+    def data(self, data: str):
+        if self.header_tag or self.cell_tag:
+            self.text.append(data)
+
+    def close(self):
+        return self
+
+    def is_in_names_table(self) -> bool:
+        return (
+            self.names_table_depth is not None and
+            self.table_depth == self.names_table_depth and
+            not self.is_complete
+        )
+
+    def get_title_text(self) -> str:
+        """
+        Returns the text of the first header, in the order of header_tags.
+        """
+        for tag in self.header_tags:
+            if tag in self.headers:
+                return self.headers[tag]
+        return ''
+
+
+def read_name_table(html_file, header_tags: tuple = settings.HEADER_TAGS,
+                    row_limit: int = None) -> NameTableTarget:
+    """
+    Streams a baby names page through lxml's HTML parser, and stops reading
+    the file as soon as the names table (or row_limit rows of it) has been
+    read.
+
+    Args:
+        html_file: A file object opened in text mode.
+        header_tags (tuple): The header tags whose text is kept.
+        row_limit (int): The number of rows needed. Defaults to every row.
+
+    Returns:
+        NameTableTarget: The headers, column names and rows of the page.
+    """
+    # lxml is only imported once a file has to be parsed, rather than read
+    # from the cache.
+    from lxml import etree
+    target = NameTableTarget(header_tags, row_limit)
+    parser = etree.HTMLParser(target=target)
+    while not target.is_complete:
+        block = html_file.read(BLOCK_SIZE)
+        if not block:
+            parser.close()
+            break
+        target.chars_read += len(block)
+        parser.feed(block)
+    return target
+
+
+def read_name_file(filename: str, header_tags: tuple = settings.HEADER_TAGS,
+                   row_limit: int = None) -> NameTableTarget:
+    """
+    Opens an HTML file from the directory and reads its names table (see
+    read_name_table). Can run in a worker process.
+
+    Args:
+        filename (str): The name of the file.
+        header_tags (tuple): The header tags whose text is kept.
+        row_limit (int): The number of rows needed. Defaults to every row.
+
+    Returns:
+        NameTableTarget
+    """
+    with open(os.path.join(settings.RELATIVE_PATH, filename), 'r') as html_file:
+        return read_name_table(html_file, header_tags, row_limit)
+
+
+def find_name_rows(contents: str, row_limit: int = None) -> list:
+    """
+    Searches the text of an HTML file for the rows of its names table with a
+    regular expression. Unlike read_name_table, nothing is validated.
+
+    Args:
+        contents (str): The text of the HTML file.
+        row_limit (int): The number of rows needed. Defaults to every row.
+
+    Returns:
+        list: 3-tuples of rank, male name, female name
+    """
+    matches = NAME_ROW_PATTERN.finditer(contents)
+    return [match.groups() for match in itertools.islice(matches, row_limit)]
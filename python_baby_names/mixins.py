@@ -1,14 +1,31 @@
+import glob
+import io
 import os
+import sys
 
-from bs4 import Tag
-
+import cache
+import extractor
 import settings
 
+sys.path.insert(0, '')
+import pipeline
+import utils
+import writers
+
 
 class BabyNamesMixin:
 
     header_tags = settings.HEADER_TAGS
     excel_filename = ''
+    # "xlsx", "csv" or "parquet" (see settings.OUTPUT_FORMAT).
+    output_format = settings.OUTPUT_FORMAT
+    # "lxml" or "regex" (see settings.PARSER).
+    parser = settings.PARSER
+    use_cache = settings.USE_CACHE
+    # Parse the files with a pipeline of threads (see pipeline_name_rows).
+    use_pipeline = settings.USE_PIPELINE
+    # Replaced with a utils.Metrics while a report is measured (see utils.timer).
+    metrics = utils.NullMetrics()
 
     def get_output_path(self, file_dunder: str) -> str:
         """
@@ -30,10 +47,55 @@ class BabyNamesMixin:
             os.path.dirname(os.path.abspath(file_dunder)) + '\\' + excel_filename)
         return output_path
 
+    def open_report(self, file_dunder: str,
+                    sheet_name: str = '') -> writers.ReportWriter:
+        """
+        Opens a writer for the report in the output_format (see
+        get_output_path for where it's created).
+
+        Args:
+            file_dunder (str):
+                The __file__ value that's available in every Python file.
+            sheet_name (str): The name of the Excel worksheet.
+
+        Returns:
+            writers.ReportWriter
+        """
+        return writers.ReportWriter(
+            self.get_output_path(file_dunder), self.output_format, sheet_name)
+
+    def get_file_path(self, filename: str) -> str:
+        """
+        Returns the path of an input file. The filenames from a directory are
+        relative to RELATIVE_PATH and the ones matched by INPUT_PATTERNS are
+        absolute paths.
+        """
+        return os.path.join(settings.RELATIVE_PATH, filename)
+
+    def list_input_files(self) -> list:
+        """
+        Returns the filenames in RELATIVE_PATH, or the absolute paths of the
+        files matched by INPUT_PATTERNS if any are set.
+
+        Returns:
+            list
+        """
+        if not settings.INPUT_PATTERNS:
+            return os.listdir(settings.RELATIVE_PATH)
+        paths = set()
+        for pattern in settings.INPUT_PATTERNS:
+            # A directory stands for every file in it.
+            if os.path.isdir(pattern):
+                pattern = os.path.join(pattern, '*')
+            paths.update(
+                os.path.abspath(path) for path in glob.glob(pattern)
+                if os.path.isfile(path))
+        return sorted(paths)
+
     def get_filename_info(self) -> tuple:
         """
         Returns a 2-tuple of filenames within the directory and the years that
-        are within those filenames.
+        are within those filenames, sorted by year.
 
         Returns:
             tuple: filenames, available_years
@@ -42,17 +104,20 @@ class BabyNamesMixin:
 
         # Put the HTML filenames into a list.
         filenames = []
-        filenames_in_dir = os.listdir(settings.RELATIVE_PATH)
+        with self.metrics.phase('list_files'):
+            filenames_in_dir = sorted(
+                self.list_input_files(), key=os.path.basename)
         prefix_len = len(settings.FILENAME_PREFIX)
         file_type_len = len(settings.FILE_TYPE)
 
         for filename in filenames_in_dir:
-            prefix2 = filename[:prefix_len]
-            file_type2 = filename[-file_type_len:]
+            basename = os.path.basename(filename)
+            prefix2 = basename[:prefix_len]
+            file_type2 = basename[-file_type_len:]
             # Make sure the files are actually the ones we need.
             if settings.FILENAME_PREFIX == prefix2 and settings.FILE_TYPE == file_type2:
                 # Get the year from the middle of the string.
-                year = filename[prefix_len: -file_type_len]
+                year = basename[prefix_len: -file_type_len]
                 # If there are any non-digit characters, it means that the
                 # filename is not in the correct format.
                 assert year.isdigit(), (
@@ -63,58 +128,216 @@ class BabyNamesMixin:
 
         return filenames, available_years
 
-    def validate_year(self, year: int, soup):
+    def validate_title_year(self, year: str, title_text: str):
         """
-        Validates that the year in the HTML file is the same as the year in the
-        file's name.
+        Validates that the year at the end of the page's title is the same as
+        the year in the file's name.
 
         Args:
-            year (int)
-            soup (BeautifulSoup)
+            year (str)
+            title_text (str): e.g. "Popularity in 1990"
         """
-        for tag in self.header_tags:
-            title_el = soup.select_one(tag)
-            try:
-                title_text = title_el.text
-                break
-            except AttributeError:
-                continue
-
         year_in_title = title_text[-4:]
         assert year_in_title.isdigit() and len(year_in_title) == 4, (
             f'Did not extract a valid year from the HTML. Instead got ({year_in_title}).')
         assert year_in_title == year, (
             f'Year "{year_in_title}" != "{year}"')
 
-    def get_table(self, soup, filename: str):
+    def validate_column_order(self, actual_column_order: list, filename: str):
         """
-        Finds the correct table within BeautifulSoup object and validates it
-        before it is returned.
+        Validates that the names table's columns are in the expected order.
 
         Args:
-            soup (BeautifulSoup): The soup of the entire page.
+            actual_column_order (list): The lowercase text of each header
+                cell of the table.
             filename (str): The name of the file.
+        """
+        assert settings.EXPECTED_COLUMN_ORDER == actual_column_order, (
+            f'File "{filename}" does not have the expected column order.')
+
+    def read_name_table(self, filename: str, year: str,
+                        row_limit: int = None):
+        """
+        Streams the rows of the names table out of an HTML file without
+        building the whole page, and validates the page (see
+        validate_name_table).
+
+        Args:
+            filename (str): The name of the file.
+            year (str): The year in the file's name.
+            row_limit (int): Stop reading the file once this many rows have
+                been read. Defaults to every row.
 
         Returns:
-            BeautifulSoup: The HTML table element within the soup.
+            extractor.NameTableTarget: Its rows are 3-tuples of rank (str),
+                male name, female name.
         """
-        # In all cases, the data we need is in the 3rd table.
-        table = soup.find_all('table')[2]
-        self.validate_table_columns(table, filename)
+        table = extractor.read_name_file(filename, self.header_tags, row_limit)
+        self.validate_name_table(table, filename, year)
         return table
 
-    def validate_table_columns(self, table, filename: str):
+    def validate_name_table(self, table, filename: str, year: str):
+        """
+        Validates that a table from extractor.read_name_table is from the
+        year in the file's name and has the expected columns.
+        """
+        self.validate_title_year(year, table.get_title_text())
+        self.validate_column_order(table.column_names, filename)
+
+    def read_name_tables(self, filenames: list, years: list,
+                         row_limit: int = None, workers: int = 1) -> list:
         """
-        Validates that the table's columns are in the expected order.
+        Reads the names table of every file (see read_name_table). Parsing is
+        CPU bound, so with more than one worker the files are parsed in a pool
+        of processes.
 
         Args:
-            table (BeautifulSoup): The table object found in the HTML file.
-            filename (str): The name of the file.
+            filenames (list)
+            years (list): The year in each file's name.
+            row_limit (int): The number of rows needed from each file.
+            workers (int): The number of processes that parse the files.
+
+        Returns:
+            list: An extractor.NameTableTarget for each file, in the same
+                order as filenames.
         """
-        table_header = table.select_one('tr')
-        actual_column_order = []
-        for th in table_header:
-            if isinstance(th, Tag):
-                actual_column_order.append(th.text.lower())
-        assert settings.EXPECTED_COLUMN_ORDER == actual_column_order, (
-            f'File "{filename}" does not have the expected column order.')
+        if workers <= 1 or len(filenames) <= 1:
+            return [
+                self.read_name_table(filename, year, row_limit)
+                for filename, year in zip(filenames, years)
+            ]
+
+        # Hand each worker several files at a time so that the pool's
+        # overhead doesn't outweigh parsing a single small file. The workers
+        # only parse, so the results are validated here.
+        chunksize = max(1, len(filenames) // (workers * 4))
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tables = list(executor.map(
+                extractor.read_name_file, filenames,
+                [self.header_tags] * len(filenames),
+                [row_limit] * len(filenames),
+                chunksize=chunksize))
+        for filename, year, table in zip(filenames, years, tables):
+            self.validate_name_table(table, filename, year)
+        return tables
+
+    def parse_name_rows(self, filenames: list, years: list,
+                        row_limit: int = None, workers: int = 1) -> list:
+        """
+        Parses the rows of the names table out of every file with the
+        script's parser.
+
+        Args:
+            filenames (list)
+            years (list): The year in each file's name.
+            row_limit (int): The number of rows needed from each file.
+            workers (int): The number of processes that parse the files. Only
+                used by the "lxml" parser.
+
+        Returns:
+            list: A list of 3-tuples of rank, male name, female name for each
+                file, in the same order as filenames.
+        """
+        assert self.parser in ('lxml', 'regex'), (
+            f'Unknown parser "{self.parser}".')
+        if self.use_pipeline and workers <= 1:
+            return self.pipeline_name_rows(filenames, years, row_limit)
+        if self.parser == 'regex':
+            all_rows = []
+            for filename in filenames:
+                with open(self.get_file_path(filename), 'r') as html_file:
+                    contents = html_file.read()
+                self.metrics.add(len(contents))
+                all_rows.append(extractor.find_name_rows(contents, row_limit))
+            return all_rows
+
+        tables = self.read_name_tables(filenames, years, row_limit, workers)
+        for table in tables:
+            self.metrics.add(table.chars_read)
+        return [table.rows for table in tables]
+
+    def pipeline_name_rows(self, filenames: list, years: list,
+                           row_limit: int = None) -> list:
+        """
+        Parses the rows of the names table out of every file with a
+        pipeline.Pipeline. Reader threads read whole files while parser
+        threads parse the files that have been read, and the tables are
+        validated here in the order of the files.
+
+        Args:
+            filenames (list)
+            years (list): The year in each file's name.
+            row_limit (int): The number of rows needed from each file.
+
+        Returns:
+            list: A list of 3-tuples of rank, male name, female name for each
+                file, in the same order as filenames.
+        """
+        def read_file(filename: str):
+            with open(self.get_file_path(filename), 'r') as html_file:
+                yield html_file.read()
+
+        def parse_file(filename: str, contents: str) -> tuple:
+            if self.parser == 'regex':
+                table = extractor.find_name_rows(contents, row_limit)
+            else:
+                table = extractor.read_name_table(
+                    io.StringIO(contents), self.header_tags, row_limit)
+            return len(contents), table
+
+        name_pipeline = pipeline.Pipeline(
+            read_file, parse_file, settings.PIPELINE_READERS,
+            settings.PIPELINE_PARSERS, settings.PIPELINE_QUEUE_SIZE,
+            self.metrics)
+        years_by_filename = dict(zip(filenames, years))
+        all_rows = []
+        for filename, (size, table) in name_pipeline.run(filenames):
+            self.metrics.add(size)
+            if self.parser == 'regex':
+                all_rows.append(table)
+            else:
+                self.validate_name_table(
+                    table, filename, years_by_filename[filename])
+                all_rows.append(table.rows)
+        return all_rows
+
+    def get_name_rows(self, filenames: list, years: list,
+                      row_limit: int = None, workers: int = 1) -> list:
+        """
+        Returns the rows of the names table of every file. Tables are read
+        from the cache (see cache.py) when the file hasn't changed, and the
+        rest are parsed and added to the cache. The whole table is cached, so
+        that a later report that needs more rows doesn't parse the file again.
+
+        Args:
+            filenames (list)
+            years (list): The year in each file's name.
+            row_limit (int): The number of rows needed from each file.
+            workers (int): The number of processes that parse the files.
+
+        Returns:
+            list: A list of 3-tuples of rank, male name, female name for each
+                file, in the same order as filenames.
+        """
+        if not self.use_cache:
+            with self.metrics.phase('parse'):
+                return self.parse_name_rows(filenames, years, row_limit, workers)
+
+        with cache.NameTableCache(parser=self.parser) as name_cache:
+            with self.metrics.phase('read_cache'):
+                all_rows = [name_cache.get(filename) for filename in filenames]
+            missing = [
+                index for index, rows in enumerate(all_rows) if rows is None]
+            if missing:
+                with self.metrics.phase('parse'):
+                    parsed_rows = self.parse_name_rows(
+                        [filenames[index] for index in missing],
+                        [years[index] for index in missing],
+                        workers=workers)
+                with self.metrics.phase('write_cache'):
+                    for index, rows in zip(missing, parsed_rows):
+                        all_rows[index] = rows
+                        name_cache.put(filenames[index], rows)
+                    name_cache.evict()
+        return [rows[:row_limit] for rows in all_rows]
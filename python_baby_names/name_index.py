@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import sys
+
+import mixins
+import settings
+
+MALE = 'male'
+FEMALE = 'female'
+
+
+class NameIndex(mixins.BabyNamesMixin):
+    """
+    A persistent inverted index of the HTML files, where each name points to
+    its rank in every year and for each sex it was ranked.
+
+    The index is stored in a SQLite table that's clustered by name, so the
+    rankings of N names are read in O(N x years) without looking at the HTML
+    files (or the parsed tables) again. update() only indexes the files that
+    were added or changed since the last update. Every rank records the file
+    that it came from, since INPUT_PATTERNS can match two files of the same
+    year (e.g. in two directories).
+
+    Example:
+        with NameIndex() as name_index:
+            name_index.update()
+            rankings = name_index.get_rankings(['Ryan', 'Ben'])
+    """
+
+    def __init__(self, path: str = '', workers: int = 1):
+        """
+        Args:
+            path (str): The SQLite file. Defaults to INDEX_FILENAME inside
+                RELATIVE_PATH.
+            workers (int): The number of processes that parse the files that
+                need to be indexed.
+        """
+        self.path = path or (
+            f'{settings.RELATIVE_PATH}/{settings.INDEX_FILENAME}')
+        self.workers = workers
+        self.connection = sqlite3.connect(self.path)
+        columns = [
+            column[1] for column in self.connection.execute(
+                'PRAGMA table_info(name_ranks)')]
+        # An index from before the ranks recorded their file can't drop a
+        # single file's ranks, so it's rebuilt.
+        if columns and 'filename' not in columns:
+            self.connection.execute('DROP TABLE name_ranks')
+            self.connection.execute('DROP TABLE IF EXISTS indexed_files')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS indexed_files ('
+            ' filename TEXT PRIMARY KEY,'
+            ' year TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' mtime_ns INTEGER NOT NULL'
+            ')'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS name_ranks ('
+            ' name TEXT NOT NULL,'
+            ' sex TEXT NOT NULL,'
+            ' year TEXT NOT NULL,'
+            ' rank INTEGER NOT NULL,'
+            ' filename TEXT NOT NULL,'
+            ' PRIMARY KEY (name, sex, year, filename)'
+            ') WITHOUT ROWID'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS name_ranks_filename'
+            ' ON name_ranks (filename)'
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def get_file_key(self, filename: str) -> tuple:
+        stat = os.stat(self.get_file_path(filename))
+        return stat.st_size, stat.st_mtime_ns
+
+    def update(self) -> list:
+        """
+        Indexes the files that are new or have changed since they were
+        indexed, and drops the files that no longer exist.
+
+        Returns:
+            list: The filenames that were indexed.
+        """
+        filenames, available_years = self.get_filename_info()
+        indexed_files = {
+            filename: (year, (size, mtime_ns))
+            for filename, year, size, mtime_ns in self.connection.execute(
+                'SELECT filename, year, size, mtime_ns FROM indexed_files')
+        }
+
+        stale_filenames = []
+        stale_years = []
+        for filename, year in zip(filenames, available_years):
+            indexed = indexed_files.get(filename)
+            if indexed is None or indexed[1] != self.get_file_key(filename):
+                stale_filenames.append(filename)
+                stale_years.append(year)
+        removed_filenames = set(indexed_files) - set(filenames)
+
+        for filename in removed_filenames | set(stale_filenames):
+            if filename in indexed_files:
+                self.connection.execute(
+                    'DELETE FROM name_ranks WHERE filename = ?', (filename,))
+                self.connection.execute(
+                    'DELETE FROM indexed_files WHERE filename = ?',
+                    (filename,))
+
+        all_rows = self.get_name_rows(
+            stale_filenames, stale_years, workers=self.workers)
+        for filename, year, rows in zip(stale_filenames, stale_years, all_rows):
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO name_ranks VALUES (?, ?, ?, ?, ?)',
+                self.iter_name_ranks(filename, year, rows))
+            self.connection.execute(
+                'INSERT INTO indexed_files VALUES (?, ?, ?, ?)',
+                (filename, year, *self.get_file_key(filename)))
+        self.connection.commit()
+        return stale_filenames
+
+    def iter_name_ranks(self, filename: str, year: str, rows: list):
+        """
+        Yields a (name, sex, year, rank, filename) row of the index for each
+        name in a file's table.
+        """
+        for rank, male_name, female_name in rows:
+            yield male_name, MALE, year, int(rank), filename
+            yield female_name, FEMALE, year, int(rank), filename
+
+    def get_years(self) -> list:
+        """
+        Returns the years that are indexed, in order.
+        """
+        return [
+            year for year, in self.connection.execute(
+                'SELECT DISTINCT year FROM indexed_files ORDER BY year')
+        ]
+
+    def get_rankings(self, names, sex: str = '') -> dict:
+        """
+        Returns the rankings of the names over every indexed year.
+
+        Args:
+            names: An iterable of names (any number of them).
+            sex (str): MALE or FEMALE to only include that sex's rankings.
+                Defaults to both.
+
+        Returns:
+            dict: Each name is the key and a list of 3-tuples of year, rank,
+                sex sorted by year is the value. A name that was never ranked
+                has an empty list.
+        """
+        assert sex in ('', MALE, FEMALE), f'Unknown sex "{sex}".'
+        rankings = {name: [] for name in names}
+
+        # Joining against a temporary table of the names avoids SQLite's
+        # limit on the number of parameters in a query. CROSS JOIN makes
+        # SQLite look each name up in the index rather than scan the index.
+        self.connection.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS query_names '
+            '(name TEXT PRIMARY KEY)')
+        self.connection.execute('DELETE FROM query_names')
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO query_names VALUES (?)',
+            ((name,) for name in rankings))
+        query = (
+            'SELECT name_ranks.name, year, rank, sex FROM query_names '
+            'CROSS JOIN name_ranks ON name_ranks.name = query_names.name'
+        )
+        parameters = ()
+        if sex:
+            query += ' WHERE sex = ?'
+            parameters = (sex,)
+        for name, year, rank, name_sex in self.connection.execute(
+                query, parameters):
+            rankings[name].append((year, rank, name_sex))
+
+        for name_rankings in rankings.values():
+            name_rankings.sort()
+        return rankings
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or ['Ryan', 'Ben', 'Eugene']
+    with NameIndex() as name_index:
+        indexed = name_index.update()
+        print(f'Indexed {len(indexed)} file(s).')
+        for name, name_rankings in name_index.get_rankings(names).items():
+            print(name, name_rankings)
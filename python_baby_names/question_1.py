@@ -1,8 +1,5 @@
 import sys
 
-import xlsxwriter
-from bs4 import BeautifulSoup
-
 import mixins
 import settings
 
@@ -19,17 +16,22 @@ class Script(mixins.BabyNamesMixin):
     names for each year for both males and females.
     """
 
-    def __init__(self, name_quantity_needed: int, excel_filename: str = ''):
+    def __init__(self, name_quantity_needed: int, excel_filename: str = '',
+                 output_format: str = ''):
         if excel_filename:
             assert excel_filename[-5:] == '.xlsx', (
                 'The excel_filename must end with ".xlsx"')
         self.excel_filename = excel_filename
+        self.output_format = output_format or settings.OUTPUT_FORMAT
         self.name_quantity_needed = name_quantity_needed
 
     @timer
-    def execute_report(self):
+    def execute_report(self, workers: int = 1):
         """
         Executes the script to create a report in Excel format.
+
+        Args:
+            workers (int): The number of processes that parse the files.
         """
         print()
 
@@ -49,74 +51,43 @@ class Script(mixins.BabyNamesMixin):
         filenames, available_years = self.get_filename_info()
 
         # Gather the data from the files.
-        for index, filename in enumerate(filenames):
-            html_file = open(f'{settings.RELATIVE_PATH}/{filename}', 'r')
-            contents = html_file.read()
-
-            soup = BeautifulSoup(contents, 'lxml')
-            year = available_years[index]
-            self.validate_year(year, soup)
-            table = self.get_table(soup, filename)
-
-            # Find all the rows in the table.
-            # The first row is the header, so skip it.
-            shift = 1
-            rows = table.find_all('tr')[shift: self.name_quantity_needed + shift]
-
-            male_names = []
-            female_names = []
-            for row in rows:
-                # For most of the HTML files, the table rows are missing the
-                # closing tr tags, so I am calling "next" until I get the
-                # correct element.
-                tag = row.next.next.next
-                male_name = tag.text.strip()
-                male_names.append(male_name)
-                female_name = tag.next_sibling.text.strip()
-                female_names.append(female_name)
-
-            report[male_name_key][year] = male_names
-            report[female_name_key][year] = female_names
-            html_file.close()
-
-        self.save_to_excel(report)
+        all_rows = self.get_name_rows(
+            filenames, available_years, self.name_quantity_needed, workers)
+
+        for year, rows in zip(available_years, all_rows):
+            with self.metrics.phase('aggregate'):
+                male_names = []
+                female_names = []
+                for rank, male_name, female_name in rows:
+                    male_names.append(male_name)
+                    female_names.append(female_name)
+
+                report[male_name_key][year] = male_names
+                report[female_name_key][year] = female_names
+            self.metrics.add(messages=len(rows))
+
+        with self.metrics.phase('write_excel'):
+            self.save_to_excel(report)
 
     def save_to_excel(self, report):
-        # Create a workbook and add a worksheet.
-        output_path = self.get_output_path(__file__)
-        workbook = xlsxwriter.Workbook(output_path)
-        worksheet = workbook.add_worksheet()
-
-        # Start from the first cell. Rows and columns are zero indexed.
-        row = 0
-        col = 0
-
-        # Iterate over the data and write it out row by row.
-
-        # Write the header row.
-        worksheet.write(row, col, 'Year')
-        rank_list = [i + 1 for i in range(self.name_quantity_needed)]
-        for rank in rank_list:
-            col += 1
-            worksheet.write(row, col, 'Rank ' + str(rank))
-
-        first_col = 0
-
-        for mf, year_list in report.items():
-            row += 1
-            # Write a row saying whether this list will be males or females.
-            worksheet.write(row, first_col, mf)
-            row += 1
-
-            # Write a row for each name.
-            for year, name_list in year_list.items():
-                worksheet.write(row, first_col, year)
-                for i, name in enumerate(name_list):
-                    worksheet.write(row, i + 1, name)
-                row += 1
-
-        workbook.close()
-        print(f'Created: {output_path}')
+        with self.open_report(__file__) as writer:
+            # Write the header row.
+            rank_list = [i + 1 for i in range(self.name_quantity_needed)]
+            writer.start_table(
+                ['Year'] + ['Rank ' + str(rank) for rank in rank_list])
+
+            for i, (mf, year_list) in enumerate(report.items()):
+                # Leave a blank row between the males and the females.
+                if i:
+                    writer.write_row([])
+                # Write a row saying whether this list will be males or
+                # females.
+                writer.write_row([mf])
+
+                # Write a row for each year.
+                writer.write_rows(
+                    [year] + name_list for year, name_list in year_list.items())
+        print(f'Created: {", ".join(writer.output_paths)}')
 
 
 if __name__ == '__main__':
@@ -1,8 +1,6 @@
+import itertools
 import sys
 
-import pandas as pd
-from bs4 import BeautifulSoup
-
 import mixins
 import settings
 
@@ -24,101 +22,150 @@ class Script(mixins.BabyNamesMixin):
     """
 
     def __init__(self, names_in_report: tuple, excel_filename: str = '',
-                 excel_sheetname: str = ''):
+                 excel_sheetname: str = '', output_format: str = ''):
         if excel_filename:
             assert excel_filename[-5:] == '.xlsx', (
                 'The excel_filename must end with ".xlsx"')
         self.excel_filename = excel_filename
+        self.output_format = output_format or settings.OUTPUT_FORMAT
         self.names_in_report = names_in_report
         self.excel_sheetname = excel_sheetname
 
     @timer
-    def execute_report(self):
+    def execute_report(self, workers: int = 1):
         """
         Executes the script to create a report in Excel format.
+
+        Args:
+            workers (int): The number of processes that parse the files.
         """
         print()
 
-        male_df, female_df = self.get_empty_dataframes()
         filenames, available_years = self.get_filename_info()
 
         # Gather the data from the files.
-        for index, filename in enumerate(filenames):
-            html_file = open(f'{settings.RELATIVE_PATH}/{filename}', 'r')
-            contents = html_file.read()
-            year = available_years[index]
-            soup = BeautifulSoup(contents, 'lxml')
-            self.validate_year(year, soup)
-            table = self.get_table(soup, filename)
-            rows = table.find_all('tr', attrs={'align': 'right'})
-
-            # Store data into a dict where the name is the key and the name's
-            # rank as the value.
-            male_names = {}
-            female_names = {}
-            for row in rows:
-                # For most of the HTML files, the table rows are missing the
-                # closing tr tags, so I am calling "next" until I get the
-                # correct element.
-                rank_el = row.next.next
-                rank_num = int(str(rank_el))
-                tag = rank_el.next
-                male_name = tag.text.strip()
-                male_names[male_name] = rank_num
-                female_name = tag.next_sibling.text.strip()
-                female_names[female_name] = rank_num
-
-            # Append a new row to the male's table.
-            male_df.loc[len(male_df.index)] = \
-                self.get_all_row_data(male_names, [year])
-
-            # Append a new row to the female's table.
-            female_df.loc[len(female_df.index)] = \
-                self.get_all_row_data(female_names, [year])
-
-            html_file.close()
-
-        self.save_to_excel(male_df, female_df)
-
-    def get_empty_dataframes(self) -> tuple:
-        header_2 = ['Year'] + list(self.names_in_report)
-
-        # Instantiate the table/dataframe for males.
-        male_df = pd.DataFrame(columns=header_2)
-        header_1 = ['Male Name Rankings Per Year'] + len(self.names_in_report) * ['']
-        male_df.columns = pd.MultiIndex.from_tuples(zip(header_1, header_2))
-
-        # Instantiate the table/dataframe for females.
-        female_df = pd.DataFrame(columns=header_2)
-        header_1 = ['Female Name Rankings Per Year'] + len(self.names_in_report) * ['']
-        female_df.columns = pd.MultiIndex.from_tuples(zip(header_1, header_2))
-
-        return male_df, female_df
-
-    def get_all_row_data(self, names: dict, new_row_data: list = []) -> list:
-        for name in self.names_in_report:
-            try:
-                rank = names[name]
-            except KeyError:
-                rank = 'N/A'
-            new_row_data.append(rank)
-        return new_row_data
+        all_rows = self.get_name_rows(
+            filenames, available_years, workers=workers)
+        self.metrics.add(messages=sum(len(rows) for rows in all_rows))
+
+        with self.metrics.phase('aggregate'):
+            ranks = self.get_ranks(available_years, all_rows)
+            male_df = self.get_dataframe(
+                'Male Name Rankings Per Year', ranks, 'male', available_years)
+            female_df = self.get_dataframe(
+                'Female Name Rankings Per Year', ranks, 'female', available_years)
+
+        with self.metrics.phase('write_excel'):
+            self.save_to_excel(male_df, female_df)
+
+    def get_ranks(self, years: list, all_rows: list):
+        """
+        Returns the rank of each name in the report for each sex and year, as
+        a long format table with a row per rank that was found.
+
+        Every year's rows are loaded into a single DataFrame at once rather
+        than looked up name by name, so the report scales to many years and
+        names.
+
+        Args:
+            years (list)
+            all_rows (list): A list of 3-tuples of rank, male name, female
+                name for each year (see get_name_rows).
+
+        Returns:
+            pandas.DataFrame: The columns are "year", "sex", "name" and "rank".
+        """
+        # pandas is only imported once the report is built, so that importing
+        # this module (e.g. for its constants) stays fast.
+        import numpy as np
+        import pandas as pd
+        table = pd.DataFrame.from_records(
+            itertools.chain.from_iterable(all_rows),
+            columns=['rank', 'male', 'female'])
+        table['year'] = np.repeat(years, [len(rows) for rows in all_rows])
+        ranks = table.melt(
+            id_vars=['year', 'rank'], value_vars=['male', 'female'],
+            var_name='sex', value_name='name')
+        ranks = ranks[ranks['name'].isin(self.names_in_report)]
+        ranks = ranks.astype({'rank': int})
+        # If a name is in a year's table twice, keep the last rank like a dict
+        # would.
+        return ranks.drop_duplicates(['year', 'sex', 'name'], keep='last')
+
+    def get_dataframe(self, title: str, ranks, sex: str, years: list):
+        """
+        Pivots the ranks of one sex into a table with a row per year and a
+        column per name in the report. Names that aren't ranked in a year are
+        "N/A".
+
+        Args:
+            title (str): The header above the "Year" column.
+            ranks (pandas.DataFrame): See get_ranks.
+            sex (str): "male" or "female"
+            years (list)
+
+        Returns:
+            pandas.DataFrame
+        """
+        import numpy as np
+        import pandas as pd
+        names = list(self.names_in_report)
+        sex_ranks = ranks[ranks['sex'] == sex]
+        table = (
+            sex_ranks.pivot(index='year', columns='name', values='rank')
+            .reindex(index=years, columns=names)
+            .to_numpy(dtype=float)
+        )
+        is_missing = np.isnan(table)
+
+        # Build the cells as a single array, so the DataFrame is one block
+        # however many names there are.
+        data = np.empty((len(years), len(names) + 1), dtype=object)
+        data[:, 0] = years
+        data[:, 1:] = np.where(is_missing, 0, table).astype(np.int64)
+        data[:, 1:][is_missing] = 'N/A'
+
+        header_1 = [title] + len(names) * ['']
+        header_2 = ['Year'] + names
+        return pd.DataFrame(
+            data, columns=pd.MultiIndex.from_tuples(zip(header_1, header_2)))
 
     def save_to_excel(self, *dataframes):
+        if self.output_format != 'xlsx':
+            self.save_tables(*dataframes)
+            return
+
+        # The report has a row per year, so it's small enough for pandas to
+        # write in one go (pandas writes column by column, which xlsxwriter's
+        # constant_memory mode doesn't allow).
+        import pandas as pd
         output_path = self.get_output_path(__file__)
-        writer = pd.ExcelWriter(output_path, engine='xlsxwriter')
-        row = 0
-        for df in dataframes:
-            df.to_excel(
-                writer,
-                sheet_name=self.excel_sheetname,
-                startrow=row,
-                startcol=0,
-            )
-            row = row + len(df.index) + 2
-        writer.save()
+        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
+            row = 0
+            for df in dataframes:
+                df.to_excel(
+                    writer,
+                    sheet_name=self.excel_sheetname,
+                    startrow=row,
+                    startcol=0,
+                )
+                row = row + len(df.index) + 2
         print(f'Created: {output_path}')
 
+    def save_tables(self, *dataframes):
+        """
+        Writes the DataFrames as tables in the "csv" or "parquet"
+        output_format, with the title of each one as the name of its table.
+        """
+        with self.open_report(__file__) as writer:
+            for df in dataframes:
+                title = df.columns[0][0]
+                writer.start_table(
+                    list(df.columns.get_level_values(1)),
+                    title.lower().replace(' ', '_'))
+                writer.write_rows(df.itertuples(index=False))
+        print(f'Created: {", ".join(writer.output_paths)}')
+
 
 if __name__ == '__main__':
     script = Script(NAMES_IN_REPORT, excel_sheetname=EXCEL_SHEETNAME)
@@ -6,6 +6,11 @@ FILE_TYPE = '.html'
 # Must be lowercase.
 EXPECTED_COLUMN_ORDER = ['rank', 'male name', 'female name']
 
+# INPUT_PATTERNS are directories or glob patterns of the input files, which are
+# read instead of RELATIVE_PATH when any are set (see the --input option of
+# python -m reports).
+INPUT_PATTERNS = []
+
 RELATIVE_PATH = './python_baby_names'
 
 
@@ -14,3 +19,32 @@ RELATIVE_PATH = './python_baby_names'
 # None use an h1 tag, but I am future proofing in case they use it
 # the future.
 HEADER_TAGS = ['h3', 'h2', 'h1']
+
+# PARSER is how the HTML files are read: "lxml" streams each file through
+# lxml's HTML parser, and "regex" searches the file's text with a regular
+# expression.
+PARSER = 'lxml'
+
+# The parsed table of every HTML file is cached in this SQLite file (inside
+# RELATIVE_PATH) until the HTML file changes.
+CACHE_FILENAME = '.names_cache.sqlite'
+USE_CACHE = True
+# The least recently used tables are dropped once the cache is bigger than this.
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# The name -> (year, rank, sex) index of every HTML file is kept in this
+# SQLite file (inside RELATIVE_PATH).
+INDEX_FILENAME = '.names_index.sqlite'
+
+# OUTPUT_FORMAT is the format of the reports by default: "xlsx" streams them to
+# an Excel file, "csv" to a CSV file and "parquet" to a Parquet file per table
+# (which needs pyarrow).
+OUTPUT_FORMAT = 'xlsx'
+
+# USE_PIPELINE runs the reports as a pipeline of threads (see pipeline.py):
+# PIPELINE_READERS threads read the input files, PIPELINE_PARSERS threads parse
+# what has been read, and up to PIPELINE_QUEUE_SIZE blocks wait between them.
+USE_PIPELINE = False
+PIPELINE_READERS = 1
+PIPELINE_PARSERS = 1
+PIPELINE_QUEUE_SIZE = 16
@@ -0,0 +1,18 @@
+import os
+
+import engine
+import question_1
+import question_2
+
+
+if __name__ == '__main__':
+    # Both reports are built from a single scan of the log files, which is
+    # split across every available core.
+    script = engine.ReportEngine(
+        [
+            question_1.OrderStatusAnalyzer(question_1.CATEGORIES_NEEDED),
+            question_2.ExecutionReportAnalyzer(question_2.SYMBOL_TAG),
+        ],
+        workers=os.cpu_count() or 1,
+    )
+    script.execute_report()
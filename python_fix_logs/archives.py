@@ -0,0 +1,134 @@
+import io
+import os
+
+import settings
+
+# The codec of each extension in settings.COMPRESSED_FILE_TYPES.
+CODECS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.zst': 'zstd',
+}
+
+
+def get_codec(filename: str) -> str:
+    """
+    Returns the codec of a compressed log file, e.g. "gzip", or an empty
+    string if the file isn't compressed.
+    """
+    extension = os.path.splitext(filename)[1]
+    if extension in settings.COMPRESSED_FILE_TYPES:
+        return CODECS[extension]
+    return ''
+
+
+def open_compressed(path: str):
+    """
+    Opens a compressed log file for reading its decompressed bytes.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        A file object opened in binary mode.
+    """
+    codec = get_codec(path)
+    assert codec, f'"{path}" is not a compressed log file.'
+    # Only the codec that's needed is imported.
+    if codec == 'gzip':
+        import gzip
+        return gzip.open(path, 'rb')
+    if codec == 'bz2':
+        import bz2
+        return bz2.open(path, 'rb')
+
+    try:
+        # Python 3.14 and later.
+        from compression import zstd
+        return zstd.open(path, 'rb')
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            'Reading ".zst" log files needs Python 3.14 or the zstandard '
+            'package.')
+    return zstandard.ZstdDecompressor().stream_reader(
+        open(path, 'rb'), closefd=True)
+
+
+def open_text(path: str):
+    """
+    Opens a compressed log file for reading its decompressed text.
+
+    Returns:
+        A file object opened in text mode.
+    """
+    return io.TextIOWrapper(open_compressed(path))
+
+
+def iter_lines(path: str, block_size: int = settings.READ_BUFFER_SIZE,
+               queue_size: int = settings.DECOMPRESS_QUEUE_SIZE):
+    """
+    Yields the lines of a compressed log file as str, without decompressing
+    it to disk.
+
+    A background thread decompresses the file a block at a time into a
+    bounded queue while the caller parses the blocks that are ready. The
+    codecs release the GIL while they decompress, so decompressing and
+    parsing overlap, and the queue stops the thread from getting more than
+    queue_size blocks ahead.
+
+    Args:
+        path (str): The path of the file.
+        block_size (int): The number of decompressed bytes in a block.
+        queue_size (int): The number of blocks that can wait to be parsed.
+    """
+    import queue
+    import threading
+
+    blocks = queue.Queue(maxsize=queue_size)
+    is_stopped = threading.Event()
+
+    def put(item) -> bool:
+        # Give up once the caller stops reading, rather than wait forever for
+        # room in the queue.
+        while not is_stopped.is_set():
+            try:
+                blocks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def decompress():
+        try:
+            with open_compressed(path) as compressed_file:
+                while True:
+                    block = compressed_file.read(block_size)
+                    if not put(block) or not block:
+                        return
+        except Exception as error:
+            put(error)
+
+    thread = threading.Thread(target=decompress, daemon=True)
+    thread.start()
+    remainder = b''
+    try:
+        while True:
+            block = blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                break
+            block = remainder + block
+            last_newline = block.rfind(b'\n') + 1
+            remainder = block[last_newline:]
+            for line in block[:last_newline].splitlines(keepends=True):
+                yield line.decode()
+        if remainder:
+            yield remainder.decode()
+    finally:
+        is_stopped.set()
+        thread.join()
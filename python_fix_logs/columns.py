@@ -0,0 +1,465 @@
+import os
+
+import numpy as np
+
+import archives
+import mixins
+import settings
+
+# The columns stored in a sidecar, and the Tag that each one is read from.
+COLUMN_TAGS = {
+    'msg_type': settings.MSG_TYPE_TAG,
+    'sender_comp_id': '49',
+    'target_comp_id': '56',
+    'cl_ord_id': '11',
+    'orig_cl_ord_id': '41',
+    'ord_status': '39',
+    'symbol': '55',
+    'cum_qty': '14',
+    'side': '54',
+    'price': '44',
+}
+
+# The columns whose values are stored as str.
+STRING_COLUMNS = tuple(
+    column for column in COLUMN_TAGS if column not in ('cum_qty', 'price'))
+
+# The value stored when a message doesn't have the Tag of a numeric column.
+MISSING_QTY = -1
+
+NEWLINE = ord('\n')
+DELIMITER = ord(settings.DELIMITER)
+EQUALS = ord('=')
+
+# The byte of a log timestamp (e.g. "20130808-13:28:57.009") at each position
+# of its ISO 8601 form (e.g. "2013-08-08T13:28:57.009"), or a byte of its own
+# where the forms differ.
+ISO_TIMESTAMP_BYTES = (
+    0, 1, 2, 3, b'-', 4, 5, b'-', 6, 7, b'T',
+    9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20,
+)
+
+
+def to_datetime64(timestamp: str) -> str:
+    """
+    Converts a log timestamp (e.g. "20130808-13:28:57.009") into the ISO 8601
+    format that NumPy understands (e.g. "2013-08-08T13:28:57.009").
+    """
+    return (
+        f'{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]}T{timestamp[9:]}')
+
+
+def count_values(values) -> dict:
+    """
+    Returns a dict where each unique value is the key and the number of times
+    it occurs is the value.
+
+    Args:
+        values (numpy.ndarray)
+
+    Returns:
+        dict
+    """
+    unique_values, counts = np.unique(values, return_counts=True)
+    return dict(zip(unique_values.tolist(), counts.tolist()))
+
+
+def group_max(keys, values) -> tuple:
+    """
+    Returns the unique keys and the max value for each of them.
+
+    Args:
+        keys (numpy.ndarray)
+        values (numpy.ndarray)
+
+    Returns:
+        tuple: unique_keys, max_values
+    """
+    if not len(keys):
+        return keys, values
+    # Sort by key and then by value, so the last row of each key has its max.
+    order = np.lexsort((values, keys))
+    keys = keys[order]
+    values = values[order]
+    is_last = np.append(keys[1:] != keys[:-1], True)
+    return keys[is_last], values[is_last]
+
+
+def group_last(keys, values) -> tuple:
+    """
+    Returns the unique keys and the value from the last row of each of them.
+
+    Args:
+        keys (numpy.ndarray)
+        values (numpy.ndarray)
+
+    Returns:
+        tuple: unique_keys, last_values
+    """
+    # np.unique returns the first index of each key, so search the rows in
+    # reverse.
+    unique_keys, reversed_index = np.unique(keys[::-1], return_index=True)
+    return unique_keys, values[len(values) - 1 - reversed_index]
+
+
+def join_values(left, separator: str, right):
+    """
+    Joins two arrays of str element by element, with a separator between
+    them.
+
+    Returns:
+        numpy.ndarray
+    """
+    return np.char.add(np.char.add(left, separator), right)
+
+
+def map_values(values, function):
+    """
+    Applies a function to each unique value of an array rather than to every
+    row.
+
+    Args:
+        values (numpy.ndarray)
+        function: Takes and returns a single value.
+
+    Returns:
+        numpy.ndarray
+    """
+    if not len(values):
+        return values
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    mapped = np.array([function(value) for value in unique_values.tolist()])
+    return mapped[inverse]
+
+
+def is_new_key(keys):
+    """
+    Returns which rows of a sorted array hold a different key from the row
+    before them, i.e. the first row of each key.
+
+    Args:
+        keys (numpy.ndarray)
+
+    Returns:
+        numpy.ndarray: An array of bool.
+    """
+    is_new = np.ones(len(keys), dtype=bool)
+    is_new[1:] = keys[1:] != keys[:-1]
+    return is_new
+
+
+def get_tag_code(tag: str) -> int:
+    """
+    Returns the bytes of a Tag (e.g. "35") as a single int, so that the Tags
+    of many fields can be compared at once.
+    """
+    return int.from_bytes(tag.encode(), 'big')
+
+
+def get_values(data, starts, ends):
+    """
+    Returns the bytes of many ranges of a buffer at once, as the rows of a
+    matrix padded with zeros to the longest range.
+
+    Args:
+        data (numpy.ndarray): The buffer as uint8.
+        starts (numpy.ndarray): The first byte of each range.
+        ends (numpy.ndarray): The byte after the last byte of each range.
+
+    Returns:
+        numpy.ndarray: A 2-D array of uint8.
+    """
+    width = max(int((ends - starts).max()) if len(starts) else 0, 1)
+    positions = starts[:, None] + np.arange(width)
+    values = data[np.minimum(positions, len(data) - 1)]
+    values[positions >= ends[:, None]] = 0
+    return values
+
+
+def decode_values(values):
+    """
+    Converts the rows of get_values into an array of str. FIX values are
+    ASCII, so each byte is widened into a character of NumPy's UCS-4 str
+    dtype; anything else is decoded one value at a time.
+    """
+    width = values.shape[1]
+    if (values < 128).all():
+        return values.astype(np.uint32).view(f'U{width}').ravel()
+    return np.char.decode(values.view(f'S{width}').ravel(), 'utf-8')
+
+
+def parse_ints(values):
+    """
+    Converts the rows of get_values, which must be digits, into an array of
+    int64.
+    """
+    is_padding = values == 0
+    digits = values.astype(np.int64) - ord('0')
+    if not (is_padding | ((digits >= 0) & (digits <= 9))).all():
+        raise ValueError('A value is not an int.')
+    numbers = np.zeros(len(values), dtype=np.int64)
+    for index in range(values.shape[1]):
+        numbers = np.where(
+            is_padding[:, index], numbers, numbers * 10 + digits[:, index])
+    return numbers
+
+
+def parse_columns(block: bytes, offset: int = 0) -> dict:
+    """
+    Parses the messages of a block of a log file into the columns of a
+    sidecar, for thousands of messages at once.
+
+    The block is viewed as an array of uint8, and every delimiter, "=" and
+    newline is found in a single vectorized pass. The line, Tag and value of
+    every field of the block are then worked out together from those
+    positions, so no Python code runs per message or per field. Like
+    tokenizer.iter_raw_messages, a line is a message if Tag 35 is near its
+    beginning, and if a Tag appears more than once, the last one wins.
+
+    Args:
+        block (bytes): Whole lines of a log file.
+        offset (int): The byte offset of the block within its file.
+
+    Returns:
+        dict: The column name is the key and a numpy.ndarray is the value
+            (see ColumnStore).
+    """
+    data = np.frombuffer(block, dtype=np.uint8)
+    size = len(data)
+
+    marks = np.flatnonzero(
+        (data == DELIMITER) | (data == EQUALS) | (data == NEWLINE))
+    kinds = data[marks]
+    is_newline = kinds == NEWLINE
+    line_ends = marks[is_newline]
+    if size and data[-1] != NEWLINE:
+        line_ends = np.append(line_ends, size)
+    line_starts = np.zeros_like(line_ends)
+    line_starts[1:] = line_ends[:-1] + 1
+
+    # The first delimiter or newline from each mark on, which is where the
+    # value of a field ends.
+    value_ends = np.where(kinds == EQUALS, size, marks)
+    value_ends = np.minimum.accumulate(value_ends[::-1])[::-1]
+
+    # A field is a delimiter followed by a Tag and "=", so its delimiter's
+    # next mark is an "=".
+    is_field = np.zeros(len(marks), dtype=bool)
+    is_field[:-1] = (kinds[:-1] == DELIMITER) & (kinds[1:] == EQUALS)
+    field_marks = np.flatnonzero(is_field)
+    field_starts = marks[field_marks] + 1
+    tag_lengths = marks[field_marks + 1] - field_starts
+
+    # Read the bytes of each field's Tag as an int (see get_tag_code), and
+    # only keep the fields with the Tags of the columns.
+    tag_codes = np.full(len(field_marks), -1, dtype=np.int64)
+    for length in set(len(tag) for tag in COLUMN_TAGS.values()):
+        has_length = np.flatnonzero(tag_lengths == length)
+        codes = np.zeros(len(has_length), dtype=np.int64)
+        for index in range(length):
+            codes = codes * 256 + data[field_starts[has_length] + index]
+        tag_codes[has_length] = codes
+    is_column = np.isin(
+        tag_codes, [get_tag_code(tag) for tag in COLUMN_TAGS.values()])
+    field_marks = field_marks[is_column]
+    field_starts = field_starts[is_column]
+    tag_codes = tag_codes[is_column]
+    value_starts = marks[field_marks + 1] + 1
+    field_ends = value_ends[field_marks + 1]
+    lines = np.searchsorted(line_ends, field_starts)
+
+    def find_fields(tag: str):
+        # The fields with a Tag, in the order they occur.
+        return np.flatnonzero(tag_codes == get_tag_code(tag))
+
+    # A line is a message if its first Tag 35 is near its beginning.
+    msg_type_fields = find_fields(settings.MSG_TYPE_TAG)
+    msg_type_fields = msg_type_fields[is_new_key(lines[msg_type_fields])]
+    msg_type_tag_length = len(settings.DELIMITER + settings.MSG_TYPE_TAG + '=')
+    is_near = (
+        field_starts[msg_type_fields] - 1 + msg_type_tag_length <=
+        line_starts[lines[msg_type_fields]] + settings.START_INDEX * 2)
+    msg_type_fields = msg_type_fields[is_near]
+    message_lines = lines[msg_type_fields]
+    message_count = len(message_lines)
+
+    # The row of each line's message in the columns, or -1 if the line isn't
+    # a message.
+    rows = np.full(len(line_ends), -1, dtype=np.int64)
+    rows[message_lines] = np.arange(message_count)
+
+    columns = {}
+    for column, tag in COLUMN_TAGS.items():
+        if column == 'msg_type':
+            fields = msg_type_fields
+        else:
+            fields = find_fields(tag)
+            fields = fields[rows[lines[fields]] != -1]
+            # Keep the last field with the Tag in each message.
+            fields = fields[is_new_key(lines[fields][::-1])[::-1]]
+        column_rows = rows[lines[fields]]
+        values = get_values(data, value_starts[fields], field_ends[fields])
+        if column == 'cum_qty':
+            column_values = np.full(message_count, MISSING_QTY, dtype=np.int64)
+            column_values[column_rows] = parse_ints(values)
+        elif column == 'price':
+            column_values = np.full(message_count, np.nan, dtype=np.float64)
+            column_values[column_rows] = values.view(
+                f'S{values.shape[1]}').ravel().astype(np.float64)
+        else:
+            values = decode_values(values)
+            column_values = np.zeros(message_count, dtype=values.dtype)
+            column_values[column_rows] = values
+        columns[column] = column_values
+
+    # Rearrange the bytes of each timestamp into the ISO 8601 form that NumPy
+    # parses.
+    message_starts = line_starts[message_lines]
+    timestamps = np.empty(
+        (message_count, len(ISO_TIMESTAMP_BYTES)), dtype=np.uint8)
+    for index, source in enumerate(ISO_TIMESTAMP_BYTES):
+        if isinstance(source, bytes):
+            timestamps[:, index] = ord(source)
+        else:
+            timestamps[:, index] = data[message_starts + source]
+    columns['timestamp'] = timestamps.view(
+        f'S{len(ISO_TIMESTAMP_BYTES)}').ravel().astype('datetime64[ms]')
+    columns['offset'] = (message_starts + offset).astype(np.int64)
+    return columns
+
+
+def read_columns(reader, filename: str,
+                 block_size: int = settings.BATCH_SIZE) -> dict:
+    """
+    Parses a whole log file into columns, a block at a time (see
+    parse_columns).
+
+    Args:
+        reader (mixins.FixLogMixin): Reads the file, within its time range.
+        filename (str): The name of the log file.
+        block_size (int): The number of bytes parsed at a time.
+
+    Returns:
+        dict: The column name is the key and a numpy.ndarray is the value.
+    """
+    offset, _ = reader.get_time_offsets(filename)
+    blocks = []
+    for block in reader.iter_file_blocks(filename, block_size):
+        blocks.append(parse_columns(block, offset))
+        offset += len(block)
+    if not blocks:
+        blocks.append(parse_columns(b''))
+    return {
+        name: np.concatenate([columns[name] for columns in blocks])
+        for name in blocks[0]
+    }
+
+
+def select_time_range(sidecar: dict, time_from: str, time_to: str) -> dict:
+    """
+    Returns the rows of a sidecar whose timestamp is from time_from up to
+    (but not including) time_to.
+
+    Args:
+        sidecar (dict): The columns of a log file.
+        time_from (str): A full log timestamp, or an empty string.
+        time_to (str): A full log timestamp, or an empty string.
+
+    Returns:
+        dict: The same columns with only the rows in the time range.
+    """
+    timestamps = sidecar['timestamp']
+    rows = np.ones(len(timestamps), dtype=bool)
+    if time_from:
+        rows &= timestamps >= np.datetime64(to_datetime64(time_from))
+    if time_to:
+        rows &= timestamps < np.datetime64(to_datetime64(time_to))
+    return {
+        name: values[rows] if values.shape == timestamps.shape else values
+        for name, values in sidecar.items()
+    }
+
+
+class ColumnStore(mixins.FixLogMixin):
+    """
+    Builds and loads columnar sidecars of the FIX log files.
+
+    Each log file gets a ".npz" file of NumPy arrays, one per column, plus
+    the timestamp and byte offset of every message. A sidecar records the size
+    and mtime of the log file it was built from, and is ignored once the log
+    file changes.
+    """
+
+    def build_sidecar(self, filename: str) -> str:
+        """
+        Scans a log file and saves its columns.
+
+        Args:
+            filename (str): The name of the log file.
+
+        Returns:
+            str: The path of the sidecar.
+        """
+        stat = os.stat(self.get_file_path(filename))
+        arrays = read_columns(self, filename)
+
+        sidecar_path = self.get_sidecar_path(filename)
+        os.makedirs(os.path.dirname(sidecar_path), exist_ok=True)
+        # np.savez adds ".npz" to the path unless the file is already open.
+        with open(sidecar_path, 'wb') as sidecar_file:
+            np.savez(
+                sidecar_file,
+                source_size=np.int64(stat.st_size),
+                source_mtime_ns=np.int64(stat.st_mtime_ns),
+                **arrays,
+            )
+        return sidecar_path
+
+    def build_all(self) -> list:
+        """
+        Builds a sidecar for every log file that doesn't have a fresh one.
+        Compressed log files are skipped, because a sidecar stores the byte
+        offsets of the messages within the file.
+
+        Returns:
+            list: The filenames whose sidecars were built.
+        """
+        built = []
+        for filename in self.get_filenames():
+            if archives.get_codec(filename):
+                continue
+            if self.load_sidecar(filename) is None:
+                self.build_sidecar(filename)
+                built.append(filename)
+        return built
+
+    def load_sidecar(self, filename: str) -> dict:
+        """
+        Returns the columns of a log file, or None if it has no sidecar or the
+        log file has changed since the sidecar was built.
+
+        Args:
+            filename (str): The name of the log file.
+
+        Returns:
+            dict: The column name is the key and a numpy.ndarray is the value.
+        """
+        sidecar_path = self.get_sidecar_path(filename)
+        if not os.path.exists(sidecar_path):
+            return None
+
+        stat = os.stat(self.get_file_path(filename))
+        with np.load(sidecar_path) as sidecar:
+            is_fresh = (
+                set(COLUMN_TAGS) <= set(sidecar.files) and
+                int(sidecar['source_size']) == stat.st_size and
+                int(sidecar['source_mtime_ns']) == stat.st_mtime_ns
+            )
+            if not is_fresh:
+                return None
+            return {name: sidecar[name] for name in sidecar.files}
+
+
+if __name__ == '__main__':
+    built = ColumnStore().build_all()
+    print(f'Built {len(built)} sidecar(s): {built}')
@@ -0,0 +1,374 @@
+import os
+import sys
+
+import archives
+import lifecycle
+import mixins
+import settings
+import tokenizer
+
+sys.path.insert(0, '')
+import pipeline
+import utils
+from utils import timer
+
+
+class ReportEngine(mixins.FixLogMixin):
+    """
+    Reads and tokenizes every FIX log file in the directory exactly once and
+    hands each message to the analyzers that subscribed to its MsgType
+    (Tag 35).
+
+    An analyzer subscribes through its msg_types attribute (a tuple of Tag 35
+    values, or None for every message) and can narrow that down with a
+    required_fields attribute (a tuple of "Tag=value" fields that every
+    message it wants has, e.g. "55=ES"). It must implement
+    process_message(message) and complete_report(). To run with more than one
+    worker, it must also implement get_partial() and merge_partial(partial).
+
+    An analyzer that implements process_execution(order, message) or
+    process_order(order) is a projection of the orders instead (see
+    lifecycle.OrderBook). Every projection shares a single OrderBook, which
+    is registered as an analyzer in their place.
+
+    The reader is either "text" (decode every line to str) or "mmap" (scan the
+    memory-mapped bytes and only decode the Tag values that are asked for).
+
+    With use_pipeline, a single process scans the files with a pipeline of
+    threads, so that reading them overlaps with tokenizing and aggregating
+    (see run_pipeline).
+
+    With a time_range, only the messages within it are read: each log file
+    is binary searched for the byte range of the time range (see
+    mixins.FixLogMixin.get_time_offsets), so a short window of a large log
+    costs a few seeks rather than a scan of the whole file.
+
+    If a log file has a fresh columnar sidecar (see columns.py), analyzers that
+    implement process_columns(sidecar) are given the whole file's columns
+    instead of its messages, and the file is only scanned for the analyzers
+    that can't answer from the sidecar. With use_batch, a log file without a
+    sidecar is parsed into the same columns in memory, thousands of messages
+    at a time (see columns.parse_columns).
+    """
+
+    def __init__(self, analyzers: tuple = (), workers: int = 1,
+                 reader: str = settings.READER, use_columns: bool = True,
+                 use_pipeline: bool = settings.USE_PIPELINE,
+                 time_range: tuple = ('', ''),
+                 use_batch: bool = settings.USE_BATCH):
+        """
+        Args:
+            analyzers (tuple): See register.
+            workers (int): The number of processes that scan the log files.
+            reader (str): "text" or "mmap".
+            use_columns (bool): Whether to use the columnar sidecars.
+            use_pipeline (bool): See run_pipeline.
+            time_range (tuple): The log timestamps from and to which the
+                messages are read, e.g. ("20130808-13:28", "20130808-13:33").
+                The end is excluded, and an empty string leaves that end of
+                the range open (see tokenizer.pad_timestamp).
+            use_batch (bool): Whether to parse the log files without a
+                sidecar into columns.
+        """
+        assert reader in ('text', 'mmap'), f'Unknown reader "{reader}".'
+        self.workers = workers
+        self.reader = reader
+        self.time_range = time_range
+        self.time_from, self.time_to = (
+            tokenizer.pad_timestamp(timestamp) for timestamp in time_range)
+        assert not (self.time_from and self.time_to) or (
+            self.time_from <= self.time_to), (
+            'The time range must not end before it starts.')
+        self.use_columns = use_columns
+        self.use_pipeline = use_pipeline
+        self.use_batch = use_batch
+        self.analyzers = []
+        # Store the subscriptions into a dict where the MsgType is the key and
+        # a list of analyzers is the value.
+        self.subscriptions = {}
+        # Analyzers that want every message regardless of its MsgType.
+        self.catch_all = []
+        projections = [
+            analyzer for analyzer in analyzers
+            if lifecycle.is_projection(analyzer)
+        ]
+        if projections:
+            self.register(lifecycle.OrderBook(projections))
+        for analyzer in analyzers:
+            if not lifecycle.is_projection(analyzer):
+                self.register(analyzer)
+
+    def register(self, analyzer):
+        """
+        Adds an analyzer to the engine.
+
+        Args:
+            analyzer: An object with msg_types, process_message() and
+                complete_report().
+        """
+        self.analyzers.append(analyzer)
+        if analyzer.msg_types is None:
+            self.catch_all.append(analyzer)
+        else:
+            for msg_type in analyzer.msg_types:
+                self.subscriptions.setdefault(msg_type, []).append(analyzer)
+
+    def get_msg_types(self) -> tuple:
+        """
+        Returns the MsgType values that at least one analyzer needs, or None
+        if an analyzer needs every message.
+
+        Returns:
+            tuple
+        """
+        if self.catch_all:
+            return None
+        return tuple(self.subscriptions)
+
+    def get_required_fields(self) -> tuple:
+        """
+        Returns the fields that every analyzer requires, so that messages
+        without them can be rejected by the tokenizer before they're split.
+
+        Returns:
+            tuple
+        """
+        required_fields = None
+        for analyzer in self.analyzers:
+            fields = set(getattr(analyzer, 'required_fields', ()))
+            if required_fields is None:
+                required_fields = fields
+            else:
+                required_fields &= fields
+        return tuple(sorted(required_fields or ()))
+
+    def dispatch(self, messages):
+        """
+        Hands each message to the analyzers that subscribed to it.
+
+        Args:
+            messages: An iterable of tokenizer.FixMessage.
+
+        Returns:
+            int: The number of messages that were dispatched.
+        """
+        subscriptions = self.subscriptions
+        catch_all = self.catch_all
+        count = 0
+        for message in messages:
+            count += 1
+            for analyzer in subscriptions.get(message.msg_type, ()):
+                analyzer.process_message(message)
+            for analyzer in catch_all:
+                analyzer.process_message(message)
+        return count
+
+    def can_process_columns(self, analyzer) -> bool:
+        """
+        Returns whether an analyzer may answer from a log file's columns,
+        before the log file is parsed into them.
+        """
+        if not hasattr(analyzer, 'process_columns'):
+            return False
+        can_process = getattr(analyzer, 'can_process_columns', None)
+        return can_process is None or can_process(None)
+
+    def process_sidecars(self) -> list:
+        """
+        Hands the columnar sidecar of each log file to the analyzers that can
+        answer from it.
+
+        Returns:
+            list: 2-tuples of filename and the analyzers that still need the
+                file's messages.
+        """
+        remaining = []
+        for filename in self.get_filenames():
+            analyzers = self.analyzers
+            sidecar = None
+            # NumPy is only imported if a log file has a sidecar.
+            if self.use_columns and os.path.exists(
+                    self.get_sidecar_path(filename)):
+                import columns
+                with self.metrics.phase('read_columns'):
+                    sidecar = columns.ColumnStore().load_sidecar(filename)
+            # A log file is only parsed if an analyzer can answer from it.
+            if sidecar is None and self.use_batch and any(
+                    self.can_process_columns(analyzer)
+                    for analyzer in analyzers):
+                import columns
+                with self.metrics.phase('parse_columns'):
+                    sidecar = columns.read_columns(self, filename)
+            if sidecar is not None and self.has_time_range():
+                sidecar = columns.select_time_range(
+                    sidecar, self.time_from, self.time_to)
+            if sidecar is not None:
+                with self.metrics.phase('aggregate_columns'):
+                    analyzers = [
+                        analyzer for analyzer in analyzers
+                        if not (
+                            hasattr(analyzer, 'process_columns') and
+                            analyzer.process_columns(sidecar)
+                        )
+                    ]
+                if not analyzers:
+                    # Only the bytes of the time range are covered.
+                    start, end = self.get_time_offsets(filename)
+                    self.metrics.add(end - start, len(sidecar['offset']))
+            if analyzers:
+                remaining.append((filename, analyzers))
+        return remaining
+
+    def run(self):
+        """
+        Scans the log files once, dispatching each message to its
+        subscribers.
+
+        Reading, tokenizing and aggregating are interleaved message by
+        message, so they're measured together as the "scan" phase.
+        """
+        remaining = self.process_sidecars()
+        if self.workers > 1:
+            self.run_parallel(remaining)
+            return
+        if self.use_pipeline:
+            self.run_pipeline(remaining)
+            return
+
+        for filename, analyzers in remaining:
+            scanner = self.get_scanner(analyzers)
+            with self.metrics.phase('scan'):
+                count = scanner.dispatch(scanner.iter_file_messages(
+                    filename, scanner.get_msg_types(), self.reader,
+                    scanner.get_required_fields()))
+            start, end = self.get_time_offsets(filename)
+            self.metrics.add(end - start, count)
+
+    def get_scanner(self, analyzers: list):
+        """
+        Returns an engine with the same settings that hands the messages to
+        some of the analyzers.
+        """
+        if analyzers == self.analyzers:
+            return self
+        return ReportEngine(
+            analyzers, reader=self.reader, time_range=self.time_range)
+
+    def run_parallel(self, remaining: list):
+        """
+        Fans the log files, split into chunks at message boundaries, out to a
+        pool of worker processes and merges their partial results.
+
+        The "scan" phase is the elapsed time of the pool, and "worker_scan"
+        is the time of every worker added together.
+
+        Args:
+            remaining (list): 2-tuples of filename and the analyzers that need
+                the file's messages (see process_sidecars).
+        """
+        tasks = []
+        for filename, analyzers in remaining:
+            for chunk in self.get_file_chunks(filename):
+                tasks.append((analyzers, chunk))
+        if not tasks:
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+        with self.metrics.phase('scan'):
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                # Every worker gets a copy of the analyzers before any results
+                # are merged into them, so each copy starts out empty.
+                futures = [
+                    executor.submit(
+                        scan_chunk, analyzers, self.reader, *chunk,
+                        time_range=self.time_range)
+                    for analyzers, chunk in tasks
+                ]
+                results = [future.result() for future in futures]
+
+        with self.metrics.phase('merge'):
+            for (analyzers, chunk), (partials, metrics) in zip(tasks, results):
+                for analyzer, partial in zip(analyzers, partials):
+                    analyzer.merge_partial(partial)
+                self.metrics.merge(metrics)
+
+    def run_pipeline(self, remaining: list):
+        """
+        Scans the log files with a pipeline.Pipeline. Reader threads read the
+        files in blocks of whole lines, parser threads tokenize the blocks,
+        and the messages of each block are dispatched here, in the order of
+        the files, while the next blocks are read.
+
+        Args:
+            remaining (list): 2-tuples of filename and the analyzers that need
+                the file's messages (see process_sidecars).
+        """
+        # Store the scanners into a dict where the filename is the key and a
+        # 3-tuple of the scanner, its MsgTypes and its required fields is the
+        # value.
+        scanners = {}
+        for filename, analyzers in remaining:
+            scanner = self.get_scanner(analyzers)
+            scanners[filename] = (
+                scanner, scanner.get_msg_types(), scanner.get_required_fields())
+
+        def parse_block(filename: str, block: bytes) -> tuple:
+            scanner, msg_types, required_fields = scanners[filename]
+            messages = tokenizer.iter_raw_messages(
+                block, msg_types=msg_types, required_fields=required_fields)
+            # Only the time range of a log file is read, unless it's
+            # compressed.
+            if self.has_time_range() and archives.get_codec(filename):
+                messages = self.iter_time_range(messages)
+            return len(block), list(messages)
+
+        scan_pipeline = pipeline.Pipeline(
+            self.iter_file_blocks, parse_block, settings.PIPELINE_READERS,
+            settings.PIPELINE_PARSERS, settings.PIPELINE_QUEUE_SIZE,
+            self.metrics)
+        with self.metrics.phase('scan'):
+            for filename, (size, messages) in scan_pipeline.run(scanners):
+                count = scanners[filename][0].dispatch(messages)
+                self.metrics.add(size, count)
+
+    @timer
+    def execute_report(self):
+        """
+        Executes every registered report in a single scan of the log files.
+        """
+        print()
+        self.run()
+        with self.metrics.phase('write_excel'):
+            for analyzer in self.analyzers:
+                analyzer.complete_report()
+
+
+def scan_chunk(analyzers: list, reader: str, filename: str, start: int,
+               end: int, time_range: tuple = ('', '')) -> tuple:
+    """
+    Runs in a worker process. Scans a single chunk of a log file.
+
+    Args:
+        analyzers (list): Copies of the analyzers registered with the engine.
+        reader (str): "text" or "mmap".
+        filename (str): The name of the file.
+        start (int): The first byte of the chunk.
+        end (int): The byte after the last byte of the chunk.
+        time_range (tuple): The time range of the engine, which filters the
+            messages of a compressed file.
+
+    Returns:
+        tuple: Each analyzer's get_partial(), in the same order as analyzers,
+            and the utils.Metrics of the chunk as a dict.
+    """
+    metrics = utils.Metrics()
+    chunk_engine = ReportEngine(
+        analyzers, reader=reader, time_range=time_range)
+    with metrics.phase('worker_scan'):
+        messages = chunk_engine.iter_chunk_messages(
+            filename, start, end, chunk_engine.get_msg_types(), reader,
+            chunk_engine.get_required_fields())
+        count = chunk_engine.dispatch(messages)
+    metrics.add(end - start, count)
+    partials = [analyzer.get_partial() for analyzer in analyzers]
+    return partials, metrics.to_dict()
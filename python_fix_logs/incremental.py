@@ -0,0 +1,196 @@
+import copy
+import json
+import os
+import sys
+import time
+
+import archives
+import engine
+import question_1
+import question_2
+import settings
+
+
+class IncrementalEngine(engine.ReportEngine):
+    """
+    A report engine that only reads the bytes that were appended to the log
+    files since the last run.
+
+    For every log file, a checkpoint file stores the file's inode, the byte
+    offset that has been read up to, and each analyzer's get_partial() for
+    the messages before that offset. The reports are rebuilt by merging the
+    saved state of every file, so a refresh costs time proportional to the
+    new data rather than to the size of the logs.
+
+    An analyzer must implement get_partial() and merge_partial(partial), its
+    partial must be JSON serializable, and it must have a checkpoint_key.
+    """
+
+    def __init__(self, analyzers: tuple = (), reader: str = settings.READER,
+                 checkpoint_path: str = ''):
+        super().__init__(analyzers, reader=reader)
+        self.checkpoint_path = checkpoint_path or (
+            f'{settings.RELATIVE_PATH}/{settings.CHECKPOINT_FILENAME}')
+        # Copies of the analyzers taken before they've seen any messages.
+        self.blank_analyzers = copy.deepcopy(self.analyzers)
+
+    def load_checkpoint(self) -> dict:
+        """
+        Returns the saved state of each log file, or an empty dict if nothing
+        has been saved yet.
+
+        Returns:
+            dict: The filename is the key and a dict with the file's "inode",
+                "offset" and "reports" is the value.
+        """
+        try:
+            with open(self.checkpoint_path, 'r') as checkpoint_file:
+                return json.load(checkpoint_file)
+        except FileNotFoundError:
+            return {}
+
+    def save_checkpoint(self, checkpoint: dict):
+        # Write to a temporary file first so that an interrupted run never
+        # leaves a half written checkpoint behind.
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def get_complete_end(self, filename: str, start: int, size: int) -> int:
+        """
+        Returns the offset just after the last complete line of a log file, so
+        that a message that's still being written is left for the next run.
+        A compressed file is an archive that's never appended to, so it's
+        read whole.
+
+        Args:
+            filename (str): The name of the file.
+            start (int): The offset that has already been read up to.
+            size (int): The current size of the file.
+
+        Returns:
+            int
+        """
+        if archives.get_codec(filename):
+            return size
+        with open(self.get_file_path(filename), 'rb') as fix_file:
+            end = size
+            while end > start:
+                block_start = max(start, end - settings.READ_BUFFER_SIZE)
+                fix_file.seek(block_start)
+                block = fix_file.read(end - block_start)
+                newline = block.rfind(b'\n')
+                if newline != -1:
+                    return block_start + newline + 1
+                end = block_start
+        return start
+
+    def update_file(self, filename: str, saved: dict) -> tuple:
+        """
+        Reads the part of a log file that's new since its saved state.
+
+        Args:
+            filename (str): The name of the file.
+            saved (dict): The file's state from the checkpoint, if any.
+
+        Returns:
+            tuple: The file's new state and the number of bytes read.
+        """
+        stat = os.stat(self.get_file_path(filename))
+        keys = [analyzer.checkpoint_key for analyzer in self.analyzers]
+        is_same_file = (
+            saved is not None and
+            saved['inode'] == stat.st_ino and
+            saved['offset'] <= stat.st_size and
+            sorted(saved['reports']) == sorted(keys)
+        )
+        if not is_same_file:
+            # The file is new, was rotated or truncated, or a report was
+            # added, so it has to be read from the beginning.
+            saved = {'inode': stat.st_ino, 'offset': 0, 'reports': {}}
+
+        analyzers = copy.deepcopy(self.blank_analyzers)
+        for analyzer in analyzers:
+            partial = saved['reports'].get(analyzer.checkpoint_key)
+            if partial is not None:
+                analyzer.merge_partial(partial)
+
+        start = saved['offset']
+        end = self.get_complete_end(filename, start, stat.st_size)
+        if end > start:
+            scanner = engine.ReportEngine(analyzers, reader=self.reader)
+            with self.metrics.phase('scan'):
+                count = scanner.dispatch(scanner.iter_chunk_messages(
+                    filename, start, end, scanner.get_msg_types(), self.reader,
+                    scanner.get_required_fields()))
+            self.metrics.add(end - start, count)
+
+        state = {
+            'inode': stat.st_ino,
+            'offset': end,
+            'reports': {
+                analyzer.checkpoint_key: analyzer.get_partial()
+                for analyzer in analyzers
+            },
+        }
+        return state, end - start
+
+    def run(self) -> int:
+        """
+        Reads the new part of every log file, saves the checkpoint and
+        rebuilds the analyzers from the saved state of every file.
+
+        Returns:
+            int: The number of new bytes that were read.
+        """
+        saved_checkpoint = self.load_checkpoint()
+        checkpoint = {}
+        bytes_read = 0
+        for filename in self.get_filenames():
+            saved = saved_checkpoint.get(filename)
+            checkpoint[filename], new_bytes = self.update_file(filename, saved)
+            bytes_read += new_bytes
+        self.save_checkpoint(checkpoint)
+
+        # Files that were deleted are dropped from the checkpoint, so the
+        # analyzers are rebuilt from scratch rather than updated in place.
+        analyzers = copy.deepcopy(self.blank_analyzers)
+        for analyzer in analyzers:
+            for state in checkpoint.values():
+                analyzer.merge_partial(state['reports'][analyzer.checkpoint_key])
+        self.analyzers = []
+        self.subscriptions = {}
+        self.catch_all = []
+        for analyzer in analyzers:
+            self.register(analyzer)
+        return bytes_read
+
+    def follow(self, interval: float = settings.FOLLOW_INTERVAL):
+        """
+        Tails the log files, refreshing the reports whenever new messages are
+        appended. Runs until it's interrupted (e.g. with Ctrl+C).
+
+        Args:
+            interval (float): Seconds to wait between checks for new data.
+        """
+        try:
+            while True:
+                if self.run():
+                    print()
+                    for analyzer in self.analyzers:
+                        analyzer.complete_report()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    script = IncrementalEngine([
+        question_1.OrderStatusAnalyzer(question_1.CATEGORIES_NEEDED),
+        question_2.ExecutionReportAnalyzer(question_2.SYMBOL_TAG),
+    ])
+    if '--follow' in sys.argv:
+        script.follow()
+    else:
+        script.execute_report()
@@ -0,0 +1,605 @@
+import settings
+
+# The MsgTypes that the owner of an order sends, so their SenderCompID and
+# TargetCompID are the reverse of the execution reports' (see get_session).
+OWNER_MSG_TYPES = ('D', 'F', 'G')
+NEW_ORDER_SINGLE = 'D'
+ORDER_CANCEL_REJECT = '9'
+
+
+def find_root_id(root_ids: dict, cl_ord_id: str,
+                 orig_cl_ord_id: str = None) -> str:
+    """
+    Returns the ClOrdID of the first order in the cancel/replace chain of a
+    message, linking the chains through OrigClOrdID (Tag 41) like
+    OrderBook.find_order does. It's for the messages that don't pass through
+    the book, so they must be linked in the order of the log.
+
+    Args:
+        root_ids (dict): The chains of a session, where the ClOrdID (Tag 11)
+            of an order that replaced or cancelled another is the key and the
+            ClOrdID of the first order in its chain is the value.
+        cl_ord_id (str): The ClOrdID of the message.
+        orig_cl_ord_id (str): The OrigClOrdID of the message, if it has one.
+
+    Returns:
+        str
+    """
+    root_id = root_ids.get(cl_ord_id)
+    if root_id is not None:
+        return root_id
+    if not orig_cl_ord_id:
+        return cl_ord_id
+    root_id = root_ids.get(orig_cl_ord_id, orig_cl_ord_id)
+    if root_id != cl_ord_id:
+        root_ids[cl_ord_id] = root_id
+    return root_id
+
+
+def is_projection(analyzer) -> bool:
+    """
+    Returns whether an analyzer is a projection of an OrderBook rather than
+    an analyzer of the messages themselves.
+    """
+    return (
+        hasattr(analyzer, 'process_execution') or
+        hasattr(analyzer, 'process_order')
+    )
+
+
+class OrderRecord:
+    """
+    The state of a single order, including every order that replaced or
+    cancelled it (linked through OrigClOrdID, Tag 41).
+
+    Every attribute is a str, an int, None or a list or dict of str, so a
+    record packs into a short list for a partial (see to_list).
+    """
+
+    __slots__ = (
+        'session', 'root_id', 'cl_ord_ids', 'symbol', 'side', 'order_qty',
+        'cum_qty', 'ord_status', 'ord_statuses', 'opened', 'updated',
+        'executions', 'is_orphan', 'fields',
+    )
+
+    def __init__(self, session: str, root_id: str, opened: str = '',
+                 is_orphan: bool = False):
+        """
+        Args:
+            session (str): See OrderBook.get_session.
+            root_id (str): The ClOrdID (Tag 11) of the first order in the
+                chain.
+            opened (str): The timestamp of the order's first message.
+            is_orphan (bool): Whether the order's first message wasn't the
+                start of its lifecycle (see OrderBook).
+        """
+        self.session = session
+        self.root_id = root_id
+        # Every ClOrdID of the chain, starting with root_id.
+        self.cl_ord_ids = [root_id]
+        self.symbol = None
+        self.side = None
+        self.order_qty = None
+        self.cum_qty = None
+        self.ord_status = ''
+        # Every OrdStatus of the order's execution reports, once each, e.g.
+        # "012" for an order that was filled in parts.
+        self.ord_statuses = ''
+        self.opened = opened
+        self.updated = opened
+        # The number of execution reports of the order.
+        self.executions = 0
+        self.is_orphan = is_orphan
+        # Store the fields that the projections need (see
+        # OrderBook.order_tags) into a dict where the Tag is the key and its
+        # value in the order's first message with the Tag is the value.
+        self.fields = {}
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.ord_status in settings.TERMINAL_ORD_STATUSES
+
+    def fold(self, other):
+        """
+        Adds the state of a later part of the same order, e.g. the part that
+        another worker process read.
+
+        Args:
+            other (OrderRecord)
+        """
+        for cl_ord_id in other.cl_ord_ids:
+            if cl_ord_id not in self.cl_ord_ids:
+                self.cl_ord_ids.append(cl_ord_id)
+        if self.symbol is None:
+            self.symbol = other.symbol
+        if self.side is None:
+            self.side = other.side
+        # A cancel/replace request can change the quantity of the order.
+        if other.order_qty is not None:
+            self.order_qty = other.order_qty
+        if other.cum_qty is not None and (
+                self.cum_qty is None or other.cum_qty > self.cum_qty):
+            self.cum_qty = other.cum_qty
+        if other.ord_status:
+            self.ord_status = other.ord_status
+        for ord_status in other.ord_statuses:
+            if ord_status not in self.ord_statuses:
+                self.ord_statuses += ord_status
+        self.updated = other.updated
+        self.executions += other.executions
+        for tag, value in other.fields.items():
+            self.fields.setdefault(tag, value)
+
+    def to_list(self) -> list:
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values: list):
+        record = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, values):
+            setattr(record, name, value)
+        return record
+
+
+class OrderBook:
+    """
+    Reconstructs the lifecycle of every order from its new order single
+    (35=D), cancel and cancel/replace requests (35=F, 35=G), execution reports
+    (35=8) and cancel rejects (35=9), linking the ClOrdIDs (Tag 11) of a
+    cancel/replace chain through OrigClOrdID (Tag 41).
+
+    It's an analyzer of the report engine, and reports are projections of its
+    orders rather than of the messages. A projection can implement:
+
+        process_execution(order, message): Called for every execution report
+            once the order's OrderRecord has been updated with it.
+        process_order(order): Called once for every order, when it reaches a
+            terminal OrdStatus, or at the end of the scan for orders that are
+            still live.
+
+    as well as msg_types (which of settings.ORDER_MSG_TYPES it needs, or None
+    for all of them), required_fields, checkpoint_key, get_partial(),
+    merge_partial(partial) and complete_report() like any other analyzer, and
+    order_tags (the Tags whose value the book keeps in OrderRecord.fields). If
+    every projection implements process_columns(sidecar), a log file's
+    sidecar is handed to them instead (see can_process_columns), with the
+    session and the root ClOrdID of every message added to it (see
+    add_order_columns).
+
+    Only live orders are kept. An order is evicted as soon as its OrdStatus
+    is terminal, so memory is bounded by the number of orders that are open
+    at once rather than by the number of orders in the logs.
+
+    An order whose first message isn't the start of a lifecycle (e.g. a fill
+    of an order that was accepted before the chunk of the log file began) is
+    an orphan. Orphans are kept until the end of the scan, and are joined
+    with the order that they continue when the partials of the chunks are
+    merged.
+
+    The ClOrdIDs of the last settings.FINALIZED_IDS finalized orders are
+    remembered. A late message of a finalized order (e.g. a repeated fill or a
+    cancel reject) doesn't start another order, and an execution report
+    without a ClOrdID isn't part of any order. Both are still handed to
+    process_execution, on a record of their own that isn't kept.
+
+    Example, counting the orders that were canceled after a partial fill:
+        class PartialCancels:
+            msg_types = None
+            count = 0
+
+            def process_order(self, order):
+                if order.ord_status == '4' and order.cum_qty:
+                    self.count += 1
+
+    Example, a fill that's repeated after its order was finalized, and an
+    execution report without a ClOrdID (run with python -m doctest):
+        >>> from tokenizer import FixMessage
+        >>> class Statuses:
+        ...     def __init__(self):
+        ...         self.executions = []
+        ...         self.orders = []
+        ...     def process_execution(self, order, message):
+        ...         self.executions.append(order.ord_status)
+        ...     def process_order(self, order):
+        ...         self.orders.append(order.ord_status)
+        >>> book = OrderBook([Statuses()])
+        >>> for body in ('35=D|11=A', '35=8|11=A|39=0', '35=8|11=A|39=2',
+        ...              '35=8|11=A|39=2', '35=8|39=2'):
+        ...     book.process_message(FixMessage(
+        ...         '20130808-13:28:57.009', body[3],
+        ...         body.replace('|', settings.DELIMITER)))
+        >>> book.finish()
+        >>> book.projections[0].executions
+        ['0', '2', '2', '2']
+        >>> book.projections[0].orders
+        ['2']
+    """
+
+    def __init__(self, projections: tuple = ()):
+        self.projections = []
+        # Store the live orders into a nested dict where the session is the
+        # key, and the value is a dict where every ClOrdID of an order is the
+        # key and its OrderRecord is the value.
+        self.orders = {}
+        # Orphans that reached a terminal OrdStatus.
+        self.orphans = []
+        self.order_tags = ()
+        # Store the ClOrdIDs of the last settings.FINALIZED_IDS finalized
+        # orders into a dict, used as an ordered set, where a 2-tuple of
+        # session and ClOrdID is the key and None is the value.
+        self.finalized_ids = {}
+        # Store the chains of the log files that don't pass through the book
+        # (see add_order_columns) into a nested dict where the session is the
+        # key, and the value is the root_ids of find_root_id.
+        self.root_ids = {}
+        for projection in projections:
+            self.add_projection(projection)
+
+    def add_projection(self, projection):
+        """
+        Adds a projection to the book.
+
+        Args:
+            projection: An object with process_execution() or process_order()
+                and complete_report().
+        """
+        self.projections.append(projection)
+        self.execution_projections = [
+            projection for projection in self.projections
+            if hasattr(projection, 'process_execution')
+        ]
+        self.order_projections = [
+            projection for projection in self.projections
+            if hasattr(projection, 'process_order')
+        ]
+        self.order_tags = tuple(sorted({
+            tag
+            for projection in self.projections
+            for tag in getattr(projection, 'order_tags', ())
+        }))
+
+    @property
+    def msg_types(self) -> tuple:
+        """
+        Returns the MsgTypes that at least one projection needs, e.g. the
+        execution reports alone are enough to link the chains and to know
+        each order's CumQty and OrdStatus.
+        """
+        msg_types = set()
+        for projection in self.projections:
+            needed = getattr(projection, 'msg_types', None)
+            msg_types.update(
+                settings.ORDER_MSG_TYPES if needed is None else needed)
+        return tuple(
+            msg_type for msg_type in settings.ORDER_MSG_TYPES
+            if msg_type in msg_types)
+
+    @property
+    def required_fields(self) -> tuple:
+        """
+        Returns the fields that every projection requires.
+        """
+        required_fields = None
+        for projection in self.projections:
+            fields = set(getattr(projection, 'required_fields', ()))
+            if required_fields is None:
+                required_fields = fields
+            else:
+                required_fields &= fields
+        return tuple(sorted(required_fields or ()))
+
+    @property
+    def checkpoint_key(self) -> str:
+        return 'orders:' + '|'.join(
+            projection.checkpoint_key for projection in self.projections)
+
+    def get_session(self, message) -> str:
+        """
+        Returns the session of an order message from the point of view of its
+        execution reports, e.g. "CME-4G8287N", whichever side sent it.
+        """
+        if message.msg_type in OWNER_MSG_TYPES:
+            return f"{message.get('56', '')}-{message.get('49', '')}"
+        return f"{message.get('49', '')}-{message.get('56', '')}"
+
+    def is_finalized(self, session: str, cl_ord_ids) -> bool:
+        """
+        Returns whether any of some ClOrdIDs belongs to a finalized order.
+        """
+        return any(
+            (session, cl_ord_id) in self.finalized_ids
+            for cl_ord_id in cl_ord_ids)
+
+    def add_finalized_id(self, session: str, cl_ord_id: str):
+        """
+        Remembers the ClOrdID of a finalized order, forgetting the oldest one
+        once settings.FINALIZED_IDS are remembered.
+        """
+        self.finalized_ids[session, cl_ord_id] = None
+        if len(self.finalized_ids) > settings.FINALIZED_IDS:
+            del self.finalized_ids[next(iter(self.finalized_ids))]
+
+    def find_order(self, message, session: str, cl_ord_id: str):
+        """
+        Returns the OrderRecord of a message, creating it if the message's
+        order hasn't been seen, or None if the message is a late message of a
+        finalized order.
+        """
+        orders = self.orders.setdefault(session, {})
+        order = orders.get(cl_ord_id)
+        if order is not None:
+            return order
+
+        orig_cl_ord_id = message.get('41')
+        if orig_cl_ord_id is not None:
+            order = orders.get(orig_cl_ord_id)
+        if order is None:
+            starts_lifecycle = orig_cl_ord_id is None and (
+                message.msg_type == NEW_ORDER_SINGLE or (
+                    message.msg_type == settings.EXECUTION_REPORT and
+                    message.get('39') in settings.NEW_ORD_STATUSES
+                )
+            )
+            if not starts_lifecycle and self.is_finalized(
+                    session, (cl_ord_id, orig_cl_ord_id)):
+                return None
+            order = OrderRecord(
+                session, orig_cl_ord_id or cl_ord_id, message.timestamp,
+                is_orphan=not starts_lifecycle)
+            orders[order.root_id] = order
+        if cl_ord_id not in orders:
+            order.cl_ord_ids.append(cl_ord_id)
+            orders[cl_ord_id] = order
+        return order
+
+    def process_message(self, message):
+        """
+        Applies an order message to its order, and evicts the order if it's
+        done.
+
+        Args:
+            message (tokenizer.FixMessage)
+        """
+        cl_ord_id = message.get('11')
+        session = self.get_session(message)
+        order = None
+        # An unsolicited execution report has no ClOrdID, so it can't be
+        # placed in an order's lifecycle.
+        if cl_ord_id is not None:
+            order = self.find_order(message, session, cl_ord_id)
+        is_kept = order is not None
+        if not is_kept:
+            # The execution reports are still counted, on a record of their
+            # own.
+            if message.msg_type != settings.EXECUTION_REPORT:
+                return
+            order = OrderRecord(
+                session, cl_ord_id or '', message.timestamp, is_orphan=True)
+        order.updated = message.timestamp
+        msg_type = message.msg_type
+
+        if order.symbol is None:
+            order.symbol = message.get('55')
+            order.side = message.get('54')
+        for tag in self.order_tags:
+            if tag not in order.fields:
+                value = message.get(tag)
+                if value is not None:
+                    order.fields[tag] = value
+        if msg_type != ORDER_CANCEL_REJECT:
+            order_qty = message.get('38')
+            if order_qty is not None:
+                order.order_qty = int(order_qty)
+        if msg_type in OWNER_MSG_TYPES:
+            return
+
+        ord_status = message.get('39')
+        if ord_status is not None:
+            order.ord_status = ord_status
+        if msg_type == settings.EXECUTION_REPORT:
+            order.executions += 1
+            if ord_status is not None and ord_status not in order.ord_statuses:
+                order.ord_statuses += ord_status
+            cum_qty = message.get('14')
+            if cum_qty is not None:
+                cum_qty = int(cum_qty)
+                if order.cum_qty is None or cum_qty > order.cum_qty:
+                    order.cum_qty = cum_qty
+            for projection in self.execution_projections:
+                projection.process_execution(order, message)
+        if is_kept and order.is_terminal:
+            self.finalize(order)
+
+    def finalize(self, order: OrderRecord):
+        """
+        Evicts a terminal order and hands it to the projections, unless it's
+        an orphan, which is kept until it can be joined with the rest of its
+        order (see merge_partial).
+        """
+        orders = self.orders.get(order.session, {})
+        for cl_ord_id in order.cl_ord_ids:
+            if orders.get(cl_ord_id) is order:
+                del orders[cl_ord_id]
+            self.add_finalized_id(order.session, cl_ord_id)
+        if order.is_orphan:
+            self.orphans.append(order)
+            return
+        for projection in self.order_projections:
+            projection.process_order(order)
+
+    def get_live_orders(self) -> list:
+        """
+        Returns every order that's still live, once each.
+        """
+        return [
+            order
+            for orders in self.orders.values()
+            for cl_ord_id, order in orders.items()
+            if cl_ord_id == order.root_id
+        ]
+
+    def can_process_columns(self, sidecar: dict) -> bool:
+        """
+        Returns whether every projection can answer from a log file's
+        columns.
+
+        Args:
+            sidecar (dict): The columns of the log file, or None if the log
+                file hasn't been parsed yet (see
+                engine.ReportEngine.can_process_columns).
+        """
+        for projection in self.projections:
+            if not hasattr(projection, 'process_columns'):
+                return False
+            can_process = getattr(projection, 'can_process_columns', None)
+            if can_process is not None and not can_process(sidecar):
+                return False
+        return True
+
+    def add_order_columns(self, sidecar: dict) -> dict:
+        """
+        Returns a log file's sidecar with the session (see get_session) and
+        the root ClOrdID of every message added to it as the "session" and
+        "root_id" columns. The chains are kept from one log file to the next.
+
+        Args:
+            sidecar (dict): The columns of the log file.
+
+        Returns:
+            dict
+        """
+        # NumPy is only imported once a sidecar is used.
+        import numpy as np
+
+        import columns
+        is_owner = np.isin(sidecar['msg_type'], OWNER_MSG_TYPES)
+        sessions = columns.join_values(
+            np.where(
+                is_owner, sidecar['target_comp_id'], sidecar['sender_comp_id']),
+            '-',
+            np.where(
+                is_owner, sidecar['sender_comp_id'], sidecar['target_comp_id']))
+        cl_ord_ids = sidecar['cl_ord_id']
+        orig_cl_ord_ids = sidecar['orig_cl_ord_id']
+
+        # Only the few messages of replacing orders are linked one by one.
+        is_replacement = (orig_cl_ord_ids != '') & (cl_ord_ids != '')
+        for session, cl_ord_id, orig_cl_ord_id in zip(
+                sessions[is_replacement].tolist(),
+                cl_ord_ids[is_replacement].tolist(),
+                orig_cl_ord_ids[is_replacement].tolist()):
+            find_root_id(
+                self.root_ids.setdefault(session, {}), cl_ord_id,
+                orig_cl_ord_id)
+
+        root_ids = cl_ord_ids.astype(
+            np.promote_types(cl_ord_ids.dtype, orig_cl_ord_ids.dtype))
+        for session in set(sessions.tolist()):
+            session_root_ids = self.root_ids.get(session)
+            if not session_root_ids:
+                continue
+            in_session = sessions == session
+            root_ids[in_session] = columns.map_values(
+                cl_ord_ids[in_session],
+                lambda cl_ord_id: session_root_ids.get(cl_ord_id, cl_ord_id))
+        return dict(sidecar, session=sessions, root_id=root_ids)
+
+    def process_columns(self, sidecar: dict) -> bool:
+        """
+        Hands a log file's columnar sidecar (see columns.py) to the
+        projections, if every one of them can answer from it. The file's
+        orders don't pass through the book.
+
+        Args:
+            sidecar (dict): The columns of the log file.
+
+        Returns:
+            bool: False if the log file has to be scanned instead.
+        """
+        if not self.can_process_columns(sidecar):
+            return False
+        sidecar = self.add_order_columns(sidecar)
+        for projection in self.projections:
+            projection.process_columns(sidecar)
+        return True
+
+    def get_partial(self) -> dict:
+        """
+        Returns the live orders, the orphans and each projection's partial,
+        so that the results from separate worker processes can be merged
+        together.
+
+        Returns:
+            dict: "orders" is a list of OrderRecord.to_list(),
+                "finalized_ids" is a list of the keys of self.finalized_ids,
+                "root_ids" is self.root_ids, and "projections" has each
+                projection's get_partial(), in the same order as the
+                projections.
+        """
+        orders = self.get_live_orders() + self.orphans
+        return {
+            'orders': [order.to_list() for order in orders],
+            'finalized_ids': [list(key) for key in self.finalized_ids],
+            'root_ids': self.root_ids,
+            'projections': [
+                projection.get_partial() for projection in self.projections
+            ],
+        }
+
+    def merge_partial(self, partial: dict):
+        """
+        Adds the orders and projections from another worker's get_partial()
+        to the book. The partials must be merged in the order of the log, so
+        that an orphan is joined with the order that it continues, and an
+        orphan of an order that was already finalized is dropped.
+
+        Args:
+            partial (dict)
+        """
+        for projection, projection_partial in zip(
+                self.projections, partial['projections']):
+            projection.merge_partial(projection_partial)
+        for session, root_ids in partial['root_ids'].items():
+            self.root_ids.setdefault(session, {}).update(root_ids)
+
+        for values in partial['orders']:
+            order = OrderRecord.from_list(values)
+            orders = self.orders.setdefault(order.session, {})
+            existing = None
+            if order.is_orphan:
+                for cl_ord_id in order.cl_ord_ids:
+                    existing = orders.get(cl_ord_id)
+                    if existing is not None:
+                        break
+                if existing is None and self.is_finalized(
+                        order.session, order.cl_ord_ids):
+                    continue
+            if existing is None:
+                for cl_ord_id in order.cl_ord_ids:
+                    orders.setdefault(cl_ord_id, order)
+            else:
+                existing.fold(order)
+                for cl_ord_id in order.cl_ord_ids:
+                    orders[cl_ord_id] = existing
+                order = existing
+            if order.is_terminal:
+                self.finalize(order)
+        for session, cl_ord_id in partial['finalized_ids']:
+            self.add_finalized_id(session, cl_ord_id)
+
+    def finish(self):
+        """
+        Hands the orders that are still live, and the orphans, to the
+        projections.
+        """
+        orders = self.get_live_orders() + self.orphans
+        self.orders = {}
+        self.orphans = []
+        for order in orders:
+            for projection in self.order_projections:
+                projection.process_order(order)
+
+    def complete_report(self):
+        self.finish()
+        for projection in self.projections:
+            projection.complete_report()
@@ -1,11 +1,32 @@
+import glob
+import mmap
 import os
+import sys
 
+import archives
 import settings
+import tokenizer
+
+sys.path.insert(0, '')
+import utils
+import writers
 
 
 class FixLogMixin:
 
     excel_filename = ''
+    # "xlsx", "csv" or "parquet" (see settings.OUTPUT_FORMAT).
+    output_format = settings.OUTPUT_FORMAT
+    # Replaced with a utils.Metrics while a report is measured (see utils.timer).
+    metrics = utils.NullMetrics()
+    # Only the messages from time_from up to (but not including) time_to are
+    # read. Both are full log timestamps (see tokenizer.pad_timestamp), and an
+    # empty string leaves that end of the range open.
+    time_from = ''
+    time_to = ''
+    # Whether the mmap reader seeks to the messages it needs with a log file's
+    # offset index (see offset_index.py), if it has a fresh one.
+    use_index = settings.USE_INDEX
 
     def get_output_path(self, file_dunder: str) -> str:
         """
@@ -27,6 +48,88 @@ class FixLogMixin:
             os.path.dirname(os.path.abspath(file_dunder)) + '\\' + excel_filename)
         return output_path
 
+    def open_report(self, file_dunder: str,
+                    sheet_name: str = '') -> writers.ReportWriter:
+        """
+        Opens a writer for the report in the output_format (see
+        get_output_path for where it's created).
+
+        Args:
+            file_dunder (str):
+                The __file__ value that's available in every Python file.
+            sheet_name (str): The name of the Excel worksheet.
+
+        Returns:
+            writers.ReportWriter
+        """
+        return writers.ReportWriter(
+            self.get_output_path(file_dunder), self.output_format, sheet_name)
+
+    def get_file_path(self, filename: str) -> str:
+        """
+        Returns the path of an input file. The filenames from a directory are
+        relative to RELATIVE_PATH and the ones matched by INPUT_PATTERNS are
+        absolute paths.
+        """
+        return os.path.join(settings.RELATIVE_PATH, filename)
+
+    def get_sidecar_path(self, filename: str) -> str:
+        """
+        Returns the path of a log file's columnar sidecar (see columns.py),
+        which is kept in the COLUMNS_DIRNAME directory next to the log file.
+        """
+        directory, basename = os.path.split(self.get_file_path(filename))
+        return os.path.join(
+            directory, settings.COLUMNS_DIRNAME, f'{basename}.npz')
+
+    def get_index_path(self, filename: str) -> str:
+        """
+        Returns the directory of a log file's offset index (see
+        offset_index.py), which is kept in the INDEX_DIRNAME directory next to
+        the log file.
+        """
+        directory, basename = os.path.split(self.get_file_path(filename))
+        return os.path.join(directory, settings.INDEX_DIRNAME, basename)
+
+    def load_index(self, filename: str):
+        """
+        Returns the offset index of a log file, or None if it has none, the
+        log file has changed since it was built, or use_index is off.
+
+        Args:
+            filename (str): The name of the log file.
+
+        Returns:
+            offset_index.OffsetIndex
+        """
+        index_path = self.get_index_path(filename)
+        if not self.use_index or not os.path.exists(index_path):
+            return None
+        # NumPy is only imported if a log file has an index.
+        import offset_index
+        return offset_index.load_index(
+            index_path, self.get_file_path(filename))
+
+    def list_input_files(self) -> list:
+        """
+        Returns the filenames in RELATIVE_PATH, or the absolute paths of the
+        files matched by INPUT_PATTERNS if any are set.
+
+        Returns:
+            list
+        """
+        if not settings.INPUT_PATTERNS:
+            return os.listdir(settings.RELATIVE_PATH)
+        paths = set()
+        for pattern in settings.INPUT_PATTERNS:
+            # A directory stands for every file in it.
+            if os.path.isdir(pattern):
+                pattern = os.path.join(pattern, '*')
+            paths.update(
+                os.path.abspath(path) for path in glob.glob(pattern)
+                if os.path.isfile(path))
+        return sorted(paths)
+
     def get_filenames(self) -> list:
         """
         Returns only the the filenames from the directory that are needed.
@@ -36,11 +139,329 @@ class FixLogMixin:
         """
         filenames = []
         filename_prefix = settings.FILENAME_PREFIX
-        file_type = settings.FILE_TYPE
-        filenames_in_dir = os.listdir(settings.RELATIVE_PATH)
+        file_types = (settings.FILE_TYPE,) + tuple(
+            settings.FILE_TYPE + compressed_file_type
+            for compressed_file_type in settings.COMPRESSED_FILE_TYPES)
+        with self.metrics.phase('list_files'):
+            filenames_in_dir = self.list_input_files()
         for filename in filenames_in_dir:
-            prefix2 = filename[:len(filename_prefix)]
-            file_type2 = filename[-len(file_type):]
-            if filename_prefix == prefix2 and file_type == file_type2:
+            basename = os.path.basename(filename)
+            prefix2 = basename[:len(filename_prefix)]
+            if filename_prefix == prefix2 and basename.endswith(file_types):
                 filenames.append(filename)
         return filenames
+
+    def open_log(self, filename: str):
+        """
+        Opens a FIX log file from the directory for buffered reading. A
+        compressed file is decompressed as it's read.
+
+        Args:
+            filename (str): The name of the file.
+
+        Returns:
+            A file object opened in text mode.
+        """
+        path = self.get_file_path(filename)
+        if archives.get_codec(filename):
+            return archives.open_text(path)
+        return open(path, 'r', buffering=settings.READ_BUFFER_SIZE)
+
+    def iter_log_messages(self, msg_types: tuple = None, reader: str = 'text',
+                          required_fields: tuple = ()):
+        """
+        Streams the messages of every FIX log file in the directory.
+
+        Args:
+            msg_types (tuple):
+                Only yield messages with these MsgType (Tag 35) values.
+            reader (str):
+                "text" to read the files line by line as str, or "mmap" to
+                scan the memory-mapped bytes of the files.
+            required_fields (tuple):
+                Only yield messages that have all of these "Tag=value" fields.
+
+        Yields:
+            tokenizer.FixMessage or tokenizer.RawFixMessage
+        """
+        for filename in self.get_filenames():
+            yield from self.iter_file_messages(
+                filename, msg_types, reader, required_fields)
+
+    def iter_file_messages(self, filename: str, msg_types: tuple = None,
+                           reader: str = 'text', required_fields: tuple = ()):
+        """
+        Streams the messages of a single FIX log file.
+
+        Args:
+            filename (str): The name of the file.
+            msg_types (tuple):
+                Only yield messages with these MsgType (Tag 35) values.
+            reader (str): "text" or "mmap" (see iter_log_messages).
+            required_fields (tuple):
+                Only yield messages that have all of these "Tag=value" fields.
+
+        Yields:
+            tokenizer.FixMessage or tokenizer.RawFixMessage
+        """
+        # A compressed file can't be memory-mapped, so it's always streamed
+        # through the tokenizer as it's decompressed.
+        if archives.get_codec(filename):
+            messages = tokenizer.iter_messages(
+                archives.iter_lines(self.get_file_path(filename)), msg_types,
+                required_fields)
+            if self.has_time_range():
+                messages = self.iter_time_range(messages)
+            yield from messages
+        elif self.has_time_range():
+            start, end = self.get_time_offsets(filename)
+            yield from self.iter_chunk_messages(
+                filename, start, end, msg_types, reader, required_fields)
+        elif reader == 'mmap':
+            yield from self.iter_mmap_messages(
+                filename, msg_types=msg_types, required_fields=required_fields)
+        else:
+            with self.open_log(filename) as fix_file:
+                yield from tokenizer.iter_messages(
+                    fix_file, msg_types, required_fields)
+
+    def iter_mmap_messages(self, filename: str, start: int = 0,
+                           end: int = None, msg_types: tuple = None,
+                           required_fields: tuple = ()):
+        """
+        Streams the messages that begin within a byte range of a log file by
+        memory-mapping it, so the OS page cache does the reading and the file
+        is never decoded as a whole. If the log file has a fresh offset index
+        (see load_index), only the lines of the messages with msg_types are
+        read.
+
+        Args:
+            filename (str): The name of the file.
+            start (int): The first byte of the range.
+            end (int): The byte after the last byte of the range. Defaults to
+                the end of the file.
+            msg_types (tuple):
+                Only yield messages with these MsgType (Tag 35) values.
+            required_fields (tuple):
+                Only yield messages that have all of these "Tag=value" fields.
+
+        Yields:
+            tokenizer.RawFixMessage
+        """
+        index = None
+        if msg_types is not None:
+            index = self.load_index(filename)
+        with open(self.get_file_path(filename), 'rb') as fix_file:
+            # An empty file can't be memory-mapped.
+            if os.fstat(fix_file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(fix_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if index is None:
+                    yield from tokenizer.iter_raw_messages(
+                        buffer, start, end, msg_types, required_fields)
+                    return
+                offsets, offset_msg_types = index.find_msg_type_offsets(
+                    msg_types, start, end)
+                yield from tokenizer.iter_indexed_messages(
+                    buffer, offsets, offset_msg_types, required_fields)
+
+    def has_time_range(self) -> bool:
+        return bool(self.time_from or self.time_to)
+
+    def find_time_offset(self, filename: str, timestamp: str) -> int:
+        """
+        Binary searches a log file for the first line whose timestamp isn't
+        before a timestamp, reading a single line at each step. The lines of a
+        log file are in the order they were written, so their timestamps are
+        sorted.
+
+        Args:
+            filename (str): The name of the file.
+            timestamp (str): A full log timestamp.
+
+        Returns:
+            int: The byte offset of the line, or the size of the file if every
+                line is before the timestamp.
+        """
+        timestamp = timestamp.encode()
+
+        with open(self.get_file_path(filename), 'rb') as fix_file:
+            size = os.fstat(fix_file.fileno()).st_size
+
+            def get_line_start(position: int) -> int:
+                # The start of the first line that begins at or after
+                # position, and the file is left there.
+                if position == 0:
+                    fix_file.seek(0)
+                    return 0
+                fix_file.seek(position - 1)
+                return position - 1 + len(fix_file.readline())
+
+            # Find the first position whose next line is at or after the
+            # timestamp.
+            low = 0
+            high = size
+            while low < high:
+                middle = (low + high) // 2
+                line_start = get_line_start(middle)
+                is_after = line_start >= size or (
+                    fix_file.read(settings.TIMESTAMP_LENGTH) >= timestamp)
+                if is_after:
+                    high = middle
+                else:
+                    low = middle + 1
+            return get_line_start(low)
+
+    def get_time_offsets(self, filename: str) -> tuple:
+        """
+        Returns the byte range of a log file that the time range covers (see
+        find_time_offset). A compressed file can't be searched, so its range
+        is the whole file, and its messages are filtered as they're read
+        instead (see iter_time_range).
+
+        Args:
+            filename (str): The name of the file.
+
+        Returns:
+            tuple: start, end
+        """
+        size = os.path.getsize(self.get_file_path(filename))
+        if not self.has_time_range() or archives.get_codec(filename):
+            return 0, size
+        start = 0
+        end = size
+        if self.time_from:
+            start = self.find_time_offset(filename, self.time_from)
+        if self.time_to:
+            end = max(start, self.find_time_offset(filename, self.time_to))
+        return start, end
+
+    def iter_time_range(self, messages):
+        """
+        Yields the messages within the time range, and stops at the first
+        message after it.
+
+        Args:
+            messages: An iterable of tokenizer.FixMessage or
+                tokenizer.RawFixMessage in the order of the log.
+        """
+        for message in messages:
+            timestamp = message.timestamp
+            if self.time_to and timestamp >= self.time_to:
+                return
+            if timestamp >= self.time_from:
+                yield message
+
+    def get_chunks(self, chunk_size: int = settings.CHUNK_SIZE) -> list:
+        """
+        Splits the log files in the directory into byte ranges so that large
+        files can be scanned in parallel.
+
+        Args:
+            chunk_size (int): The maximum number of bytes in a chunk.
+
+        Returns:
+            list: 3-tuples of filename, start, end
+        """
+        chunks = []
+        for filename in self.get_filenames():
+            chunks.extend(self.get_file_chunks(filename, chunk_size))
+        return chunks
+
+    def get_file_chunks(self, filename: str,
+                        chunk_size: int = settings.CHUNK_SIZE) -> list:
+        """
+        Splits the time range of a log file (see get_time_offsets) into byte
+        ranges. The ranges don't need to line up with message boundaries (see
+        tokenizer.iter_chunk_lines). A compressed file can only be read from
+        its beginning, so it's a single range.
+
+        Args:
+            filename (str): The name of the file.
+            chunk_size (int): The maximum number of bytes in a chunk.
+
+        Returns:
+            list: 3-tuples of filename, start, end
+        """
+        first, end = self.get_time_offsets(filename)
+        if archives.get_codec(filename):
+            return [(filename, first, end)]
+        return [
+            (filename, start, min(start + chunk_size, end))
+            for start in range(first, end, chunk_size)
+        ]
+
+    def iter_file_blocks(self, filename: str,
+                         block_size: int = settings.READ_BUFFER_SIZE):
+        """
+        Yields the bytes of a log file (decompressed if it's compressed) a
+        block at a time. Every block ends at the end of a line, so each one
+        can be tokenized on its own. Only the time range of the file is read
+        (see get_time_offsets).
+
+        Args:
+            filename (str): The name of the file.
+            block_size (int): The number of bytes read at a time.
+        """
+        path = self.get_file_path(filename)
+        start, end = self.get_time_offsets(filename)
+        if archives.get_codec(filename):
+            fix_file = archives.open_compressed(path)
+            # The offsets of a compressed file are within the compressed
+            # bytes, so it's read to the end.
+            end = None
+        else:
+            fix_file = open(path, 'rb')
+            fix_file.seek(start)
+        with fix_file:
+            remainder = b''
+            position = start
+            while end is None or position < end:
+                if end is not None:
+                    block_size = min(block_size, end - position)
+                block = fix_file.read(block_size)
+                if not block:
+                    break
+                position += len(block)
+                block = remainder + block
+                last_newline = block.rfind(b'\n') + 1
+                remainder = block[last_newline:]
+                if last_newline:
+                    yield block[:last_newline]
+            if remainder:
+                yield remainder
+
+    def iter_chunk_messages(self, filename: str, start: int, end: int,
+                            msg_types: tuple = None, reader: str = 'text',
+                            required_fields: tuple = ()):
+        """
+        Streams the messages that begin within a byte range of a log file.
+
+        Args:
+            filename (str): The name of the file.
+            start (int): The first byte of the chunk.
+            end (int): The byte after the last byte of the chunk.
+            msg_types (tuple):
+                Only yield messages with these MsgType (Tag 35) values.
+            reader (str): "text" or "mmap" (see iter_log_messages).
+            required_fields (tuple):
+                Only yield messages that have all of these "Tag=value" fields.
+
+        Yields:
+            tokenizer.FixMessage or tokenizer.RawFixMessage
+        """
+        if archives.get_codec(filename):
+            assert start == 0, 'A compressed file can only be read whole.'
+            yield from self.iter_file_messages(
+                filename, msg_types, reader, required_fields)
+            return
+        if reader == 'mmap':
+            yield from self.iter_mmap_messages(
+                filename, start, end, msg_types, required_fields)
+            return
+
+        with open(self.get_file_path(filename), 'rb',
+                  buffering=settings.READ_BUFFER_SIZE) as fix_file:
+            lines = tokenizer.iter_chunk_lines(fix_file, start, end)
+            yield from tokenizer.iter_messages(
+                lines, msg_types, required_fields)
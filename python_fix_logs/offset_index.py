@@ -0,0 +1,242 @@
+import heapq
+import os
+import shutil
+import sys
+
+import numpy as np
+
+import archives
+import columns
+import mixins
+import settings
+import tokenizer
+
+# The columns (see columns.COLUMN_TAGS) whose values are indexed.
+INDEX_COLUMNS = ('msg_type', 'cl_ord_id', 'symbol')
+# The file of an index that records the size and mtime of its log file. It's
+# written last, so an index without it is incomplete.
+SOURCE_FILENAME = 'source.npy'
+
+
+class OffsetIndex:
+    """
+    The byte offsets of the messages of a single log file, grouped by the
+    value of each of INDEX_COLUMNS.
+
+    Every column is stored as three arrays in the index's directory: the
+    sorted unique values ("keys"), where each value's offsets begin
+    ("starts"), and the offsets themselves, in file order within each value
+    ("offsets"). The arrays are memory-mapped, so a lookup only reads the
+    pages that its binary search touches.
+    """
+
+    __slots__ = ('path',)
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load_array(self, column: str, name: str):
+        return np.load(
+            os.path.join(self.path, f'{column}.{name}.npy'), mmap_mode='r')
+
+    def find_offsets(self, column: str, value: str):
+        """
+        Returns the offsets of the messages whose column has a value.
+
+        Args:
+            column (str): One of INDEX_COLUMNS.
+            value (str)
+
+        Returns:
+            numpy.ndarray: The offsets in file order.
+        """
+        keys = self.load_array(column, 'keys')
+        index = int(np.searchsorted(keys, value))
+        if index == len(keys) or keys[index] != value:
+            return np.zeros(0, dtype=np.int64)
+        starts = self.load_array(column, 'starts')
+        return np.array(self.load_array(column, 'offsets')[
+            starts[index]:starts[index + 1]])
+
+    def find_msg_type_offsets(self, msg_types: tuple, start: int = 0,
+                              end: int = None) -> tuple:
+        """
+        Returns the offsets of the messages with some MsgType values that
+        begin within a byte range of the log file.
+
+        Args:
+            msg_types (tuple)
+            start (int): The first byte of the range.
+            end (int): The byte after the last byte of the range. Defaults to
+                the end of the file.
+
+        Returns:
+            tuple: A list of the offsets in file order, and a list of the
+                MsgType of each one.
+        """
+        msg_type_offsets = [
+            self.find_offsets('msg_type', msg_type) for msg_type in msg_types]
+        offsets = np.concatenate(
+            [np.zeros(0, dtype=np.int64)] + msg_type_offsets)
+        offset_msg_types = np.repeat(
+            np.arange(len(msg_types)),
+            [len(type_offsets) for type_offsets in msg_type_offsets])
+        is_in_range = offsets >= start
+        if end is not None:
+            is_in_range &= offsets < end
+        order = np.argsort(offsets[is_in_range], kind='stable')
+        return (
+            offsets[is_in_range][order].tolist(),
+            [msg_types[index]
+             for index in offset_msg_types[is_in_range][order].tolist()],
+        )
+
+
+def load_index(index_path: str, file_path: str) -> OffsetIndex:
+    """
+    Returns the offset index of a log file, or None if it has no complete
+    index or the log file has changed since the index was built.
+
+    Args:
+        index_path (str): The directory of the index.
+        file_path (str): The path of the log file.
+
+    Returns:
+        OffsetIndex
+    """
+    source_path = os.path.join(index_path, SOURCE_FILENAME)
+    if not os.path.exists(source_path):
+        return None
+    stat = os.stat(file_path)
+    source_size, source_mtime_ns = np.load(source_path).tolist()
+    if source_size != stat.st_size or source_mtime_ns != stat.st_mtime_ns:
+        return None
+    return OffsetIndex(index_path)
+
+
+class IndexStore(mixins.FixLogMixin):
+    """
+    Builds the offset indexes of the FIX log files, and looks up the messages
+    with a MsgType, ClOrdID or Symbol without reading the rest of the logs.
+
+    Like a columnar sidecar, an index records the size and mtime of the log
+    file that it was built from, and is ignored once the log file changes.
+    """
+
+    def build_index(self, filename: str) -> str:
+        """
+        Parses a log file (see columns.read_columns) and saves its index.
+
+        Args:
+            filename (str): The name of the log file.
+
+        Returns:
+            str: The directory of the index.
+        """
+        stat = os.stat(self.get_file_path(filename))
+        file_columns = columns.read_columns(self, filename)
+        offsets = file_columns['offset']
+
+        index_path = self.get_index_path(filename)
+        # Remove any previous index, so that it's never partly replaced.
+        shutil.rmtree(index_path, ignore_errors=True)
+        os.makedirs(index_path)
+        for column in INDEX_COLUMNS:
+            values = file_columns[column]
+            # A message without the Tag isn't indexed by it.
+            has_value = values != ''
+            values = values[has_value]
+            # A stable sort keeps each value's offsets in file order.
+            order = np.argsort(values, kind='stable')
+            values = values[order]
+            keys = values[columns.is_new_key(values)]
+            starts = np.searchsorted(values, keys)
+            arrays = {
+                'keys': keys,
+                'starts': np.append(starts, len(values)).astype(np.int64),
+                'offsets': offsets[has_value][order],
+            }
+            for name, array in arrays.items():
+                np.save(os.path.join(index_path, f'{column}.{name}.npy'), array)
+        np.save(
+            os.path.join(index_path, SOURCE_FILENAME),
+            np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64))
+        return index_path
+
+    def build_all(self) -> list:
+        """
+        Builds an index for every log file that doesn't have a fresh one.
+        Compressed log files are skipped, because an index stores the byte
+        offsets of the messages within the file.
+
+        Returns:
+            list: The filenames whose indexes were built.
+        """
+        built = []
+        for filename in self.get_filenames():
+            if archives.get_codec(filename):
+                continue
+            if self.load_index(filename) is None:
+                self.build_index(filename)
+                built.append(filename)
+        return built
+
+    def iter_file_lookup(self, filename: str, index: OffsetIndex,
+                         column: str, value: str):
+        """
+        Yields the messages of a log file whose column has a value, by seeking
+        to each of their offsets.
+
+        Yields:
+            tokenizer.FixMessage
+        """
+        with open(self.get_file_path(filename), 'rb') as fix_file:
+            for offset in index.find_offsets(column, value).tolist():
+                fix_file.seek(offset)
+                yield from tokenizer.iter_messages(
+                    [fix_file.readline().decode()])
+
+    def lookup(self, field: str) -> list:
+        """
+        Returns the messages of every log file with a field, in the order of
+        their timestamps. The log files without a fresh index are scanned
+        instead.
+
+        Args:
+            field (str): A field of one of INDEX_COLUMNS in "Tag=value" form,
+                e.g. "11=8S3G4" for the messages of a ClOrdID.
+
+        Returns:
+            list: tokenizer.FixMessage
+        """
+        tag, _, value = field.partition('=')
+        tag_columns = {columns.COLUMN_TAGS[column]: column
+                       for column in INDEX_COLUMNS}
+        assert tag in tag_columns, (
+            f'Only the Tags {", ".join(tag_columns)} are indexed.')
+        column = tag_columns[tag]
+
+        file_messages = []
+        for filename in self.get_filenames():
+            index = self.load_index(filename)
+            if index is not None:
+                file_messages.append(
+                    self.iter_file_lookup(filename, index, column, value))
+                continue
+            file_messages.append(
+                message for message in self.iter_file_messages(filename)
+                if message.get(tag) == value)
+        # The messages of each log file are already in time order.
+        return list(heapq.merge(
+            *file_messages, key=lambda message: message.timestamp))
+
+
+if __name__ == '__main__':
+    store = IndexStore()
+    if len(sys.argv) > 1:
+        for message in store.lookup(sys.argv[1]):
+            print(message.timestamp, message.body.replace(
+                settings.DELIMITER, '|'))
+    else:
+        built = store.build_all()
+        print(f'Built {len(built)} index(es): {built}')
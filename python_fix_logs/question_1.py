@@ -1,15 +1,9 @@
-import re
-import sys
 from enum import Enum
 
-import xlsxwriter
-
+import engine
 import mixins
 import settings
 
-sys.path.insert(0, '')
-from utils import timer
-
 
 class OrderStatus(Enum):
     NEW = '0'
@@ -41,17 +35,34 @@ class OrderStatusAnalyzer(mixins.FixLogMixin):
     This script processes the FIX log files in the directory and reports a
     summary of the number of orders broken down by order status (Tag 39) in
     the categories that it's instantiated with.
+
+    It's a projection of the orders of a lifecycle.OrderBook, which counts
+    the OrdStatus of every execution report. With distinct_orders, it also
+    counts the orders (cancel/replace chains) that had each OrdStatus, so an
+    order with five partial fills is counted once, and the orders whose final
+    OrdStatus it is.
     """
 
-    def __init__(self, categories_needed: tuple, excel_filename: str = ''):
+    def __init__(self, categories_needed: tuple, excel_filename: str = '',
+                 output_format: str = '', distinct_orders: str = None):
+        """
+        Args:
+            categories_needed (tuple): The OrdStatus values to count.
+            excel_filename (str)
+            output_format (str): See settings.OUTPUT_FORMAT.
+            distinct_orders (str): "exact", "approximate" or an empty string
+                (see settings.DISTINCT_ORDERS). Defaults to
+                settings.DISTINCT_ORDERS.
+        """
         if excel_filename:
             assert excel_filename[-5:] == '.xlsx', (
                 'The excel_filename must end with ".xlsx"')
         self.excel_filename = excel_filename
-        # Hard coding the execution_report_tag because it will always be
+        self.output_format = output_format or settings.OUTPUT_FORMAT
+        # Hard coding the execution report MsgType because it will always be
         # needed when traversing through FIX logs searching and analyzing
         # Tag 39. Every time a message has Tag 39 it has Tag 35=8.
-        self.execution_report_tag = '35=8'
+        self.msg_types = (settings.EXECUTION_REPORT,)
         self.order_status_tag = '39'
 
         # Store data into a dict where the the Tag is the key and the count of
@@ -64,71 +75,157 @@ class OrderStatusAnalyzer(mixins.FixLogMixin):
 
         self.report = report
 
-    @timer
-    def execute_report(self):
+        if distinct_orders is None:
+            distinct_orders = settings.DISTINCT_ORDERS
+        self.distinct_orders = distinct_orders
+        # Store the distinct orders into a dict where the Tag is the key and
+        # a counter of the orders that had the OrdStatus is the value (see
+        # distinct.py). The order book hands over every order once its chain
+        # is linked, so it's counted under its first Order Id.
+        self.orders = {}
+        # Store the final OrdStatus of the orders into a dict where the Tag is
+        # the key and the count of orders is the value. The order book hands
+        # over every order once, so these don't need a set.
+        self.final_orders = {}
+        if distinct_orders:
+            import distinct
+            for tag in report:
+                self.orders[tag] = distinct.new_counter(distinct_orders)
+                self.final_orders[tag] = 0
+
+        # Identifies this report's saved state in an incremental checkpoint.
+        self.checkpoint_key = 'order_status:' + ','.join(report)
+        if distinct_orders:
+            self.checkpoint_key += f':{distinct_orders}'
+
+    def execute_report(self, workers: int = 1):
         """
         Executes the script to create a report in Excel format.
+
+        Args:
+            workers (int): The number of processes that scan the log files.
+        """
+        engine.ReportEngine([self], workers).execute_report()
+
+    def process_execution(self, order, message):
+        """
+        Counts the order status (Tag 39) of an execution report.
+
+        Args:
+            order (lifecycle.OrderRecord): The order, including the execution
+                report.
+            message (tokenizer.FixMessage)
         """
-        print()
-
-        filenames = self.get_filenames()
-        order_status_tag = self.order_status_tag + '='
-        execution_report_tag = self.execution_report_tag
-
-        for filename in filenames:
-            fix_file = open(f'{settings.RELATIVE_PATH}/{filename}', 'r')
-
-            for message in fix_file.readlines():
-                # Only tag "35-8" has order statuses (39=2, 39=1, and 39=4).
-                # Search for "35=8" first because it's always near the
-                # beginning of the message.
-                # Proof: https://www.onixs.biz/fix-dictionary/4.2/tagnum_35.html
-                end_index =  min([settings.START_INDEX * 2, len(message) - 1])
-                message_beginning = message[settings.START_INDEX: end_index]
-                if execution_report_tag in message_beginning:
-                    tag_list = re.split(settings.DELIMITER, message)
-
-                    # Only count messages that contain the order_status_tag (39).
-                    # Traverse the tag_list backwards because it is always
-                    # closer to the end of the message.
-                    index = len(tag_list) - 1
-                    while index > -1:
-                        tag = tag_list[index]
-                        if tag[:3] != order_status_tag:
-                            index -= 1
-                        else:
-                            index = -1
-                            # If there's a KeyError, then it's not needed.
-                            try:
-                                self.report[tag] += 1
-                            except KeyError:
-                                continue
-            fix_file.close()
+        tag = f'{self.order_status_tag}={order.ord_status}'
+        # If the tag isn't in the report, then it's not needed.
+        if tag in self.report:
+            self.report[tag] += 1
 
+    def process_order(self, order):
+        """
+        Counts an order under every order status that it had, and under its
+        final order status.
+
+        Args:
+            order (lifecycle.OrderRecord)
+        """
+        if not self.distinct_orders:
+            return
+        key = self.get_order_key(order.session, order.root_id)
+        for ord_status in order.ord_statuses:
+            tag = f'{self.order_status_tag}={ord_status}'
+            if tag in self.orders:
+                self.orders[tag].add(key)
+        tag = f'{self.order_status_tag}={order.ord_status}'
+        if tag in self.final_orders:
+            self.final_orders[tag] += 1
+
+    def get_order_key(self, session: str, order_id: str) -> str:
+        return f'{session}{settings.DELIMITER}{order_id}'
+
+    def can_process_columns(self, sidecar: dict) -> bool:
+        """
+        Returns False if the orders have to be counted, which needs the
+        order book, so the log file has to be scanned instead.
+        """
+        return not self.distinct_orders
+
+    def process_columns(self, sidecar: dict) -> bool:
+        """
+        Counts the order statuses of a whole log file at once from its
+        columnar sidecar (see columns.py).
+
+        Args:
+            sidecar (dict): The columns of the log file.
+
+        Returns:
+            bool: True, because the sidecar has every column that's needed.
+        """
+        # NumPy is only imported once a sidecar is used.
+        import columns
+        is_execution_report = sidecar['msg_type'] == settings.EXECUTION_REPORT
+        counts = columns.count_values(sidecar['ord_status'][is_execution_report])
+        for order_status, count in counts.items():
+            tag = f'{self.order_status_tag}={order_status}'
+            if tag in self.report:
+                self.report[tag] += count
+        return True
+
+    def get_partial(self) -> dict:
+        """
+        Returns the counts gathered so far, so that the counts from separate
+        worker processes can be merged together.
+
+        Returns:
+            dict: "messages", "orders" and "final_orders" each have the Tag as
+                the key. The values are the count of execution reports, a
+                counter's get_partial() and the count of orders.
+        """
+        return {
+            'messages': dict(self.report),
+            'orders': {
+                tag: orders.get_partial()
+                for tag, orders in self.orders.items()
+            },
+            'final_orders': dict(self.final_orders),
+        }
+
+    def merge_partial(self, partial: dict):
+        """
+        Adds the counts from another worker's get_partial() to the report.
+
+        Args:
+            partial (dict)
+        """
+        for tag, count in partial['messages'].items():
+            self.report[tag] += count
+        for tag, orders in partial['orders'].items():
+            self.orders[tag].merge_partial(orders)
+        for tag, count in partial['final_orders'].items():
+            self.final_orders[tag] += count
+
+    def complete_report(self):
         self.save_to_excel()
 
     def save_to_excel(self):
         print(self.report)
-
-        # Create a workbook and add a worksheet.
-        output_path = self.get_output_path(__file__)
-        workbook = xlsxwriter.Workbook(output_path)
-        worksheet = workbook.add_worksheet()
-
-        # Start from the first cell. Rows and columns are zero indexed.
-        row = 0
-        col = 0
-        worksheet.write(row, col, 'Category')
-        worksheet.write(row, col + 1, 'Count')
-
-        # Iterate over the data and write it out row by row.
-        for category, count in self.report.items():
-            row += 1
-            worksheet.write(row, col, category)
-            worksheet.write(row, col + 1, count)
-
-        workbook.close()
-        print(f'Created: {output_path}')
+        header = ['Category', 'Count']
+        rows = [[tag, count] for tag, count in self.report.items()]
+        if self.distinct_orders:
+            orders_label = 'Orders'
+            if self.distinct_orders == 'approximate':
+                orders_label += ' (approximate)'
+            header += [orders_label, 'Final Orders']
+            for row in rows:
+                row += [len(self.orders[row[0]]), self.final_orders[row[0]]]
+            print(f'{orders_label}:', {
+                tag: len(orders) for tag, orders in self.orders.items()})
+            print('Final Orders:', self.final_orders)
+
+        with self.open_report(__file__) as writer:
+            writer.start_table(header)
+            writer.write_rows(rows)
+        print(f'Created: {", ".join(writer.output_paths)}')
 
 
 if __name__ == '__main__':
@@ -14,10 +14,15 @@ class OrderStatusAnalyzer2(original.OrderStatusAnalyzer):
     This script processes the FIX log files in the directory and reports a
     summary of the number of orders broken down by order status (Tag 39) in
     the categories that it's instantiated with.
+
+    It only counts execution reports, not distinct orders.
     """
 
-    def __init__(self, categories_needed: tuple, excel_filename: str = ''):
-        super().__init__(categories_needed, excel_filename)
+    def __init__(self, categories_needed: tuple, excel_filename: str = '',
+                 output_format: str = ''):
+        super().__init__(
+            categories_needed, excel_filename, output_format,
+            distinct_orders='')
 
         # Create a string where the categories are side to side without any
         # delimeters.
@@ -43,18 +48,28 @@ class OrderStatusAnalyzer2(original.OrderStatusAnalyzer):
         order_status_tag = self.order_status_tag + '='
 
         for filename in filenames:
-            fix_file = open(f'{settings.RELATIVE_PATH}/{filename}', 'r')
-
-            contents = fix_file.read()
-            pattern = rf'39=([{self.categories_needed}])'
-            results = re.finditer(pattern, contents)
-
-            for message in results:
-                order_status = message.group(1)
-                self.report[order_status_tag + order_status] += 1
+            with self.metrics.phase('read'):
+                fix_file = self.open_log(filename)
+                contents = fix_file.read()
+
+            # The regex search and the counting are interleaved.
+            with self.metrics.phase('parse'):
+                # Only execution reports (35=8) are counted, and the Tag must
+                # follow a delimiter, so that e.g. Tag 139 isn't counted.
+                pattern = (
+                    rf'\x0135=8\x01.*?\x0139=([{self.categories_needed}])')
+                results = re.finditer(pattern, contents)
+
+                count = 0
+                for message in results:
+                    order_status = message.group(1)
+                    self.report[order_status_tag + order_status] += 1
+                    count += 1
+            self.metrics.add(len(contents), count)
             fix_file.close()
 
-        self.save_to_excel()
+        with self.metrics.phase('write_excel'):
+            self.save_to_excel()
 
 
 if __name__ == '__main__':
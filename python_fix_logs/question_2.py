@@ -1,14 +1,7 @@
-import re
-import sys
-
-import xlsxwriter
-
+import engine
 import mixins
 import settings
 
-sys.path.insert(0, '')
-from utils import timer
-
 SYMBOL_TAG = '55=ES'
 
 
@@ -17,124 +10,228 @@ class ExecutionReportAnalyzer(mixins.FixLogMixin):
     This script processes the FIX log files and reports a summary of the
     quantity filled on a specific Symbol. It uses execution report (Tag 35=8)
     and examines the CumQty field (Tag 14).
+
+    It's a projection of the orders of a lifecycle.OrderBook, which links
+    each cancel/replace chain and tracks its max Cumulative Quantity. The
+    report keeps the orders of the symbol as the book hands them over.
     """
 
-    def __init__(self, symbol_tag: str, excel_filename: str = ''):
+    def __init__(self, symbol_tag: str, excel_filename: str = '',
+                 output_format: str = ''):
         if excel_filename:
             assert excel_filename[-5:] == '.xlsx', (
                 'The excel_filename must end with ".xlsx"')
         self.excel_filename = excel_filename
+        self.output_format = output_format or settings.OUTPUT_FORMAT
         self.symbol_tag = symbol_tag
-        self.execution_report_tag = '35=8'
-
-    @timer
-    def execute_report(self):
+        # Split the symbol_tag (e.g. "55=ES") into its Tag and value.
+        self.symbol_field = tuple(symbol_tag.split('=', 1))
+        # Identifies this report's saved state in an incremental checkpoint.
+        self.checkpoint_key = f'execution_report:{symbol_tag}'
+        self.msg_types = (settings.EXECUTION_REPORT,)
+        # Lets the tokenizer skip messages for other symbols before they're
+        # split into fields.
+        self.required_fields = (symbol_tag,)
+        # Lets the order book keep the symbol of every order, whichever Tag
+        # it's in.
+        self.order_tags = (self.symbol_field[0],)
+        self.cum_qty_tag = '14'
+
+        # Order Ids (Tag 11) are only unique within a FIX session, so orders
+        # are stored per session. A session is identified by its
+        # SenderCompID (Tag 49) and TargetCompID (Tag 56), e.g. "CME-4G8287N".
+        #
+        # Store data into a nested dict where the session is the key, and the
+        # value is a dict where the Order Id of the first order in a
+        # cancel/replace chain is the key and a list of its max Cumulative
+        # Quantity and last OrdStatus is the value. Only the max Cumulative
+        # Quantity is kept, because an order can receive multiple execution
+        # reports and intermediate quantities should not be counted multiple
+        # times.
+        self.orders = {}
+
+    def execute_report(self, workers: int = 1):
         """
         Executes the script to create a report in Excel format.
+
+        Args:
+            workers (int): The number of processes that scan the log files.
+        """
+        engine.ReportEngine([self], workers).execute_report()
+
+    def add_order(self, session: str, order_id: str, cum_qty: int,
+                  ord_status: str = ''):
+        """
+        Adds an order's chain to the report, or its later part if the chain
+        is already in it.
+
+        Args:
+            session (str): See lifecycle.OrderBook.get_session.
+            order_id (str): The Order Id (Tag 11) of the first order in the
+                chain.
+            cum_qty (int): The max Cumulative Quantity (Tag 14).
+            ord_status (str): The last OrdStatus (Tag 39).
+        """
+        orders = self.orders.setdefault(session, {})
+        state = orders.get(order_id)
+        if state is None:
+            orders[order_id] = [cum_qty, ord_status]
+            return
+        if cum_qty > state[0]:
+            state[0] = cum_qty
+        if ord_status:
+            state[1] = ord_status
+
+    def process_execution(self, order, message):
+        """
+        Checks that an execution report for the symbol this analyzer was
+        instantiated with has a Cumulative Quantity (Tag 14).
+
+        Args:
+            order (lifecycle.OrderRecord): The order, including the execution
+                report.
+            message (tokenizer.FixMessage)
+        """
+        # Only check messages with self.symbol_tag "55=ES".
+        tag, symbol = self.symbol_field
+        if message.get(tag) != symbol:
+            return
+        if message.get(self.cum_qty_tag) is None:
+            raise TypeError(
+                f'Order Id "{order.root_id}"'
+                '\nThis means that Tag 14 was not in one of the messages.')
+
+    def process_order(self, order):
+        """
+        Records the max Cumulative Quantity of an order's chain for the
+        symbol this analyzer was instantiated with.
+
+        Args:
+            order (lifecycle.OrderRecord)
         """
-        print()
-
-        filenames = self.get_filenames()
-        symbol_tag = self.symbol_tag
-        execution_report_tag = self.execution_report_tag
-
-        # Store data into a dict where the Order Id is the key and the a list
-        # of cumulative quantities is the value.
-        report = {}
-
-        for filename in filenames:
-            fix_file = open(f'{settings.RELATIVE_PATH}/{filename}', 'r')
-
-            for message in fix_file.readlines():
-                # Search for "35=8" first because it's always near the
-                # beginning of the message.
-                # Proof: https://www.onixs.biz/fix-dictionary/4.2/tagnum_35.html
-
-                end_index =  min([settings.START_INDEX * 2, len(message) - 1])
-                message_beginning = message[settings.START_INDEX: end_index]
-                if execution_report_tag in message_beginning:
-                    tag_list = re.split(settings.DELIMITER, message)
-
-                    # Only report messages with self.symbol_tag "55=ES".
-                    # Traverse the tag_list backwards because that tag is
-                    # always closer to the end of the message.
-                    index = len(tag_list) - 1
-                    while index > -1:
-                        if tag_list[index] != symbol_tag:
-                            index -= 1
-                        else:
-                            index = -1
-                            # Get the message's Order Id and Cumulative Quantity.
-                            order_id = cumulative_qty = None
-                            for tag in tag_list:
-                                if tag[:3] == '11=':
-                                    order_id = tag[3:]
-                                elif tag[:3] == '14=':
-                                    cumulative_qty = int(tag[3:])
-                            assert order_id is not None, (
-                                'Tag 11 was not in the message.')
-
-                            report.setdefault(
-                                order_id, [cumulative_qty]).append(cumulative_qty)
-
-            fix_file.close()
-
-        result = self.finish_report(report)
+        tag, symbol = self.symbol_field
+        # An order without execution reports has no Cumulative Quantity.
+        if order.fields.get(tag) != symbol or not order.executions:
+            return
+        self.add_order(
+            order.session, order.root_id, order.cum_qty, order.ord_status)
+
+    def can_process_columns(self, sidecar: dict) -> bool:
+        """
+        Returns False if the sidecar doesn't have the symbol's Tag, in which
+        case the log file has to be scanned instead.
+        """
+        # NumPy is only imported once a sidecar is used.
+        import columns
+        return self.symbol_field[0] == columns.COLUMN_TAGS['symbol']
+
+    def process_columns(self, sidecar: dict) -> bool:
+        """
+        Finds the max Cumulative Quantity of every order in a whole log file
+        at once from its columnar sidecar (see columns.py).
+
+        Args:
+            sidecar (dict): The columns of the log file.
+
+        Returns:
+            bool: True, because can_process_columns checked that the sidecar
+                has every column that's needed.
+        """
+        import columns
+        symbol = self.symbol_field[1]
+        rows = (
+            (sidecar['msg_type'] == settings.EXECUTION_REPORT) &
+            (sidecar['symbol'] == symbol)
+        )
+        order_ids = sidecar['cl_ord_id'][rows]
+        cumulative_qtys = sidecar['cum_qty'][rows]
+        assert not (order_ids == '').any(), 'Tag 11 was not in the message.'
+        if (cumulative_qtys == columns.MISSING_QTY).any():
+            raise TypeError(
+                'This means that Tag 14 was not in one of the messages.')
+
+        # The order book has added the session and the first Order Id of the
+        # chain of every message (see lifecycle.OrderBook.add_order_columns).
+        sessions = sidecar['session'][rows]
+        root_ids = sidecar['root_id'][rows]
+        ord_statuses = sidecar['ord_status'][rows]
+
+        for session in set(sessions.tolist()):
+            in_session = sessions == session
+            ids, max_qtys = columns.group_max(
+                root_ids[in_session], cumulative_qtys[in_session])
+            last_ids, last_statuses = columns.group_last(
+                root_ids[in_session], ord_statuses[in_session])
+            for order_id, cum_qty, ord_status in zip(
+                    ids.tolist(), max_qtys.tolist(), last_statuses.tolist()):
+                self.add_order(session, order_id, cum_qty, ord_status)
+        return True
+
+    def get_partial(self) -> dict:
+        """
+        Returns the state of every order seen so far, so that the results
+        from separate worker processes can be merged together.
+
+        Returns:
+            dict: "orders" maps each session and Order Id to the order's max
+                Cumulative Quantity and last OrdStatus.
+        """
+        return {
+            'orders': {
+                session: {
+                    order_id: list(state) for order_id, state in orders.items()
+                }
+                for session, orders in self.orders.items()
+            },
+        }
+
+    def merge_partial(self, partial: dict):
+        """
+        Adds the order states from another worker's get_partial() to the
+        report.
+
+        Args:
+            partial (dict)
+        """
+        for session, orders in partial['orders'].items():
+            for order_id, (cum_qty, ord_status) in orders.items():
+                self.add_order(session, order_id, cum_qty, ord_status)
+
+    def complete_report(self):
+        result = self.finish_report()
         self.save_to_excel(*result)
 
-    def finish_report(self, report) -> tuple:
+    def finish_report(self) -> tuple:
         """
-        Change the value for each order from a list of Cumulative Quantities
-        to the max Cumulative Quantity because an order (uniquely identified
-        by Order Id, Tag 11) can receive multiple execution reports.
-        Intermediate quantities should not be counted multiple times.
+        Returns the sum of the max Cumulative Quantity of every order, and the
+        orders sorted by session and Order Id.
+
+        Returns:
+            tuple: cumulative_qty_sum, a list of 3-tuples of session, Order Id
+                and Cumulative Quantity
         """
         cumulative_qty_sum = 0
-        for order_id, qty_list in report.items():
-            try:
-                cumulative_qty = max(qty_list)
-                cumulative_qty_sum += cumulative_qty
-                report[order_id] = cumulative_qty
-            except TypeError as e:
-                # Example Exception:
-                #   TypeError: '>' not supported between instances of 'NoneType' and 'int'
-                raise TypeError(
-                    str(e) +
-                    '\nThis means that Tag 14 was not in one of the messages.')
-
-        # Sort the dictionary by key/Order Id, because it's not guaranteed to
-        # be in order.
-        # (report get's reassigned as a list of 2-tuples)
-        report = sorted(report.items())
+        report = []
+        for session, orders in self.orders.items():
+            for order_id, (cum_qty, ord_status) in orders.items():
+                cumulative_qty_sum += cum_qty
+                report.append((session, order_id, cum_qty))
+
+        # Sort the orders, because the dicts are not guaranteed to be in order.
+        report.sort()
         return cumulative_qty_sum, report
 
-    def save_to_excel(self, cumulative_qty_sum: int, report: dict):
-        # Create a workbook and add a worksheet.
-        output_path = self.get_output_path(__file__)
-        workbook = xlsxwriter.Workbook(output_path)
-        worksheet = workbook.add_worksheet()
-
-        # Start from the first cell. Rows and columns are zero indexed.
-        row = 0
-        col = 0
-
-        # Iterate over the data and write it out row by row.
-        worksheet.write(row, col, 'Cumulative Quantity Sum')
-        row += 1
-        worksheet.write(row, col, cumulative_qty_sum)
-        row += 2
-
-        worksheet.write(row, col, 'Order Id')
-        worksheet.write(row, col + 1, 'Cumulative Quantity')
-        print(f'Cumulative Quantity for symbol "{self.symbol_tag}": {cumulative_qty_sum}')
-
-        for order_id, qty in report:
-            row += 1
-            worksheet.write(row, col, order_id)
-            worksheet.write(row, col + 1, qty)
-
-        workbook.close()
-        print(f'Detailed Report Created: {output_path}')
+    def save_to_excel(self, cumulative_qty_sum: int, report: list):
+        # The rows are streamed to the file, because there's one per order.
+        with self.open_report(__file__) as writer:
+            writer.start_table(['Cumulative Quantity Sum'], 'summary')
+            writer.write_row([cumulative_qty_sum])
+            print(f'Cumulative Quantity for symbol "{self.symbol_tag}": {cumulative_qty_sum}')
+
+            writer.start_table(
+                ['Session', 'Order Id', 'Cumulative Quantity'], 'orders')
+            writer.write_rows(report)
+        print(f'Detailed Report Created: {", ".join(writer.output_paths)}')
 
 
 if __name__ == '__main__':
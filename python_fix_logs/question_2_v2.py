@@ -1,6 +1,7 @@
 import re
 import sys
 
+import lifecycle
 import question_2 as original
 import settings
 
@@ -25,26 +26,38 @@ class ExecutionReportAnalyzer2(original.ExecutionReportAnalyzer):
         print()
 
         filenames = self.get_filenames()
-
-        # Store data into a dict where the Order Id is the key and the a list
-        # of cumulative quantities is the value.
-        report = {}
+        # The messages don't pass through an order book, so the chains of each
+        # session are linked here (see lifecycle.find_root_id).
+        session_root_ids = {}
 
         for filename in filenames:
-            fix_file = open(f'{settings.RELATIVE_PATH}/{filename}', 'r')
-            contents = fix_file.read()
-            pattern = r'11=(?P<order_id>\w+).*14=(?P<qty>\d+)'
-            results = re.finditer(pattern, contents)
-
-            for message in results:
-                order_id = message.group('order_id')
-                cumulative_qty = int(message.group('qty'))
-                report.setdefault(
-                    order_id, [cumulative_qty]).append(cumulative_qty)
+            with self.metrics.phase('read'):
+                fix_file = self.open_log(filename)
+                contents = fix_file.read()
+
+            # The regex search and the aggregation are interleaved.
+            with self.metrics.phase('parse'):
+                pattern = (
+                    r'\x0149=(?P<sender>\w+)\x01.*\x0156=(?P<target>\w+)\x01'
+                    r'.*11=(?P<order_id>\w+).*14=(?P<qty>\d+)'
+                    r'(?:.*\x0141=(?P<orig_order_id>\w+))?')
+                results = re.finditer(pattern, contents)
+
+                count = 0
+                for message in results:
+                    session = message.group('sender') + '-' + message.group('target')
+                    order_id = message.group('order_id')
+                    cumulative_qty = int(message.group('qty'))
+                    order_id = lifecycle.find_root_id(
+                        session_root_ids.setdefault(session, {}), order_id,
+                        message.group('orig_order_id'))
+                    self.add_order(session, order_id, cumulative_qty)
+                    count += 1
+            self.metrics.add(len(contents), count)
             fix_file.close()
 
-        result = self.finish_report(report)
-        self.save_to_excel(*result)
+        with self.metrics.phase('write_excel'):
+            self.complete_report()
 
 
 if __name__ == '__main__':
@@ -1,6 +1,9 @@
 # FILENAME_PREFIX represents what the filename starts with.
 FILENAME_PREFIX = 'FIX.4.2-CME-'
 FILE_TYPE = '.log'
+# Log files can also be compressed, e.g. "FIX.4.2-CME-4G8287N.log.gz". They're
+# decompressed while they're read (see archives.py).
+COMPRESSED_FILE_TYPES = ('.gz', '.zst', '.bz2')
 
 # The useful tags for each message start at character index 34.
 START_INDEX = 34
@@ -8,4 +11,98 @@ START_INDEX = 34
 # DELIMITER represents what the message tags are separated by.
 DELIMITER = '\x01'
 
+# INPUT_PATTERNS are directories or glob patterns of the input files, which are
+# read instead of RELATIVE_PATH when any are set (see the --input option of
+# python -m reports).
+INPUT_PATTERNS = []
+
 RELATIVE_PATH = './python_fix_logs'
+
+# Every line starts with a timestamp like "20130808-13:28:57.009".
+TIMESTAMP_LENGTH = 21
+
+# MSG_TYPE_TAG is the tag that identifies the type of message (Tag 35) and
+# EXECUTION_REPORT is its value for execution reports (35=8).
+MSG_TYPE_TAG = '35'
+EXECUTION_REPORT = '8'
+
+# ORDER_MSG_TYPES are the MsgTypes of an order's lifecycle (see lifecycle.py):
+# new order single (35=D), cancel request (35=F), cancel/replace request
+# (35=G), execution report (35=8) and order cancel reject (35=9).
+ORDER_MSG_TYPES = ('D', 'F', 'G', '8', '9')
+
+# NEW_ORD_STATUSES are the OrdStatus (Tag 39) values of an order that has just
+# been accepted (new and pending new), and TERMINAL_ORD_STATUSES are the values
+# after which an order can't change anymore (filled, done for day, canceled,
+# rejected and expired).
+NEW_ORD_STATUSES = ('0', 'A')
+TERMINAL_ORD_STATUSES = ('2', '3', '4', '8', 'C')
+
+# FINALIZED_IDS is how many ClOrdIDs of finalized orders the order book
+# remembers, so that a late message of one (e.g. a repeated fill or a cancel
+# reject) isn't taken for the start of another order.
+FINALIZED_IDS = 10000
+
+# READ_BUFFER_SIZE is the number of bytes buffered when streaming a log file.
+READ_BUFFER_SIZE = 1024 * 1024
+
+# DECOMPRESS_QUEUE_SIZE is how many blocks of READ_BUFFER_SIZE bytes a
+# compressed log file is decompressed ahead of the messages being parsed.
+DECOMPRESS_QUEUE_SIZE = 8
+
+# CHUNK_SIZE is the maximum number of bytes of a log file that a single worker
+# process scans when the reports run in parallel.
+CHUNK_SIZE = 64 * 1024 * 1024
+
+# READER is how the report engine reads the log files by default: "text"
+# decodes every line to str, "mmap" scans the memory-mapped bytes and only
+# decodes the Tag values that the reports need. mmap searches the message once
+# for every Tag that's read, so it's only faster when the reports read a few
+# Tags per message, which the order book's projections don't.
+READER = 'text'
+
+# CHECKPOINT_FILENAME is where incremental runs save how far into each log file
+# they have read, along with the report state gathered so far.
+CHECKPOINT_FILENAME = '.checkpoint.json'
+
+# FOLLOW_INTERVAL is how many seconds follow mode waits between checking the
+# log files for new messages.
+FOLLOW_INTERVAL = 5
+
+# COLUMNS_DIRNAME is the directory (within RELATIVE_PATH) where the columnar
+# sidecars of the log files are saved.
+COLUMNS_DIRNAME = '.columns'
+
+# INDEX_DIRNAME is the directory (within RELATIVE_PATH) where the offset
+# indexes of the log files are saved (see offset_index.py). With USE_INDEX, the
+# mmap reader uses a log file's index while it's fresh.
+INDEX_DIRNAME = '.index'
+USE_INDEX = True
+
+# OUTPUT_FORMAT is the format of the reports by default: "xlsx" streams them to
+# an Excel file, "csv" to a CSV file and "parquet" to a Parquet file per table
+# (which needs pyarrow).
+OUTPUT_FORMAT = 'xlsx'
+
+# USE_PIPELINE runs the reports as a pipeline of threads (see pipeline.py):
+# PIPELINE_READERS threads read the input files, PIPELINE_PARSERS threads parse
+# what has been read, and up to PIPELINE_QUEUE_SIZE blocks wait between them.
+USE_PIPELINE = False
+PIPELINE_READERS = 1
+PIPELINE_PARSERS = 1
+PIPELINE_QUEUE_SIZE = 16
+
+# DISTINCT_ORDERS adds the number of distinct orders (cancel/replace chains)
+# with each OrdStatus to the OrdStatus report, next to the number of execution
+# reports: "exact" counts them in a set of 64-bit hashes, "approximate"
+# estimates them with a HyperLogLog of 2 ** HLL_PRECISION bytes, and an empty
+# string leaves them out.
+DISTINCT_ORDERS = ''
+HLL_PRECISION = 14
+
+# USE_BATCH parses the log files that don't have a columnar sidecar into
+# columns in memory, BATCH_SIZE bytes at a time, with NumPy (see
+# columns.parse_columns), for the reports that can answer from columns.
+# Building the sidecars always uses it.
+USE_BATCH = False
+BATCH_SIZE = 4 * 1024 * 1024
@@ -0,0 +1,149 @@
+from enum import Enum
+
+import engine
+import mixins
+import question_1
+import settings
+
+# The number of characters of a log timestamp (e.g. "20130808-13:28:57.009")
+# that identify each size of bucket.
+BUCKET_WIDTHS = {
+    'minute': len('20130808-13:28'),
+    'hour': len('20130808-13'),
+}
+
+BUCKET = 'minute'
+
+
+class TimeBucketAnalyzer(mixins.FixLogMixin):
+    """
+    This script processes the FIX log files and reports, for every minute or
+    hour, the quantity filled (the LastShares, Tag 32, of the execution
+    reports) and the number of execution reports with each order status (Tag
+    39) in the categories that it's instantiated with.
+
+    It's a projection of the orders of a lifecycle.OrderBook. Combined with a
+    time range (see engine.ReportEngine), it shows how an incident unfolded
+    without reading the rest of the day.
+    """
+
+    def __init__(self, categories_needed: tuple, bucket: str = BUCKET,
+                 symbol_tag: str = '', excel_filename: str = '',
+                 output_format: str = ''):
+        """
+        Args:
+            categories_needed (tuple): The OrdStatus values to count.
+            bucket (str): "minute" or "hour".
+            symbol_tag (str): Only count the execution reports with this
+                field, e.g. "55=ES". Counts every execution report if it's
+                not given.
+            excel_filename (str)
+            output_format (str): See settings.OUTPUT_FORMAT.
+        """
+        assert bucket in BUCKET_WIDTHS, f'Unknown bucket "{bucket}".'
+        if excel_filename:
+            assert excel_filename[-5:] == '.xlsx', (
+                'The excel_filename must end with ".xlsx"')
+        self.excel_filename = excel_filename
+        self.output_format = output_format or settings.OUTPUT_FORMAT
+        self.bucket = bucket
+        self.bucket_width = BUCKET_WIDTHS[bucket]
+        self.msg_types = (settings.EXECUTION_REPORT,)
+        self.order_status_tag = '39'
+        self.last_shares_tag = '32'
+        self.symbol_tag = symbol_tag
+        self.symbol_field = ()
+        self.required_fields = ()
+        if symbol_tag:
+            self.symbol_field = tuple(symbol_tag.split('=', 1))
+            self.required_fields = (symbol_tag,)
+
+        self.categories = []
+        for value in categories_needed:
+            if isinstance(value, Enum):
+                value = value.value
+            self.categories.append(f'{self.order_status_tag}={value}')
+
+        # Store data into a dict where the start of the bucket's timestamps
+        # (e.g. "20130808-13:28") is the key, and the value is a list of the
+        # quantity filled followed by the count of each category.
+        self.buckets = {}
+        # Identifies this report's saved state in an incremental checkpoint.
+        self.checkpoint_key = (
+            f'time_buckets:{bucket}:{symbol_tag}:' + ','.join(self.categories))
+
+    def execute_report(self, workers: int = 1):
+        """
+        Executes the script to create a report in Excel format.
+
+        Args:
+            workers (int): The number of processes that scan the log files.
+        """
+        engine.ReportEngine([self], workers).execute_report()
+
+    def process_execution(self, order, message):
+        """
+        Adds an execution report to the bucket of its timestamp.
+
+        Args:
+            order (lifecycle.OrderRecord): The order, including the execution
+                report.
+            message (tokenizer.FixMessage)
+        """
+        if self.symbol_field:
+            tag, symbol = self.symbol_field
+            if message.get(tag) != symbol:
+                return
+
+        key = order.updated[:self.bucket_width]
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [0] * (len(self.categories) + 1)
+        last_shares = message.get(self.last_shares_tag)
+        if last_shares is not None:
+            bucket[0] += int(last_shares)
+        tag = f'{self.order_status_tag}={order.ord_status}'
+        if tag in self.categories:
+            bucket[self.categories.index(tag) + 1] += 1
+
+    def get_partial(self) -> dict:
+        """
+        Returns the buckets gathered so far, so that the buckets from
+        separate worker processes can be merged together.
+
+        Returns:
+            dict: See self.buckets.
+        """
+        return {key: list(bucket) for key, bucket in self.buckets.items()}
+
+    def merge_partial(self, partial: dict):
+        """
+        Adds the buckets from another worker's get_partial() to the report.
+
+        Args:
+            partial (dict)
+        """
+        for key, other in partial.items():
+            bucket = self.buckets.setdefault(key, [0] * len(other))
+            for index, value in enumerate(other):
+                bucket[index] += value
+
+    def complete_report(self):
+        self.save_to_excel()
+
+    def save_to_excel(self):
+        # Sort the buckets, because the execution reports of separate log
+        # files are interleaved in time.
+        rows = [[key] + bucket for key, bucket in sorted(self.buckets.items())]
+        print(f'{len(rows)} {self.bucket} bucket(s)')
+
+        with self.open_report(__file__) as writer:
+            writer.start_table(
+                [self.bucket.capitalize(), 'Fill Quantity'] + self.categories)
+            writer.write_rows(rows)
+        print(f'Created: {", ".join(writer.output_paths)}')
+
+
+if __name__ == '__main__':
+    script = TimeBucketAnalyzer(question_1.CATEGORIES_NEEDED)
+    script.execute_report()
@@ -0,0 +1,299 @@
+import settings
+
+DELIMITER_BYTES = settings.DELIMITER.encode()
+
+# The earliest timestamp with each prefix, e.g. "20130808-13:28" starts at
+# "20130808-13:28:00.000".
+TIMESTAMP_TEMPLATE = '00000000-00:00:00.000'
+
+
+class FixMessage:
+    """
+    A single message from a FIX log file.
+
+    The timestamp and MsgType (Tag 35) are read up front. The tag to value
+    view is only built the first time it's needed, so messages that get
+    filtered out by MsgType are never split into fields.
+    """
+
+    __slots__ = ('timestamp', 'msg_type', 'body', '_fields')
+
+    def __init__(self, timestamp: str, msg_type: str, body: str):
+        self.timestamp = timestamp
+        self.msg_type = msg_type
+        self.body = body
+        self._fields = None
+
+    @property
+    def fields(self) -> dict:
+        """
+        Returns a dict where the Tag is the key and the Tag's value is the
+        value. If a Tag appears more than once, the last one wins.
+
+        Returns:
+            dict
+        """
+        if self._fields is None:
+            fields = {}
+            for field in self.body.split(settings.DELIMITER):
+                tag, separator, value = field.partition('=')
+                if separator:
+                    fields[tag] = value
+            self._fields = fields
+        return self._fields
+
+    def get(self, tag: str, default=None):
+        return self.fields.get(tag, default)
+
+
+class RawFixMessage:
+    """
+    A single message from a memory-mapped FIX log file.
+
+    Works directly on the bytes of the file. Nothing is split or decoded up
+    front; get() searches the message for a single Tag and only decodes that
+    Tag's value. The message is only valid while its file is still mapped.
+    """
+
+    __slots__ = ('buffer', 'start', 'end', 'msg_type')
+
+    def __init__(self, buffer, start: int, end: int, msg_type: str):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+        self.msg_type = msg_type
+
+    @property
+    def timestamp(self) -> str:
+        return self.buffer[
+            self.start: self.start + settings.TIMESTAMP_LENGTH].decode()
+
+    @property
+    def body(self) -> str:
+        return self.buffer[
+            self.start + settings.START_INDEX: self.end].decode()
+
+    @property
+    def fields(self) -> dict:
+        return FixMessage(self.timestamp, self.msg_type, self.body).fields
+
+    def get(self, tag: str, default=None):
+        # Search from the end so that, like FixMessage.fields, the last
+        # occurrence of a Tag wins.
+        field = DELIMITER_BYTES + tag.encode() + b'='
+        start = self.buffer.rfind(
+            field, self.start + settings.START_INDEX - 1, self.end)
+        if start == -1:
+            return default
+        start += len(field)
+        end = self.buffer.find(DELIMITER_BYTES, start, self.end)
+        if end == -1:
+            end = self.end
+        return self.buffer[start:end].decode()
+
+
+def pad_timestamp(timestamp: str) -> str:
+    """
+    Completes the start of a log timestamp (e.g. "20130808-13:28") into the
+    earliest full timestamp with that start (e.g. "20130808-13:28:00.000"),
+    so that it can be compared with the timestamps of the messages. An empty
+    string stays empty.
+    """
+    if not timestamp:
+        return ''
+    assert len(timestamp) <= len(TIMESTAMP_TEMPLATE) and all(
+        character.isdigit() if template == '0' else character == template
+        for character, template in zip(timestamp, TIMESTAMP_TEMPLATE)
+    ), f'"{timestamp}" is not like "{TIMESTAMP_TEMPLATE}".'
+    return timestamp + TIMESTAMP_TEMPLATE[len(timestamp):]
+
+
+def get_msg_type(line: str) -> str:
+    """
+    Returns the MsgType (Tag 35) of a raw log line, or None if the line is not
+    a FIX message.
+
+    Tag 35 is always near the beginning of the message, so only the start of
+    the line is searched.
+    Proof: https://www.onixs.biz/fix-dictionary/4.2/tagnum_35.html
+    """
+    msg_type_tag = settings.DELIMITER + settings.MSG_TYPE_TAG + '='
+    start = line.find(msg_type_tag, 0, settings.START_INDEX * 2)
+    if start == -1:
+        return None
+    start += len(msg_type_tag)
+    end = line.find(settings.DELIMITER, start)
+    return line[start:end]
+
+
+def iter_chunk_lines(fix_file, start: int, end: int):
+    """
+    Yields the lines that begin within the byte range [start, end) of a FIX
+    log file. A line that begins before start belongs to the previous chunk,
+    so chunks can be split at any byte offset without cutting a message.
+
+    Args:
+        fix_file: A FIX log file opened in binary mode.
+        start (int): The first byte of the chunk.
+        end (int): The byte after the last byte of the chunk.
+    """
+    if start > 0:
+        # Skip the rest of the line that the previous chunk owns.
+        fix_file.seek(start - 1)
+        position = start - 1 + len(fix_file.readline())
+    else:
+        fix_file.seek(0)
+        position = 0
+
+    while position < end:
+        line = fix_file.readline()
+        if not line:
+            break
+        position += len(line)
+        yield line.decode()
+
+
+def get_field_needles(required_fields: tuple) -> tuple:
+    """
+    Returns the strings to search a raw message for so that a message that
+    doesn't have every required field can be rejected before it's split.
+
+    Args:
+        required_fields (tuple): Fields in "Tag=value" form, e.g. "55=ES".
+
+    Returns:
+        tuple
+    """
+    return tuple(
+        settings.DELIMITER + field + settings.DELIMITER
+        for field in required_fields
+    )
+
+
+def iter_messages(fix_file, msg_types: tuple = None,
+                  required_fields: tuple = ()):
+    """
+    Yields a FixMessage for each message in a FIX log file.
+
+    The file is read one line at a time so memory is bounded by the longest
+    message, not by the size of the file.
+
+    Args:
+        fix_file:
+            A FIX log file opened in text mode, or any other iterable of its
+            lines (e.g. iter_chunk_lines).
+        msg_types (tuple):
+            Only yield messages with these MsgType (Tag 35) values. Yields
+            every message if it's not given.
+        required_fields (tuple):
+            Only yield messages that have all of these fields, in "Tag=value"
+            form (e.g. "55=ES").
+    """
+    timestamp_length = settings.TIMESTAMP_LENGTH
+    start_index = settings.START_INDEX
+    needles = get_field_needles(required_fields)
+
+    for line in fix_file:
+        msg_type = get_msg_type(line)
+        if msg_type is None:
+            continue
+        if msg_types is not None and msg_type not in msg_types:
+            continue
+        if needles and not all(needle in line for needle in needles):
+            continue
+        yield FixMessage(
+            line[:timestamp_length], msg_type, line[start_index:].rstrip('\n'))
+
+
+def iter_raw_messages(buffer, start: int = 0, end: int = None,
+                      msg_types: tuple = None, required_fields: tuple = ()):
+    """
+    Yields a RawFixMessage for each message that begins within the byte range
+    [start, end) of a FIX log file, without decoding the file to str.
+
+    Args:
+        buffer:
+            The contents of the file as bytes, a memoryview or an mmap.mmap.
+        start (int): The first byte of the range.
+        end (int): The byte after the last byte of the range. Defaults to the
+            end of the buffer.
+        msg_types (tuple):
+            Only yield messages with these MsgType (Tag 35) values. Yields
+            every message if it's not given.
+        required_fields (tuple):
+            Only yield messages that have all of these fields, in "Tag=value"
+            form (e.g. "55=ES").
+    """
+    size = len(buffer)
+    if end is None:
+        end = size
+    if start > 0:
+        # Skip the rest of the line that the previous range owns.
+        start = buffer.find(b'\n', start - 1)
+        if start == -1:
+            return
+        start += 1
+
+    msg_type_tag = DELIMITER_BYTES + settings.MSG_TYPE_TAG.encode() + b'='
+    search_length = settings.START_INDEX * 2
+    if msg_types is not None:
+        # Compare the MsgType as bytes so rejected messages are never decoded.
+        wanted = {msg_type.encode(): msg_type for msg_type in msg_types}
+    else:
+        wanted = None
+    needles = [
+        needle.encode() for needle in get_field_needles(required_fields)]
+
+    position = start
+    while position < end:
+        line_end = buffer.find(b'\n', position)
+        if line_end == -1:
+            line_end = size
+        type_start = buffer.find(
+            msg_type_tag, position, min(position + search_length, line_end))
+        if type_start != -1:
+            type_start += len(msg_type_tag)
+            type_end = buffer.find(DELIMITER_BYTES, type_start, line_end)
+            if type_end == -1:
+                type_end = line_end
+            raw_msg_type = buffer[type_start:type_end]
+            if wanted is None:
+                msg_type = raw_msg_type.decode()
+            else:
+                msg_type = wanted.get(raw_msg_type)
+            is_match = msg_type is not None and all(
+                buffer.find(needle, type_end, line_end) != -1
+                for needle in needles
+            )
+            if is_match:
+                yield RawFixMessage(buffer, position, line_end, msg_type)
+        position = line_end + 1
+
+
+def iter_indexed_messages(buffer, offsets: list, msg_types: list,
+                          required_fields: tuple = ()):
+    """
+    Yields a RawFixMessage for each message that begins at one of the byte
+    offsets of a FIX log file, which come from its offset index (see
+    offset_index.py), so the lines between them are never read.
+
+    Args:
+        buffer:
+            The contents of the file as bytes, a memoryview or an mmap.mmap.
+        offsets (list): The offsets in file order.
+        msg_types (list): The MsgType (Tag 35) of the message at each offset.
+        required_fields (tuple):
+            Only yield messages that have all of these fields, in "Tag=value"
+            form (e.g. "55=ES").
+    """
+    size = len(buffer)
+    needles = [
+        needle.encode() for needle in get_field_needles(required_fields)]
+
+    for start, msg_type in zip(offsets, msg_types):
+        line_end = buffer.find(b'\n', start)
+        if line_end == -1:
+            line_end = size
+        if all(buffer.find(needle, start, line_end) != -1
+               for needle in needles):
+            yield RawFixMessage(buffer, start, line_end, msg_type)
@@ -0,0 +1,224 @@
+"""
+Runs any of the reports from the command line, from any directory, e.g.
+
+    python -m reports fix question_2 --symbol 55=ES --workers 4
+    python -m reports fix all --input '/var/log/fix/*.log' --format csv
+    python -m reports baby question_1 --count 10 --engine regex
+
+Only the modules of the report that's run are imported, so the FIX log
+reports never import pandas or Beautiful Soup.
+"""
+import argparse
+import os
+import sys
+
+REPO_PATH = os.path.dirname(os.path.abspath(__file__))
+# The directory of each suite of reports.
+SUITES = {
+    'fix': 'python_fix_logs',
+    'baby': 'python_baby_names',
+}
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m reports',
+        description='Creates a report from the FIX logs or the baby names.')
+    subparsers = parser.add_subparsers(dest='suite', required=True)
+
+    fix_parser = subparsers.add_parser('fix', help='FIX log reports')
+    fix_parser.add_argument(
+        'report', choices=('question_1', 'question_2', 'time_buckets', 'all'),
+        help='question_1 counts orders by OrdStatus (Tag 39), question_2 '
+             'sums the CumQty (Tag 14) of a symbol, time_buckets sums the '
+             'fills and counts the OrdStatus of every minute or hour, and all '
+             'creates question_1 and question_2 from a single scan.')
+    fix_parser.add_argument(
+        '--engine', choices=('mmap', 'text', 'regex'),
+        help='How the logs are read: "mmap" and "text" are the readers of '
+             'the report engine, and "regex" searches each file with a '
+             'regular expression. Defaults to settings.READER.')
+    fix_parser.add_argument(
+        '--categories', nargs='+', metavar='ORD_STATUS',
+        help='The OrdStatus values that question_1 counts, e.g. 2 1 4.')
+    fix_parser.add_argument(
+        '--distinct', choices=('exact', 'approximate'),
+        help='Also count the distinct orders with each OrdStatus in '
+             'question_1, exactly or with a HyperLogLog. Defaults to '
+             'settings.DISTINCT_ORDERS.')
+    fix_parser.add_argument(
+        '--symbol', metavar='TAG=VALUE',
+        help='The symbol field of question_2, e.g. 55=ES.')
+    fix_parser.add_argument(
+        '--batch', action='store_true',
+        help='Parse the log files that have no columnar sidecar into columns '
+             'with NumPy, thousands of messages at a time, for the reports '
+             'that can answer from columns.')
+    fix_parser.add_argument(
+        '--bucket', choices=('minute', 'hour'),
+        help='The size of the buckets of time_buckets. Defaults to minute.')
+    fix_parser.add_argument(
+        '--from', dest='time_from', metavar='TIMESTAMP',
+        help='Only read the messages from this time, e.g. 20130808-13:30 '
+             '(a prefix of the log timestamps).')
+    fix_parser.add_argument(
+        '--to', dest='time_to', metavar='TIMESTAMP',
+        help='Only read the messages before this time, e.g. 20130808-14.')
+
+    baby_parser = subparsers.add_parser('baby', help='Baby name reports')
+    baby_parser.add_argument(
+        'report', choices=('question_1', 'question_2'),
+        help='question_1 lists the top names of every year, and question_2 '
+             'lists the rankings of some names over every year.')
+    baby_parser.add_argument(
+        '--engine', choices=('lxml', 'regex'),
+        help='How the HTML files are read: "lxml" streams each file through '
+             'an HTML parser, and "regex" searches it with a regular '
+             'expression. Defaults to settings.PARSER.')
+    baby_parser.add_argument(
+        '--count', type=int, help='The number of top names of question_1.')
+    baby_parser.add_argument(
+        '--names', nargs='+', help='The names that question_2 ranks.')
+    baby_parser.add_argument(
+        '--no-cache', action='store_true',
+        help="Parse the HTML files instead of reading the parsed tables' "
+             'cache.')
+
+    for suite_parser in (fix_parser, baby_parser):
+        suite_parser.add_argument(
+            '--pipeline', action='store_true',
+            help='Read, parse and aggregate the input files in a pipeline of '
+                 'threads (with 1 worker).')
+        suite_parser.add_argument(
+            '--input', action='append', metavar='PATH',
+            help='A directory or glob pattern of the input files. Can be '
+                 "given more than once. Defaults to the suite's directory.")
+        suite_parser.add_argument(
+            '--workers', type=int, default=1,
+            help='The number of processes, or 0 for one per core.')
+        suite_parser.add_argument(
+            '--format', choices=OUTPUT_FORMATS,
+            help='The format of the report. Defaults to '
+                 'settings.OUTPUT_FORMAT.')
+    return parser
+
+
+def load_suite(suite: str, input_patterns: list):
+    """
+    Makes the modules of a suite importable and points its settings at the
+    input files.
+
+    Args:
+        suite (str): "fix" or "baby".
+        input_patterns (list): Directories or glob patterns, or None for the
+            suite's directory.
+    """
+    suite_path = os.path.join(REPO_PATH, SUITES[suite])
+    # Both suites have modules with the same names (e.g. settings), so only
+    # one suite can be imported.
+    sys.path.insert(0, REPO_PATH)
+    sys.path.insert(0, suite_path)
+    import settings
+    settings.RELATIVE_PATH = suite_path
+    settings.INPUT_PATTERNS = input_patterns or []
+
+
+def run_fix_report(args):
+    import settings
+    output_format = args.format or ''
+
+    if args.engine == 'regex':
+        if args.report == 'question_1':
+            import question_1
+            import question_1_v2
+            script = question_1_v2.OrderStatusAnalyzer2(
+                args.categories or question_1.CATEGORIES_NEEDED,
+                output_format=output_format)
+        else:
+            import question_2
+            import question_2_v2
+            script = question_2_v2.ExecutionReportAnalyzer2(
+                args.symbol or question_2.SYMBOL_TAG,
+                output_format=output_format)
+        script.execute_report()
+        return
+
+    import engine
+    analyzers = []
+    if args.report in ('question_1', 'all'):
+        import question_1
+        analyzers.append(question_1.OrderStatusAnalyzer(
+            args.categories or question_1.CATEGORIES_NEEDED,
+            output_format=output_format, distinct_orders=args.distinct))
+    if args.report in ('question_2', 'all'):
+        import question_2
+        analyzers.append(question_2.ExecutionReportAnalyzer(
+            args.symbol or question_2.SYMBOL_TAG,
+            output_format=output_format))
+    if args.report == 'time_buckets':
+        import question_1
+        import time_buckets
+        analyzers.append(time_buckets.TimeBucketAnalyzer(
+            args.categories or question_1.CATEGORIES_NEEDED,
+            args.bucket or time_buckets.BUCKET, args.symbol or '',
+            output_format=output_format))
+    script = engine.ReportEngine(
+        analyzers, args.workers, reader=args.engine or settings.READER,
+        use_pipeline=args.pipeline,
+        time_range=(args.time_from or '', args.time_to or ''),
+        use_batch=args.batch or settings.USE_BATCH)
+    script.execute_report()
+
+
+def run_baby_report(args):
+    output_format = args.format or ''
+
+    if args.report == 'question_1':
+        import question_1
+        script = question_1.Script(
+            args.count or question_1.NAME_QUANTITY_NEEDED,
+            output_format=output_format)
+    else:
+        import question_2
+        script = question_2.Script(
+            args.names or question_2.NAMES_IN_REPORT,
+            excel_sheetname=question_2.EXCEL_SHEETNAME,
+            output_format=output_format)
+    if args.engine:
+        script.parser = args.engine
+    if args.no_cache:
+        script.use_cache = False
+    if args.pipeline:
+        script.use_pipeline = True
+    script.execute_report(args.workers)
+
+
+def main(argv: list = None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    if args.suite == 'fix':
+        if args.engine == 'regex' and args.report in ('time_buckets', 'all'):
+            parser.error(
+                'The regex engine only creates question_1 or question_2.')
+        if args.engine == 'regex' and args.batch:
+            parser.error('The regex engine searches the text of each file.')
+        if args.engine == 'regex' and (args.time_from or args.time_to):
+            parser.error('The regex engine reads the whole of every file.')
+        if args.engine == 'regex' and args.distinct:
+            parser.error('The regex engine only counts execution reports.')
+        if args.engine == 'regex' and (args.workers > 1 or args.pipeline):
+            parser.error(
+                'The regex engine only runs with 1 worker and no pipeline.')
+
+    load_suite(args.suite, args.input)
+    if args.suite == 'fix':
+        run_fix_report(args)
+    else:
+        run_baby_report(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,228 @@
-import functools, timeit
+import contextlib
+import functools
+import json
+import os
+import sys
+import timeit
+
+try:
+    import resource
+except ImportError:
+    # The resource module isn't available on Windows.
+    resource = None
+
+# Set this environment variable to "cprofile" or "tracemalloc" to profile
+# every report that's run.
+PROFILE_VARIABLE = 'REPORT_PROFILE'
+# Set this environment variable to a path to save the metrics of every report
+# that's run as JSON.
+METRICS_VARIABLE = 'REPORT_METRICS'
+# The number of functions (or lines of code) listed by a profile.
+PROFILE_LIMIT = 20
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Returns the peak resident memory of this process and its finished child
+    processes, or None if it isn't available.
+    """
+    if resource is None:
+        return None
+    peak_rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else.
+    if sys.platform == 'darwin':
+        return peak_rss / 1024 / 1024
+    return peak_rss / 1024
+
+
+class Metrics:
+    """
+    Records where the time of a report goes.
+
+    A report times each of its phases (e.g. "list_files", "read", "parse",
+    "aggregate" and "write_excel") with the phase() context manager and counts
+    the bytes and messages it processed with add(). The timer decorator
+    creates the Metrics of a run, and the result can be saved as JSON.
+    """
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self.seconds = 0.0
+        # Store the phases into a dict where the phase's name is the key and
+        # its total seconds is the value. The phases are kept in the order
+        # they first ran.
+        self.phases = {}
+        self.bytes = 0
+        self.messages = 0
+        self.peak_rss_mb = None
+        self.tracemalloc_peak_mb = None
+        self.profile = ''
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Adds the time spent inside the with block to a phase.
+
+        Args:
+            name (str): The name of the phase.
+        """
+        start_time = timeit.default_timer()
+        try:
+            yield
+        finally:
+            elapsed_time = timeit.default_timer() - start_time
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed_time
+
+    def add(self, bytes: int = 0, messages: int = 0):
+        self.bytes += bytes
+        self.messages += messages
+
+    def merge(self, other: dict):
+        """
+        Adds the phases and counts of another process's to_dict(). The phases
+        of parallel workers add up to more than the elapsed time.
+
+        Args:
+            other (dict)
+        """
+        for name, seconds in other['phases'].items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.add(other['bytes'], other['messages'])
+
+    @contextlib.contextmanager
+    def measure(self, profiler: str = ''):
+        """
+        Measures the total time and peak memory of the with block, and
+        optionally profiles it.
+
+        Args:
+            profiler (str): "cprofile" to profile the functions that were
+                called, or "tracemalloc" to trace the lines of code that
+                allocated memory.
+        """
+        assert profiler in ('', 'cprofile', 'tracemalloc'), (
+            f'Unknown profiler "{profiler}".')
+        # The profilers are only imported when they're used, to keep the
+        # startup of every report fast.
+        profile = None
+        if profiler == 'cprofile':
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        elif profiler == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start()
+
+        start_time = timeit.default_timer()
+        try:
+            yield self
+        finally:
+            self.seconds += timeit.default_timer() - start_time
+            if profile is not None:
+                import io
+                import pstats
+                profile.disable()
+                stream = io.StringIO()
+                stats = pstats.Stats(profile, stream=stream)
+                stats.sort_stats('cumulative').print_stats(PROFILE_LIMIT)
+                self.profile = stream.getvalue()
+            elif profiler == 'tracemalloc':
+                snapshot = tracemalloc.take_snapshot()
+                self.tracemalloc_peak_mb = (
+                    tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+                tracemalloc.stop()
+                self.profile = '\n'.join(
+                    str(statistic) for statistic in
+                    snapshot.statistics('lineno')[:PROFILE_LIMIT])
+            self.peak_rss_mb = get_peak_rss_mb()
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'seconds': self.seconds,
+            'phases': dict(self.phases),
+            'bytes': self.bytes,
+            'messages': self.messages,
+            'peak_rss_mb': self.peak_rss_mb,
+            'tracemalloc_peak_mb': self.tracemalloc_peak_mb,
+            'profile': self.profile,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def save(self, path: str):
+        with open(path, 'w') as metrics_file:
+            metrics_file.write(self.to_json())
+
+    def get_summary(self) -> str:
+        """
+        Returns the metrics as lines of text, e.g.
+            Took 1.52 seconds.
+              read          0.31 seconds
+              parse         0.97 seconds
+              ...
+              12.4 MB and 84,120 messages (8.2 MB/s, 55,342 messages/s)
+        """
+        lines = [f'Took {round(self.seconds, 2)} seconds.']
+        for name, seconds in self.phases.items():
+            lines.append(f'  {name:<12}{seconds:>8.2f} seconds')
+        if self.bytes or self.messages:
+            megabytes = self.bytes / 1024 / 1024
+            line = f'  {megabytes:.1f} MB and {self.messages:,} messages'
+            if self.seconds:
+                line += (
+                    f' ({megabytes / self.seconds:.1f} MB/s, '
+                    f'{self.messages / self.seconds:,.0f} messages/s)')
+            lines.append(line)
+        if self.peak_rss_mb is not None:
+            lines.append(f'  Peak memory: {self.peak_rss_mb:.0f} MB')
+        if self.tracemalloc_peak_mb is not None:
+            lines.append(
+                f'  Peak traced memory: {self.tracemalloc_peak_mb:.1f} MB')
+        if self.profile:
+            lines.append(self.profile)
+        return '\n'.join(lines)
+
+
+class NullMetrics(Metrics):
+    """
+    The metrics of an object that isn't being measured. Nothing is recorded.
+    """
+
+    def phase(self, name: str):
+        return contextlib.nullcontext()
+
+    def add(self, bytes: int = 0, messages: int = 0):
+        pass
+
+    def merge(self, other: dict):
+        pass
 
 
 def timer(func):
-    """Prints the runtime of the decorated function."""
+    """
+    Measures the decorated method with a new Metrics (stored on the object as
+    "metrics") and prints them.
+
+    The run is profiled if the REPORT_PROFILE environment variable is set, and
+    the metrics are saved as JSON if the REPORT_METRICS environment variable
+    is set to a path.
+    """
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = timeit.default_timer()
-        value = func(*args, **kwargs)
-        end_time = timeit.default_timer()
-        elapsed_time = end_time - start_time
-        msg = f'Took {round(elapsed_time, 2)} seconds.'
         script_obj = args[0]
-        try:
-            if script_obj.generate_excel:
-                msg += ' (Including the time it took to generate the Excel file.)'
-            else:
-                msg += ' (NOT including the time it took to generate the Excel file.)'
-        except AttributeError:
-            pass
-        print(msg)
+        metrics = script_obj.metrics = Metrics(type(script_obj).__name__)
+        with metrics.measure(os.environ.get(PROFILE_VARIABLE, '')):
+            value = func(*args, **kwargs)
+        metrics_path = os.environ.get(METRICS_VARIABLE)
+        if metrics_path:
+            metrics.save(metrics_path)
+        print(metrics.get_summary())
         return value
 
     return wrapper
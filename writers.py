@@ -0,0 +1,207 @@
+import csv
+import os
+
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet')
+# The number of rows in an Excel worksheet.
+EXCEL_MAX_ROWS = 1048576
+# The number of rows of a table that are buffered before they're written to a
+# Parquet file as a row group.
+PARQUET_BATCH_ROWS = 64 * 1024
+
+
+class ReportWriter:
+    """
+    Writes a report from top to bottom as a sequence of tables, where each
+    table is a header row followed by its rows.
+
+    "xlsx" writes every table to a single worksheet (with a blank row between
+    tables) using xlsxwriter's constant_memory mode, so each row is flushed to
+    disk as soon as the next one starts and memory use doesn't grow with the
+    size of the report. Once a worksheet is full, the report continues on a
+    new worksheet that starts with the current table's header again.
+
+    "csv" writes the same rows to a CSV file, which is much faster to write
+    than an Excel file. "parquet" writes each table to its own Parquet file in
+    batches. Rows that are shorter than the header are padded with blanks, and
+    a column with mixed types (e.g. ranks and "N/A") is stored as strings.
+
+    Example:
+        with ReportWriter('report.xlsx') as writer:
+            writer.start_table(['Category', 'Count'])
+            writer.write_rows([('39=2', 124), ('39=1', 39)])
+    """
+
+    def __init__(self, output_path: str, output_format: str = 'xlsx',
+                 sheet_name: str = '', max_rows: int = EXCEL_MAX_ROWS):
+        """
+        Args:
+            output_path (str): The path of the Excel file. Its extension is
+                replaced for the other formats.
+            output_format (str): "xlsx", "csv" or "parquet".
+            sheet_name (str): The name of the first worksheet. Defaults to
+                xlsxwriter's "Sheet1".
+            max_rows (int): The number of rows in a worksheet.
+        """
+        assert output_format in OUTPUT_FORMATS, (
+            f'Unknown output format "{output_format}".')
+        self.output_format = output_format
+        self.sheet_name = sheet_name
+        self.max_rows = max_rows
+        self.path_stem = os.path.splitext(output_path)[0]
+        # The files that were created, in the order they were created.
+        self.output_paths = []
+        self.header = None
+        self.table_count = 0
+
+        self.workbook = None
+        self.worksheet = None
+        self.sheet_count = 0
+        # The next row of the worksheet to write to.
+        self.row = 0
+        self.csv_file = None
+        self.csv_writer = None
+        self.parquet_path = None
+        self.parquet_writer = None
+        self.parquet_rows = []
+
+        # The library of each format is only imported when it's used.
+        if output_format == 'xlsx':
+            import xlsxwriter
+            self.workbook = xlsxwriter.Workbook(
+                self.get_path('xlsx'), {'constant_memory': True})
+            self.add_worksheet()
+        elif output_format == 'csv':
+            self.csv_file = open(self.get_path('csv'), 'w', newline='')
+            self.csv_writer = csv.writer(self.csv_file)
+        else:
+            try:
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError(
+                    'The "parquet" output format needs pyarrow to be '
+                    'installed.')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_path(self, extension: str, table_name: str = '') -> str:
+        path = self.path_stem
+        if table_name:
+            path += f'_{table_name}'
+        path += f'.{extension}'
+        if path not in self.output_paths:
+            self.output_paths.append(path)
+        return path
+
+    def add_worksheet(self):
+        self.sheet_count += 1
+        if self.sheet_count == 1:
+            sheet_name = self.sheet_name or None
+        else:
+            sheet_name = f'{self.sheet_name or "Sheet"} ({self.sheet_count})'
+        self.worksheet = self.workbook.add_worksheet(sheet_name)
+        self.row = 0
+
+    def start_table(self, header: list, name: str = ''):
+        """
+        Ends the current table (if any) and writes the header of the next one.
+
+        Args:
+            header (list): The column names.
+            name (str): Identifies the table in the name of its Parquet file.
+                Defaults to no suffix, so it's only needed when a report has
+                more than one table.
+        """
+        self.end_table()
+        self.header = list(header)
+        if self.output_format == 'parquet':
+            self.parquet_path = self.get_path('parquet', name)
+            return
+        if self.table_count:
+            self.write_row([])
+        self.write_row(self.header)
+        self.table_count += 1
+
+    def end_table(self):
+        if self.output_format == 'parquet':
+            self.flush_parquet()
+            if self.parquet_writer is not None:
+                self.parquet_writer.close()
+                self.parquet_writer = None
+
+    def write_row(self, row):
+        """
+        Writes a row of the current table.
+
+        Args:
+            row: A sequence of cell values.
+        """
+        if self.output_format == 'xlsx':
+            if self.row == self.max_rows:
+                self.add_worksheet()
+                if self.header:
+                    self.worksheet.write_row(self.row, 0, self.header)
+                    self.row += 1
+            self.worksheet.write_row(self.row, 0, row)
+            self.row += 1
+        elif self.output_format == 'csv':
+            self.csv_writer.writerow(row)
+        else:
+            self.parquet_rows.append(row)
+            if len(self.parquet_rows) == PARQUET_BATCH_ROWS:
+                self.flush_parquet()
+
+    def write_rows(self, rows):
+        """
+        Writes many rows of the current table.
+
+        Args:
+            rows: An iterable of sequences of cell values.
+        """
+        if self.output_format == 'csv':
+            self.csv_writer.writerows(rows)
+            return
+        for row in rows:
+            self.write_row(row)
+
+    def flush_parquet(self):
+        """
+        Writes the buffered rows of the current table to its Parquet file as
+        a row group.
+        """
+        if not self.parquet_rows:
+            return
+        width = len(self.header)
+        columns = [[] for _ in range(width)]
+        for row in self.parquet_rows:
+            row = list(row)
+            row += [None] * (width - len(row))
+            for column, value in zip(columns, row):
+                column.append(value)
+        import pyarrow
+        import pyarrow.parquet
+        arrays = []
+        for column in columns:
+            try:
+                arrays.append(pyarrow.array(column))
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+                arrays.append(pyarrow.array(
+                    [None if value is None else str(value) for value in column]))
+        table = pyarrow.Table.from_arrays(arrays, names=self.header)
+        if self.parquet_writer is None:
+            self.parquet_writer = pyarrow.parquet.ParquetWriter(
+                self.parquet_path, table.schema)
+        else:
+            table = table.cast(self.parquet_writer.schema)
+        self.parquet_writer.write_table(table)
+        self.parquet_rows = []
+
+    def close(self):
+        self.end_table()
+        if self.workbook is not None:
+            self.workbook.close()
+        if self.csv_file is not None:
+            self.csv_file.close()